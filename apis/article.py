@@ -3,10 +3,13 @@ from core.auth import get_current_user
 from core.db import DB
 from core.models.base import DATA_STATUS
 from core.models.article import Article,ArticleBase
-from sqlalchemy import and_, or_, desc
+from sqlalchemy import and_, or_, desc, func
+from sqlalchemy.orm import Session
 from .base import success_response, error_response
 from core.config import cfg
 from apis.base import format_search_kw
+from core.search import SEARCH
+from core.lru_cache import LRUCache
 from core.print import print_warning, print_info, print_error, print_success
 router = APIRouter(prefix=f"/articles", tags=["文章管理"])
 
@@ -14,9 +17,9 @@ router = APIRouter(prefix=f"/articles", tags=["文章管理"])
     
 @router.delete("/clean", summary="清理无效文章(MP_ID不存在于Feeds表中的文章)")
 async def clean_orphan_articles(
-    current_user: dict = Depends(get_current_user)
+    current_user: dict = Depends(get_current_user),
+    session: Session = Depends(DB.session_dependency)
 ):
-    session = DB.get_session()
     try:
         from core.models.feed import Feed
         from core.models.article import Article
@@ -66,6 +69,17 @@ async def clean_duplicate(
         )
 
 
+# 文章列表总数缓存，key包含订阅源更新戳，有文章入库或删除即失效
+ARTICLE_TOTALS=LRUCache(max_items=1024,ttl=int(cfg.get("article.total_ttl",60) or 60))
+
+def encode_cursor(publish_time:int,article_id:str)->str:
+    return f"{int(publish_time or 0)}_{article_id}"
+
+def decode_cursor(cursor:str):
+    """解析分页游标，格式为 发布时间_文章ID"""
+    publish_time,article_id=cursor.split("_",1)
+    return int(publish_time),article_id
+
 @router.api_route("", summary="获取文章列表",methods= ["GET", "POST"], operation_id="get_articles_list")
 async def get_articles(
     offset: int = Query(0, ge=0),
@@ -74,16 +88,18 @@ async def get_articles(
     search: str = Query(None),
     mp_id: str = Query(None),
     has_content:bool=Query(False),
-    current_user: dict = Depends(get_current_user)
+    cursor: str = Query(None, description="上一页返回的next_cursor，按(发布时间,ID)翻页，传入时忽略offset"),
+    with_total: bool = Query(True, description="是否返回总数"),
+    current_user: dict = Depends(get_current_user),
+    session: Session = Depends(DB.session_dependency)
 ):
-    session = DB.get_session()
     try:
-      
+        from core.models.feed import Feed
+        from core.feed_store import FEED_STORE
         
-        # 构建查询条件
-        query = session.query(ArticleBase)
-        if has_content:
-            query=session.query(Article)
+        # 构建查询条件，公众号名称随文章一起查出
+        Entity = Article if has_content else ArticleBase
+        query = session.query(Entity, Feed.mp_name).outerjoin(Feed, Feed.id == Entity.mp_id)
         if status:
             query = query.filter(Article.status == status)
         else:
@@ -91,39 +107,46 @@ async def get_articles(
         if mp_id:
             query = query.filter(Article.mp_id == mp_id)
         if search:
-            query = query.filter(
-               format_search_kw(search)
-            )
+            # 按相关度排序，相关度相同的再按发布时间
+            query = SEARCH.rank(query, search)
         
-        # 获取总数
-        total = query.count()
-        query= query.order_by(Article.publish_time.desc()).offset(offset).limit(limit)
-        # query= query.order_by(Article.id.desc()).offset(offset).limit(limit)
-        # 分页查询（按发布时间降序）
-        articles = query.all()
+        # 获取总数，相同条件在有新文章前复用
+        total = None
+        if with_total:
+            key=(status,search,mp_id,FEED_STORE.stamp(FEED_STORE.depend_id(mp_id)))
+            total = ARTICLE_TOTALS.get(key)
+            if total is None:
+                total = query.with_entities(func.count(Article.id)).order_by(None).scalar()
+                ARTICLE_TOTALS.set(key,total)
         
-        # 打印生成的 SQL 语句（包含分页参数）
-        print_warning(query.statement.compile(compile_kwargs={"literal_binds": True}))
-                       
-        # 查询公众号名称
-        from core.models.feed import Feed
-        mp_names = {}
-        for article in articles:
-            if article.mp_id and article.mp_id not in mp_names:
-                feed = session.query(Feed).filter(Feed.id == article.mp_id).first()
-                mp_names[article.mp_id] = feed.mp_name if feed else "未知公众号"
+        # 分页查询（按发布时间降序），搜索结果按相关度排序，只能按offset翻页
+        query = query.order_by(Article.publish_time.desc(), Article.id.desc())
+        if cursor and not search:
+            publish_time, article_id = decode_cursor(cursor)
+            query = query.filter(or_(
+                Article.publish_time < publish_time,
+                and_(Article.publish_time == publish_time, Article.id < article_id)
+            ))
+        else:
+            query = query.offset(offset)
+        rows = query.limit(limit).all()
         
         # 合并公众号名称到文章列表
         article_list = []
-        for article in articles:
+        for article, mp_name in rows:
             article_dict = article.__dict__
-            article_dict["mp_name"] = mp_names.get(article.mp_id, "未知公众号")
+            article_dict["mp_name"] = mp_name or "未知公众号"
             article_list.append(article_dict)
+        next_cursor = None
+        if len(rows) == limit and not search:
+            last = rows[-1][0]
+            next_cursor = encode_cursor(last.publish_time, last.id)
         
         from .base import success_response
         return success_response({
             "list": article_list,
-            "total": total
+            "total": total,
+            "next_cursor": next_cursor
         })
     except HTTPException as e:
         raise e
@@ -140,9 +163,9 @@ async def get_articles(
 async def get_article_detail(
     article_id: str,
     content: bool = False,
+    session: Session = Depends(DB.session_dependency),
     # current_user: dict = Depends(get_current_user)
 ):
-    session = DB.get_session()
     try:
         article = session.query(Article).filter(Article.id==article_id).filter(Article.status != DATA_STATUS.DELETED).first()
         if not article:
@@ -169,9 +192,9 @@ async def get_article_detail(
 @router.delete("/{article_id}", summary="删除文章")
 async def delete_article(
     article_id: str,
-    current_user: dict = Depends(get_current_user)
+    current_user: dict = Depends(get_current_user),
+    session: Session = Depends(DB.session_dependency)
 ):
-    session = DB.get_session()
     try:
         from core.models.article import Article
         
@@ -187,9 +210,15 @@ async def delete_article(
             )
         # 逻辑删除文章（更新状态为deleted）
         article.status = DATA_STATUS.DELETED
+        mp_id = article.mp_id
         if cfg.get("article.true_delete", False):
             session.delete(article)
         session.commit()
+        if cfg.get("article.true_delete", False):
+            from core.content_format import FORMAT_STORE
+            FORMAT_STORE.invalidate(article_id)
+        from core.feed_store import FEED_STORE
+        FEED_STORE.touch(mp_id)
         
         return success_response(None, message="文章已标记为删除")
     except Exception as e:
@@ -205,9 +234,9 @@ async def delete_article(
 @router.get("/{article_id}/next", summary="获取下一篇文章")
 async def get_next_article(
     article_id: str,
-    current_user: dict = Depends(get_current_user)
+    current_user: dict = Depends(get_current_user),
+    session: Session = Depends(DB.session_dependency)
 ):
-    session = DB.get_session()
     try:
         # 获取当前文章的发布时间
         current_article = session.query(Article).filter(Article.id == article_id).first()
@@ -252,9 +281,9 @@ async def get_next_article(
 @router.get("/{article_id}/prev", summary="获取上一篇文章")
 async def get_prev_article(
     article_id: str,
-    current_user: dict = Depends(get_current_user)
+    current_user: dict = Depends(get_current_user),
+    session: Session = Depends(DB.session_dependency)
 ):
-    session = DB.get_session()
     try:
         # 获取当前文章的发布时间
         current_article = session.query(Article).filter(Article.id == article_id).first()
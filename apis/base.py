@@ -24,7 +24,7 @@ def error_response(code: int, message: str, data=None):
     }
 from sqlalchemy import and_,or_
 from core.models import Article
+from core.search import SEARCH
 def format_search_kw(keyword: str):
-    words = keyword.replace("-"," ").replace("|"," ").split(" ")
-    rule = or_(*[Article.title.like(f"%{w}%") for w in words])
-    return rule
\ No newline at end of file
+    """关键词搜索条件，由全文索引匹配标题、摘要和正文"""
+    return SEARCH.filter(keyword)
\ No newline at end of file
@@ -242,10 +242,9 @@ async def add_mp(
         feed = existing_feed if existing_feed else new_feed
          #在这里实现第一次添加获取公众号文章
         if not existing_feed:
-            from core.queue import TaskQueue
-            from core.wx import WxGather
+            from jobs.mps import enqueue_feed
             Max_page=int(cfg.get("max_page","2"))
-            TaskQueue.add_task( WxGather().Model().get_Articles,faker_id=feed.faker_id,Mps_id=feed.id,CallBack=UpdateArticle,MaxPage=Max_page,Mps_title=mp_name)
+            enqueue_feed(feed.id,priority=5,max_page=Max_page)
             
         return success_response({
             "id": feed.id,
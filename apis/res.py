@@ -1,94 +1,98 @@
 from fastapi import APIRouter, Request, HTTPException
-import httpx
-from fastapi.responses import Response
-import os
-import hashlib
-import time
-import json
-from core.config import cfg
-CACHE_DIR = cfg.get("cache.dir","data/cache")
-CACHE_TTL = 3600  # 缓存过期时间1小时
-
-if not os.path.exists(CACHE_DIR):
-    os.makedirs(CACHE_DIR)
+import asyncio
+import anyio
+from fastapi.responses import Response, FileResponse, StreamingResponse
+from core.res.proxy_cache import PROXY_CACHE, PROXY_HOSTS, KEEP_HEADERS, cache_key
+from core.print import print_error
 
 router = APIRouter(prefix="/res", tags=["资源反向代理"])
 @router.api_route("/logo/{path:path}", methods=["GET", "POST", "PUT", "DELETE", "PATCH"], operation_id="reverse_proxy_logo")
 async def reverse_proxy(request: Request, path: str):
-    hosts=["mmbiz.qpic.cn","mmbiz.qlogo.cn","mmecoa.qpic.cn"]
     path=path.replace("https://", "http://")
     from urllib.parse import urlparse
     parsed_url = urlparse(path)
     host = parsed_url.netloc
-    if  host not  in hosts:
+    if  host not  in PROXY_HOSTS:
         return Response(
         content="只允许访问微信公众号图标，请使用正确的域名。",
         status_code=301,
         headers={"Location":path},
     )
-    
-    # 生成缓存文件名
-    cache_key = f"{request.method}_{path}".encode('utf-8')
-    cache_filename = os.path.join(CACHE_DIR, hashlib.sha256(cache_key).hexdigest())
-    
-    # 检查缓存是否存在且有效
-    if os.path.exists(cache_filename):
-        file_mtime = os.path.getmtime(cache_filename)
-        if time.time() - file_mtime < CACHE_TTL:
-            with open(cache_filename, 'rb') as f:
-                content = f.read()
-            
-            # 读取缓存的状态码和响应头
-            headers_filename = cache_filename + ".headers"
-            if os.path.exists(headers_filename):
-                with open(headers_filename, 'r', encoding='utf-8') as f:
-                    headers = json.load(f)
-            else:
-                headers = {}
-            
-            media_type = headers.get("Content-Type")
-            status_code = 200  # 默认状态码
-            
-            return Response(
-                content=content,
-                status_code=status_code,
-                headers=headers,
-                media_type=media_type
-            )
-    
-    target_url = path
-    
-    client = httpx.AsyncClient()
-    request_data = await request.body()
-    headers = dict(request.headers)
-    headers.pop("host", host)
-    headers.pop("referer", None)
-    print(headers)
-    resp = await client.request(
-        method=request.method,
-        url=target_url,
-        # headers=headers,
-        content=request_data
-    )
-    
-    content = resp.content
-    status_code = resp.status_code
-    headers = dict(resp.headers)
-    media_type = resp.headers.get("Content-Type")
+
+    # 只缓存GET请求，其他方法直接转发
+    if request.method != "GET":
+        return await forward(request, path, None)
+
+    key = cache_key(request.method, path)
+    for _ in range(2):
+        entry = await PROXY_CACHE.get(key)
+        if entry is not None:
+            return FileResponse(PROXY_CACHE.path(key), headers=entry.headers, media_type=entry.content_type)
+        leader, future = PROXY_CACHE.begin(key)
+        if leader:
+            return await forward(request, path, key, future)
+        # 同一图片正在回源，等待完成后读缓存；回源失败或超时再自行请求
+        try:
+            if not await asyncio.wait_for(asyncio.shield(future), timeout=30):
+                break
+        except asyncio.TimeoutError:
+            # 回源的请求可能已中断且未能登记结果，清除后由后续请求重新回源
+            PROXY_CACHE.finish(key, False)
+            break
+    return await forward(request, path, None)
+
+
+class ProxyResponse(StreamingResponse):
+    """转发上游响应，响应结束后(包括客户端在开始发送前断开)关闭上游连接并结束回源登记"""
+
+    def __init__(self, content, upstream, key: str = None, future=None, **kwargs):
+        super().__init__(content, **kwargs)
+        self._content = content
+        self._upstream = upstream
+        self._key = key
+        self._future = future
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            with anyio.CancelScope(shield=True):
+                # 已开始的生成器在此执行其清理；未开始的生成器不会执行finally，需要在这里释放
+                await self._content.aclose()
+                await self._upstream.aclose()
+                if self._key is not None:
+                    PROXY_CACHE.finish(self._key, False, self._future)
+
+
+async def forward(request: Request, target_url: str, key: str = None, future=None):
+    """使用共享客户端转发请求并流式返回，key不为空时同时写入缓存"""
+    client = PROXY_CACHE.client()
     try:
-        # 缓存响应
-        with open(cache_filename, 'wb') as f:
-            f.write(content)
-        
-        # 缓存响应头
-        headers_filename = cache_filename + ".headers"
-        with open(headers_filename, 'w', encoding='utf-8') as f:
-            json.dump(headers, f)
+        req = client.build_request(request.method, target_url, content=await request.body())
+        resp = await client.send(req, stream=True)
     except Exception as e:
-        print(f"缓存响应失败: {str(e)}")    
-    return Response(
-        content=content,
-        status_code=status_code,
+        if key is not None:
+            PROXY_CACHE.finish(key, False, future)
+        print_error(f"图片代理请求失败: {str(e)}")
+        raise HTTPException(status_code=502, detail="图片获取失败")
+    headers = {k: v for k, v in resp.headers.items() if k.lower() in KEEP_HEADERS}
+    media_type = resp.headers.get("Content-Type")
+    if key is None:
+        async def body():
+            try:
+                async for chunk in resp.aiter_bytes():
+                    yield chunk
+            finally:
+                await resp.aclose()
+        content = body()
+    else:
+        content = PROXY_CACHE.tee(key, target_url, resp)
+    return ProxyResponse(
+        content,
+        resp,
+        key,
+        future,
+        status_code=resp.status_code,
         headers=headers,
         media_type=media_type
-    )
\ No newline at end of file
+    )
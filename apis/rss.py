@@ -1,6 +1,7 @@
 from fastapi import APIRouter, Depends, Query, HTTPException, Request,Response
 from fastapi import status
-from fastapi.responses import Response
+from fastapi.responses import Response,StreamingResponse
+from sqlalchemy.orm import Session
 from core.db import DB
 from core.rss import RSS
 from core.models.feed import Feed
@@ -10,6 +11,12 @@ from core.auth import get_current_user
 from core.config import cfg
 from apis.base import format_search_kw
 from core.print import print_error,print_success
+from core.feed_store import FEED_STORE
+import hashlib
+import os
+import time
+import itertools
+from email.utils import formatdate,parsedate_to_datetime
 def verify_rss_access(current_user: dict = Depends(get_current_user)):
     """
     RSS访问认证方法
@@ -26,6 +33,57 @@ def verify_rss_access(current_user: dict = Depends(get_current_user)):
         )
     return current_user
 
+def rss_cache_name(tag_id:str,feed_id:str,limit:int,offset:int,kw:str="",content_type:str=None,template:str=None)->str:
+    """订阅源渲染结果的缓存名，关键词、内容格式、模板不同的结果分开存放"""
+    name=f'{tag_id}_{feed_id}_{limit}_{offset}'
+    if kw or content_type or template:
+        extra=hashlib.md5(f"{kw}|{content_type}|{template}".encode("utf-8")).hexdigest()[:8]
+        name=f'{name}_{extra}'
+    return name
+
+def make_validator(*parts)->str:
+    """根据订阅源最新数据和请求参数生成强校验ETag"""
+    options=(cfg.get("rss.full_context",False),cfg.get("rss.add_cover",False),cfg.get("rss.cdata",False),cfg.get("rss.local",False),cfg.get("rss.base_url",""))
+    raw="|".join(str(p) for p in parts+options)
+    return '"'+hashlib.sha1(raw.encode("utf-8")).hexdigest()+'"'
+
+def validator_headers(etag:str,last_modified:float)->dict:
+    headers={}
+    if etag:
+        headers["ETag"]=etag
+    if last_modified:
+        headers["Last-Modified"]=formatdate(last_modified,usegmt=True)
+    return headers
+
+def is_not_modified(request:Request,etag:str,last_modified:float)->bool:
+    """判断客户端缓存是否仍然有效，If-None-Match优先于If-Modified-Since"""
+    if_none_match=request.headers.get("if-none-match")
+    if if_none_match is not None:
+        if etag is None:
+            return False
+        tags=[t.strip().removeprefix("W/") for t in if_none_match.split(",")]
+        return "*" in tags or etag in tags
+    if_modified_since=request.headers.get("if-modified-since")
+    if if_modified_since and last_modified:
+        try:
+            since=parsedate_to_datetime(if_modified_since)
+            return int(last_modified)<=int(since.timestamp())
+        except (TypeError,ValueError,IndexError):
+            return False
+    return False
+
+def not_modified_response(etag:str,last_modified:float)->Response:
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED,headers=validator_headers(etag,last_modified))
+
+def feed_validator(rss_file:str,stamp:float,rendered_at:float,*parts)->tuple:
+    """由订阅源更新戳和渲染文件时间生成(ETag,Last-Modified时间戳)，不查询数据库
+
+    重新渲染时以开始查询的时刻作为渲染时间，与之后命中缓存时读到的文件时间一致
+    """
+    rendered_at=int(rendered_at or 0)
+    etag=make_validator(os.path.basename(rss_file),int(stamp or 0),rendered_at,*parts)
+    return etag,rendered_at
+
 router = APIRouter(prefix="/rss",tags=["Rss"])
 feed_router = APIRouter(prefix="/feed",tags=["Feed"])
 
@@ -35,9 +93,10 @@ async def get_rss_source(
     request: Request,
     limit: int = Query(100, ge=1, le=100),
     offset: int = Query(0, ge=0),
+    session: Session = Depends(DB.session_dependency),
     # current_user: dict = Depends(verify_rss_access)
 ):
-    return await get_mp_articles_source(request=request,feed_id=feed_id, limit=limit,offset=offset, is_update=True)
+    return await get_mp_articles_source(request=request,feed_id=feed_id, limit=limit,offset=offset, is_update=True,session=session)
 
 
 
@@ -48,9 +107,10 @@ async def update_rss_feeds(
     request: Request,
     limit: int = Query(100, ge=1, le=100),
     offset: int = Query(0, ge=0),
+    session: Session = Depends(DB.session_dependency),
     # current_user: dict = Depends(get_current_user)
 ):
-    return await get_rss_feeds(request=request, limit=limit,offset=offset, is_update=True)
+    return await get_rss_feeds(request=request, limit=limit,offset=offset, is_update=True,session=session)
 
 @router.get("", summary="获取RSS订阅列表")
 async def get_rss_feeds(
@@ -58,18 +118,28 @@ async def get_rss_feeds(
     limit: int = Query(10, ge=1, le=30),
     offset: int = Query(0, ge=0),
     is_update:bool=False,
+    session: Session = Depends(DB.session_dependency),
     # current_user: dict = Depends(get_current_user)
 ):
     rss=RSS(name=f'all_{limit}_{offset}')
+    etag,last_modified=None,0
+    try:
+        from sqlalchemy import func
+        max_created,max_updated,total=session.query(func.max(Feed.created_at),func.max(Feed.updated_at),func.count(Feed.id)).one()
+        last_modified=max(int(t.timestamp()) for t in (max_created,max_updated) if t) if (max_created or max_updated) else 0
+        etag=make_validator("feeds",limit,offset,max_created,max_updated,total,request.base_url)
+        if is_not_modified(request,etag,last_modified):
+            return not_modified_response(etag,last_modified)
+    except Exception as e:
+        print_error(f"生成订阅列表校验信息失败:{e}")
     rss_xml=rss.get_cache()
     if rss_xml is not None  and is_update==False:
          return Response(
             content=rss_xml,
-            media_type="application/xml"
+            media_type="application/xml",
+            headers=validator_headers(etag,last_modified)
         )
-    session = DB.get_session()
     try:
-        total = session.query(Feed).count()
         feeds = session.query(Feed).order_by(Feed.created_at.desc()).limit(limit).offset(offset).all()
         rss_domain=cfg.get("rss.base_url",request.base_url)
         # 转换为RSS格式数据
@@ -87,7 +157,8 @@ async def get_rss_feeds(
         
         return Response(
             content=rss_xml,
-            media_type="application/xml"
+            media_type="application/xml",
+            headers=validator_headers(etag,last_modified)
         )
     except Exception as e:
         print(f"获取RSS订阅列表错误: {str(e)}")
@@ -137,7 +208,8 @@ async def get_rss_feed(content_id: str):
     </body>
     </html>
     '''
-    text=rss.add_logo_prefix_to_urls(content['content'])
+    # 缓存内容写入时已加好图片代理前缀
+    text=content['content']
     html=html.format(title=title,text=text,source=content['mp_name'],publish_time=content['publish_time'])
     return Response(
             content=html,
@@ -153,6 +225,7 @@ async def update_rss_feeds(
     feed_id: str,
     limit: int = Query(100, ge=1, le=100),
     offset: int = Query(0, ge=0),
+    session: Session = Depends(DB.session_dependency),
     # current_user: dict = Depends(get_current_user)
 ):
         #如果需要放开授权，请只允许内网访问，防止 被利用攻击 放开授权办法，注释上面current_user: dict = Depends(get_current_user)
@@ -164,7 +237,7 @@ async def update_rss_feeds(
         # wx.get_Articles(mp.faker_id,Mps_id=mp.id,CallBack=UpdateArticle)
         # result=wx.articles
 
-        return await get_mp_articles_source(request=request,feed_id=feed_id, limit=limit,offset=offset, is_update=True)
+        return await get_mp_articles_source(request=request,feed_id=feed_id, limit=limit,offset=offset, is_update=True,session=session)
 
 
 
@@ -177,20 +250,34 @@ async def get_mp_articles_source(
     limit: int = Query(10, ge=1, le=100),
     offset: int = Query(0, ge=0),
     kw:str="",
-    is_update:bool=True,
+    is_update:bool=False,
     content_type:str=Query(None,alias="ctype"),
-    template:str=None
+    template:str=None,
+    session: Session = Depends(DB.session_dependency),
     # current_user: dict = Depends(get_current_user)
 ):
-    rss=RSS(name=f'{tag_id}_{feed_id}_{limit}_{offset}',ext=ext)
+    rss=RSS(name=rss_cache_name(tag_id,feed_id,limit,offset,kw,content_type,template),ext=ext)
     rss.set_content_type(content_type)
+    depend_id=FEED_STORE.depend_id(feed_id,tag_id)
+    started_at=time.time()
+    stamp=FEED_STORE.stamp(depend_id)
+    if is_update==False:
+        cached=FEED_STORE.lookup(rss.rss_file,depend_id)
+        if cached is not None:
+            # 命中订阅源存储时校验信息由更新戳和渲染时间得出，条件请求也不查询数据库
+            rss_xml,rendered_at=cached
+            etag,last_modified=feed_validator(rss.rss_file,stamp,rendered_at,request.base_url)
+            if is_not_modified(request,etag,last_modified):
+                return not_modified_response(etag,last_modified)
+            return Response(
+                content=rss_xml,
+                media_type=rss.get_type(),
+                headers=validator_headers(etag,last_modified)
+            )
+    # 未命中时重新渲染，渲染文件的时间会设为started_at
+    etag,last_modified=feed_validator(rss.rss_file,stamp,started_at,request.base_url)
+    headers=validator_headers(etag,last_modified)
     rss_xml = rss.get_cache()
-    if rss_xml is not None and is_update==False:
-         return Response(
-            content=rss_xml,
-            media_type=rss.get_type()
-        )
-    session = DB.get_session()
     try:
         from core.models.article import Article
         from core.models.tags import Tags
@@ -227,49 +314,50 @@ async def get_mp_articles_source(
             )
       
         # 查询文章列表
-        total = query.count()
         # articles = query.order_by(Article.publish_time.desc()).limit(limit).offset(offset).all()
         if kw!="":
             query=query.filter(format_search_kw(kw))
         articles =query.order_by(Article.publish_time.desc()).limit(limit).offset(offset).all()
         # 转换为RSS格式数据
         import datetime
-        rss_list = [{
-            "id": str(article.id),
-            "title": article.title or "",
-            "link":  f"{rss_domain}rss/feed/{article.id}" if cfg.get("rss.local",False) else article.url,
-            "description": article.description if article.description != "" else article.title or "",
-            "content": article.content or "",
-            "image": article.pic_url or "",
-            "mp_name":_feed.mp_name or "",
-            "updated": datetime.datetime.fromtimestamp(article.publish_time),
-            "feed": {
-                    "id":_feed.id,
-                    "name":_feed.mp_name,
-                    "cover":_feed.mp_cover,
-                    "intro":_feed.mp_intro
-            }
-        } for _feed,article in articles]
-        
-
-        # 缓存文章内容
-        for _feed,article in articles:
-            content_data = {
-                "id": article.id,
-                "title": article.title,
-                "content": article.content,
-                "publish_time": article.publish_time,
-                "mp_id": article.mp_id,
-                "pic_url": article.pic_url,
-                "mp_name": _feed.mp_name
-            }
-            rss.cache_content(article.id, content_data)
-        # 生成RSS XML
-        rss_xml = rss.generate(rss_list,ext=ext, title=f"{feed.mp_name}",link=rss_domain,description=feed.mp_intro,image_url=feed.mp_cover,template=template)
-        
-        return Response(
-            content=rss_xml,
-            media_type=rss.get_type()
+        local_link=cfg.get("rss.local",False)
+        def iter_items():
+            for _feed,article in articles:
+                updated=article.updated_at.timestamp() if article.updated_at else article.publish_time
+                rss.cache_content(article.id, {
+                    "id": article.id,
+                    "title": article.title,
+                    "content": article.content,
+                    "publish_time": article.publish_time,
+                    "mp_id": article.mp_id,
+                    "pic_url": article.pic_url,
+                    "mp_name": _feed.mp_name
+                },mtime=int(updated) if updated else None)
+                yield {
+                    "id": str(article.id),
+                    "title": article.title or "",
+                    "link":  f"{rss_domain}rss/feed/{article.id}" if local_link else article.url,
+                    "description": article.description if article.description != "" else article.title or "",
+                    "content": article.content or "",
+                    "image": article.pic_url or "",
+                    "mp_name":_feed.mp_name or "",
+                    "updated": datetime.datetime.fromtimestamp(article.publish_time),
+                    "feed": {
+                            "id":_feed.id,
+                            "name":_feed.mp_name,
+                            "cover":_feed.mp_cover,
+                            "intro":_feed.mp_intro
+                    }
+                }
+        # 读取文章字段和缓存文章内容在返回响应前完成，出错时仍可退回旧缓存
+        items=list(iter_items())
+        # 流式生成RSS XML，同时写入订阅源存储；先生成首个片段，模板等错误在发送200之前暴露
+        chunks = rss.stream(items,ext=ext, title=f"{feed.mp_name}",link=rss_domain,description=feed.mp_intro,image_url=feed.mp_cover,template=template,mtime=started_at)
+        first=next(chunks,"")
+        return StreamingResponse(
+            itertools.chain([first],chunks),
+            media_type=rss.get_type(),
+            headers=headers
         )
     except Exception as e:
         print_error(f"获取RSS错误:{e}")
@@ -290,9 +378,10 @@ async def rss(
     offset: int = Query(0, ge=0),
     kw:str="",
     content_type:str=Query(None,alias="ctype"),
-    is_update:bool=True
+    is_update:bool=False,
+    session: Session = Depends(DB.session_dependency)
 ):
-    return await get_mp_articles_source(request=request,feed_id=feed_id, limit=limit,offset=offset, is_update=is_update,ext=ext,kw=kw,content_type=content_type)
+    return await get_mp_articles_source(request=request,feed_id=feed_id, limit=limit,offset=offset, is_update=is_update,ext=ext,kw=kw,content_type=content_type,session=session)
 
 
 @feed_router.get("/search/{kw}/{feed_id}.{ext}", summary="获取公众号文章源")
@@ -304,9 +393,10 @@ async def rss(
     offset: int = Query(0, ge=0),
     kw:str="",
     content_type:str=Query(None,alias="ctype"),
-    is_update:bool=True
+    is_update:bool=False,
+    session: Session = Depends(DB.session_dependency)
 ):
-    return await get_mp_articles_source(request=request,feed_id=feed_id, limit=limit,offset=offset, is_update=is_update,ext=ext,kw=kw,content_type=content_type)
+    return await get_mp_articles_source(request=request,feed_id=feed_id, limit=limit,offset=offset, is_update=is_update,ext=ext,kw=kw,content_type=content_type,session=session)
 @feed_router.get("/tag/{tag_id}.{ext}", summary="获取公众号文章源")
 async def rss(
     request: Request,
@@ -317,8 +407,9 @@ async def rss(
     offset: int = Query(0, ge=0),
     kw:str="",
     content_type:str=Query(None,alias="ctype"),
-    is_update:bool=True
+    is_update:bool=False,
+    session: Session = Depends(DB.session_dependency)
 ):
-    return await get_mp_articles_source(request=request,feed_id=feed_id, tag_id=tag_id,limit=limit,offset=offset, is_update=is_update,ext=ext,kw=kw,content_type=content_type)
+    return await get_mp_articles_source(request=request,feed_id=feed_id, tag_id=tag_id,limit=limit,offset=offset, is_update=is_update,ext=ext,kw=kw,content_type=content_type,session=session)
 
 
@@ -3,13 +3,25 @@ import time
 import sys
 import psutil
 from fastapi import APIRouter,Depends
+from fastapi.responses import PlainTextResponse
 from typing import Dict, Any
 from core.auth import get_current_user
 from .base import success_response, error_response
 from driver.token import wx_cfg
 from core.config import cfg
-from jobs.mps import TaskQueue
+from jobs.mps import TaskQueue,COALESCER
 from driver.success import getLoginInfo,getStatus
+from core.feed_store import FEED_STORE
+from core.content_format import FORMAT_STORE
+from core.res.proxy_cache import PROXY_CACHE
+from core.res.images import IMAGE_STORE
+from core.metrics import METRICS
+from core.wx.engine import GATHER_ENGINE
+from core.wx.limiter import LIMITER
+from core.wx.seen import SEEN
+from driver.browser_pool import BROWSER_POOL
+from core.wx.content import CONTENT_PIPELINE
+from jobs.fetch_no_article import BACKFILL
 router = APIRouter(prefix="/sys", tags=["系统信息"])
 
 # 记录服务器启动时间
@@ -51,12 +63,98 @@ async def system_resources(
     try:
         resources_info=get_system_resources()
         resources_info["queue"]=TaskQueue.get_queue_info(),
+        resources_info["rss_cache"]=FEED_STORE.info()
+        resources_info["formats"]=FORMAT_STORE.info()
+        resources_info["res_cache"]=PROXY_CACHE.info()
+        resources_info["images"]=IMAGE_STORE.info()
+        resources_info["gather"]={"engine":GATHER_ENGINE.info(),"limiter":LIMITER.info(),"seen":SEEN.info(),"browser":BROWSER_POOL.info(),"content":CONTENT_PIPELINE.info(),"backfill":BACKFILL.info(),"coalescer":COALESCER.info()}
         return success_response(data=resources_info)
     except Exception as e:
         return error_response(
             code=50002,
             message=f"获取系统资源失败: {str(e)}"
         )
+@router.get("/db_pool", summary="获取数据库连接池使用情况")
+async def db_pool_status(
+    current_user: dict = Depends(get_current_user)
+) -> Dict[str, Any]:
+    """获取当前进程内各共享连接池的使用情况
+    
+    Returns:
+        BaseResponse格式的连接池信息列表，每项包括:
+        - role: 连接池角色(api/scheduler/content)
+        - size: 连接池常驻连接数
+        - checkedin: 空闲连接数
+        - checkedout: 已借出连接数
+        - overflow: 溢出连接数
+    """
+    try:
+        from core.db import pool_status
+        return success_response(data=pool_status())
+    except Exception as e:
+        return error_response(
+            code=50003,
+            message=f"获取连接池信息失败: {str(e)}"
+        )
+@router.get("/poll_plan", summary="获取公众号的自适应采集计划")
+async def poll_plan(
+    current_user: dict = Depends(get_current_user)
+) -> Dict[str, Any]:
+    """获取每个公众号的发文规律和下次采集时间
+
+    Returns:
+        BaseResponse格式的采集计划，包括:
+        - mode: 采集调度模式(cron/adaptive)
+        - budget: 每小时采集预算及已使用数量
+        - feeds: 按下次采集时间排序的公众号列表
+    """
+    try:
+        from core.wx.poll import POLL_PLANNER
+        from jobs.mps import poll_scope
+        from starlette.concurrency import run_in_threadpool
+        # 统计发文规律需要扫描历史文章，放到线程池中执行
+        feeds=await run_in_threadpool(lambda:POLL_PLANNER.plan(poll_scope()))
+        return success_response(data={
+            "mode":cfg.get("gather.schedule","cron"),
+            "budget":POLL_PLANNER.info(),
+            "feeds":feeds,
+        })
+    except Exception as e:
+        return error_response(
+            code=50005,
+            message=f"获取采集计划失败: {str(e)}"
+        )
+
+@router.get("/metrics", summary="获取队列和定时任务的运行指标")
+async def metrics(
+    current_user: dict = Depends(get_current_user)
+) -> Dict[str, Any]:
+    """获取任务队列、定时任务和采集各环节的耗时统计
+
+    Returns:
+        BaseResponse格式的指标信息，包括:
+        - queue: 队列状态
+        - scheduler: 定时任务及下次执行时间
+        - metrics: 计数器、瞬时值和耗时直方图(含p50/p95)
+    """
+    try:
+        from jobs.mps import scheduler
+        return success_response(data={
+            "queue":TaskQueue.get_queue_info(),
+            "scheduler":scheduler.get_scheduler_status(),
+            "metrics":METRICS.snapshot(),
+        })
+    except Exception as e:
+        return error_response(
+            code=50004,
+            message=f"获取运行指标失败: {str(e)}"
+        )
+
+@router.get("/metrics/prometheus", summary="Prometheus格式的运行指标", response_class=PlainTextResponse)
+async def metrics_prometheus(
+    current_user: dict = Depends(get_current_user)
+) -> PlainTextResponse:
+    return PlainTextResponse(METRICS.prometheus(), media_type="text/plain; version=0.0.4; charset=utf-8")
 from core.article_lax import ARTICLE_INFO,laxArticle
 from .ver import API_VERSION
 from core.ver import VERSION as CORE_VERSION,LATEST_VERSION
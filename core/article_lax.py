@@ -16,14 +16,14 @@ def laxArticle():
     info=ArticleInfo()
     session=DB.get_session()
     #获取没有内容的文章数量
-    info.no_content_count=session.query(Article).filter(Article.content == None).count()
+    info.no_content_count=session.query(Article.id).filter(Article.has_content == 0).count()
     #所有文章数量
-    info.all_count=session.query(Article).count()
+    info.all_count=session.query(Article.id).count()
     #有内容的文章数量
     info.has_content_count=info.all_count-info.no_content_count
 
     #获取删除的文章
-    info.wrong_count=session.query(Article).filter(Article.status !=DATA_STATUS.ACTIVE ).count()
+    info.wrong_count=session.query(Article.id).filter(Article.status !=DATA_STATUS.ACTIVE ).count()
 
     #公众号总数
     info.mp_all_count=session.query(Feed).distinct(Feed.id).count()
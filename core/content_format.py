@@ -1,7 +1,19 @@
- 
+
 from bs4 import BeautifulSoup
 import re
+import time
+import hashlib
+import threading
 from core.log import logger
+from core.config import cfg
+from core.lru_cache import LRUCache
+from core.print import print_error
+
+# 转换规则(下面format_content的参数或处理)变化时递增，已保存的转换结果随之失效
+CONVERTER_VERSION = 1
+# 需要转换并缓存的格式，html原样输出
+CACHED_FORMATS = ("text", "markdown")
+
 def format_content(content:str,content_format:str='html'):
     #格式化内容
     # content_format: 'text' or 'markdown' or 'html'
@@ -22,4 +34,130 @@ def format_content(content:str,content_format:str='html'):
             content = re.sub(r'\n+', '\n', content)
     except Exception as e:
         logger.error('format_content error: %s',e)
-    return content
\ No newline at end of file
+    return content
+
+class FormatStore:
+    """文章正文格式转换结果的缓存
+
+    转换结果按(文章ID, 格式)保存在article_formats表中，同时记录CONVERTER_VERSION
+    和源HTML的哈希，两者一致才视为有效，正文更新或转换规则变化后自动重新转换。
+    前面有一层进程内LRU，同一篇文章在RSS轮询和webhook推送中只转换一次。
+    """
+    def __init__(self):
+        self.memory = LRUCache(max_items=512, max_bytes=32 * 1024 * 1024, ttl=3600)
+        self._db = None
+        self._lock = threading.Lock()
+        self.memory_hits = 0
+        self.db_hits = 0
+        self.conversions = 0
+        self.total_cost = 0.0
+        self.errors = 0
+
+    def enabled(self) -> bool:
+        return bool(cfg.get("article.format_cache", True))
+
+    def get_db(self):
+        if self._db is None:
+            with self._lock:
+                if self._db is None:
+                    import core.db as db
+                    self._db = db.Db(tag="格式转换", role="content")
+        return self._db
+
+    def _load(self, article_id: str, fmt: str, digest: str):
+        from sqlalchemy import select
+        from core.models.article_format import ArticleFormat
+        with self.get_db().get_engine().connect() as conn:
+            return conn.execute(select(ArticleFormat.content).where(
+                ArticleFormat.article_id == article_id, ArticleFormat.format == fmt,
+                ArticleFormat.version == CONVERTER_VERSION, ArticleFormat.source_hash == digest)).scalar()
+
+    def _save(self, article_id: str, fmt: str, digest: str, content: str) -> None:
+        from sqlalchemy import delete, insert
+        from core.models.article_format import ArticleFormat
+        with self.get_db().get_engine().begin() as conn:
+            conn.execute(delete(ArticleFormat).where(
+                ArticleFormat.article_id == article_id, ArticleFormat.format == fmt))
+            conn.execute(insert(ArticleFormat).values(
+                article_id=article_id, format=fmt, version=CONVERTER_VERSION,
+                source_hash=digest, content=content, updated_at=int(time.time())))
+
+    def format(self, article_id: str, content: str, fmt: str = 'html') -> str:
+        """返回文章正文的fmt格式，优先使用缓存的转换结果"""
+        if fmt not in CACHED_FORMATS or not content or not article_id or not self.enabled():
+            return format_content(content, fmt)
+        article_id = str(article_id)
+        digest = hashlib.sha1(content.encode('utf-8')).hexdigest()
+        key = (article_id, fmt, digest)
+        cached = self.memory.get(key)
+        if cached is not None:
+            with self._lock:
+                self.memory_hits += 1
+            return cached
+        try:
+            cached = self._load(article_id, fmt, digest)
+        except Exception as e:
+            cached = None
+            with self._lock:
+                self.errors += 1
+            print_error(f"读取格式转换缓存失败: {e}")
+        if cached is not None:
+            with self._lock:
+                self.db_hits += 1
+            self.memory.set(key, cached)
+            return cached
+        start = time.perf_counter()
+        converted = format_content(content, fmt)
+        with self._lock:
+            self.conversions += 1
+            self.total_cost += time.perf_counter() - start
+        try:
+            self._save(article_id, fmt, digest, converted)
+        except Exception as e:
+            # 并发转换同一篇文章时主键冲突，结果相同，忽略即可
+            with self._lock:
+                self.errors += 1
+            logger.warning('save article format error: %s', e)
+        self.memory.set(key, converted)
+        return converted
+
+    def prefetch_formats(self) -> list:
+        value = cfg.get("article.format_prefetch", "") or ""
+        if isinstance(value, str):
+            value = value.split(",")
+        return [f.strip() for f in value if f and f.strip() in CACHED_FORMATS]
+
+    def prefetch(self, article_id: str, content: str) -> None:
+        """入库时按article.format_prefetch预先转换，推送和订阅源直接使用结果"""
+        if not content or content == "DELETED":
+            return
+        for fmt in self.prefetch_formats():
+            self.format(article_id, content, fmt)
+
+    def invalidate(self, article_id: str) -> None:
+        """删除文章的全部转换结果"""
+        from sqlalchemy import delete
+        from core.models.article_format import ArticleFormat
+        article_id = str(article_id)
+        self.memory.invalidate(lambda k: k[0] == article_id)
+        try:
+            with self.get_db().get_engine().begin() as conn:
+                conn.execute(delete(ArticleFormat).where(ArticleFormat.article_id == article_id))
+        except Exception as e:
+            print_error(f"删除格式转换缓存失败: {e}")
+
+    def info(self) -> dict:
+        with self._lock:
+            return {
+                'enabled': self.enabled(),
+                'version': CONVERTER_VERSION,
+                'prefetch': self.prefetch_formats(),
+                'memory_hits': self.memory_hits,
+                'db_hits': self.db_hits,
+                'conversions': self.conversions,
+                'avg': round(self.total_cost / self.conversions, 3) if self.conversions else 0,
+                'errors': self.errors,
+                'memory': self.memory.info(),
+            }
+
+FORMAT_STORE = FormatStore()
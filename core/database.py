@@ -1,3 +1,3 @@
 from core.db import DB
 def get_db():
-    return DB.get_session()
\ No newline at end of file
+    yield from DB.session_dependency()
\ No newline at end of file
@@ -6,16 +6,87 @@ from .models import Feed, Article
 from .config import cfg
 from core.models.base import Base  
 from core.print import print_warning,print_info,print_error,print_success
+from core.feed_store import FEED_STORE
+import os
+import threading
 # 声明基类
 # Base = declarative_base()
 
+def make_article_id(mp_id:str,aid:str)->str:
+    """文章入库使用的主键：公众号ID-文章ID，去掉MP_WXS_前缀"""
+    if not aid:
+        return aid
+    return f"{str(mp_id)}-{aid}".replace("MP_WXS_","")
+
+# 连接池角色：api接口请求、scheduler定时采集、content内容同步
+POOL_ROLES={
+    "api":{"size":5,"max_overflow":10},
+    "scheduler":{"size":2,"max_overflow":5},
+    "content":{"size":1,"max_overflow":2},
+}
+# (连接字符串, 角色) -> Engine，同一进程内所有Db实例共享
+_ENGINES={}
+_ENGINES_LOCK=threading.Lock()
+
+def get_shared_engine(con_str:str,role:str="api")->Engine:
+    """按连接字符串和角色获取共享的数据库引擎，首次获取时创建"""
+    if role not in POOL_ROLES:
+        role="api"
+    key=(con_str,role)
+    with _ENGINES_LOCK:
+        engine=_ENGINES.get(key)
+        if engine is not None:
+            return engine
+        # 检查SQLite数据库文件是否存在
+        if con_str.startswith('sqlite:///'):
+            db_path = con_str[10:]  # 去掉'sqlite:///'前缀
+            if not os.path.exists(db_path):
+                try:
+                    os.makedirs(os.path.dirname(db_path), exist_ok=True)
+                except Exception as e:
+                    pass
+                open(db_path, 'w').close()
+        pool=POOL_ROLES[role]
+        engine = create_engine(con_str,
+                                 pool_size=int(cfg.get(f"db_pool.{role}.size",pool["size"]) or pool["size"]),          # 最小空闲连接数
+                                 max_overflow=int(cfg.get(f"db_pool.{role}.max_overflow",pool["max_overflow"]) or 0),      # 允许的最大溢出连接数
+                                 pool_timeout=int(cfg.get("db_pool.timeout",30) or 30),      # 获取连接时的超时时间（秒）
+                                 echo=False,
+                                 pool_recycle=int(cfg.get("db_pool.recycle",1800) or 1800),  # 连接池回收时间（秒）
+                                 pool_pre_ping=bool(cfg.get("db_pool.pre_ping",True)),  # 借出连接前检测可用性，断线自动重连
+                                 isolation_level="AUTOCOMMIT",  # 设置隔离级别
+                                #  isolation_level="READ COMMITTED",  # 设置隔离级别
+                                #  query_cache_size=0,
+                                 connect_args={"check_same_thread": False} if con_str.startswith('sqlite:///') else {}
+                                 )
+        _ENGINES[key]=engine
+        return engine
+
+def pool_status()->List[dict]:
+    """各共享连接池的使用情况"""
+    with _ENGINES_LOCK:
+        items=list(_ENGINES.items())
+    status=[]
+    for (con_str,role),engine in items:
+        pool=engine.pool
+        info={"role":role,"dialect":engine.dialect.name,"pool":pool.__class__.__name__}
+        for name in ("size","checkedin","checkedout","overflow"):
+            fn=getattr(pool,name,None)
+            info[name]=fn() if callable(fn) else None
+        # QueuePool未用满时overflow为负数
+        if info["overflow"] is not None:
+            info["overflow"]=max(0,info["overflow"])
+        status.append(info)
+    return status
+
 class Db:
     connection_str: str=None
-    def __init__(self,tag:str="默认",User_In_Thread=True):
+    def __init__(self,tag:str="默认",User_In_Thread=True,role:str="api"):
         self.Session= None
         self.engine = None
         self.User_In_Thread=User_In_Thread
         self.tag=tag
+        self.role=role
         print_success(f"[{tag}]连接初始化")
         self.init(cfg.get("db"))
     def get_engine(self) -> Engine:
@@ -29,27 +100,7 @@ class Db:
         """Initialize database connection and create tables"""
         try:
             self.connection_str=con_str
-            # 检查SQLite数据库文件是否存在
-            if con_str.startswith('sqlite:///'):
-                import os
-                db_path = con_str[10:]  # 去掉'sqlite:///'前缀
-                if not os.path.exists(db_path):
-                    try:
-                        os.makedirs(os.path.dirname(db_path), exist_ok=True)
-                    except Exception as e:
-                        pass
-                    open(db_path, 'w').close()
-            self.engine = create_engine(con_str,
-                                     pool_size=2,          # 最小空闲连接数
-                                     max_overflow=20,      # 允许的最大溢出连接数
-                                     pool_timeout=30,      # 获取连接时的超时时间（秒）
-                                     echo=False,
-                                     pool_recycle=60,  # 连接池回收时间（秒）
-                                     isolation_level="AUTOCOMMIT",  # 设置隔离级别
-                                    #  isolation_level="READ COMMITTED",  # 设置隔离级别
-                                    #  query_cache_size=0,
-                                     connect_args={"check_same_thread": False} if con_str.startswith('sqlite:///') else {}
-                                     )
+            self.engine = get_shared_engine(con_str,self.role)
             self.session_factory=self.get_session_factory()
         except Exception as e:
             print(f"Error creating database connection: {e}")
@@ -78,13 +129,13 @@ class Db:
     def delete_article(self,article_data:dict)->bool:
         try:
             art = Article(**article_data)
-            if art.id:
-               art.id=f"{str(art.mp_id)}-{art.id}".replace("MP_WXS_","")
+            art.id=make_article_id(art.mp_id,art.id)
             session=DB.get_session()
             article = session.query(Article).filter(Article.id == art.id).first()
             if article is not None:
                 session.delete(article)
                 session.commit()
+                FEED_STORE.touch(art.mp_id)
                 return True
         except Exception as e:
             print_error(f"delete article:{str(e)}")
@@ -96,8 +147,7 @@ class Db:
             session=self.get_session()
             from datetime import datetime
             art = Article(**article_data)
-            if art.id:
-               art.id=f"{str(art.mp_id)}-{art.id}".replace("MP_WXS_","")
+            art.id=make_article_id(art.mp_id,art.id)
             if art.created_at is None:
                 art.created_at=datetime.now().strftime('%Y-%m-%d %H:%M:%S')
             if art.updated_at is None:
@@ -110,7 +160,9 @@ class Db:
             session.add(art)
             # self._session.merge(art)
             sta=session.commit()
-            
+            # 通知订阅源存储该公众号有新文章
+            FEED_STORE.touch(art.mp_id)
+
         except Exception as e:
             if "UNIQUE" in str(e) or "Duplicate entry" in str(e):
                 print_warning(f"Article already exists: {art.id}")
@@ -119,6 +171,78 @@ class Db:
             return False
         return True    
         
+    def _insert_ignore(self):
+        """按数据库方言生成忽略主键冲突的批量插入语句"""
+        table=Article.__table__
+        dialect=self.engine.dialect.name
+        if dialect=="sqlite":
+            from sqlalchemy.dialects.sqlite import insert
+            return insert(table).on_conflict_do_nothing(index_elements=["id"])
+        if dialect=="postgresql":
+            from sqlalchemy.dialects.postgresql import insert
+            return insert(table).on_conflict_do_nothing(index_elements=["id"])
+        from sqlalchemy import insert
+        if dialect in ("mysql","mariadb"):
+            return insert(table).prefix_with("IGNORE")
+        return insert(table)
+
+    def add_articles(self, articles_data: List[dict]) -> dict:
+        """批量添加文章，一页文章只做一次存在性查询、一次插入和一次提交
+
+        Args:
+            articles_data: 文章数据列表，格式同add_article
+
+        Returns:
+            {"inserted": [新增的文章ID], "skipped": [已存在的文章ID], "failed": [写入失败的文章ID]}
+        """
+        from datetime import datetime
+        from core.models.base import DATA_STATUS
+        result={"inserted":[],"skipped":[],"failed":[]}
+        now=datetime.now()
+        # executemany要求每行的列一致，缺省列按模型默认值补齐
+        defaults={c.name:(c.default.arg if c.default is not None and c.default.is_scalar else None) for c in Article.__table__.columns}
+        rows={}
+        for data in articles_data:
+            row={c:data.get(c,default) for c,default in defaults.items()}
+            row["id"]=make_article_id(row["mp_id"],row["id"])
+            for key in ("created_at","updated_at"):
+                value=row.get(key)
+                if value is None:
+                    row[key]=now
+                elif isinstance(value,str):
+                    row[key]=datetime.fromisoformat(value)
+            row["status"]=DATA_STATUS.ACTIVE
+            # 批量插入不经过ORM属性事件，这里同步维护has_content
+            row["has_content"]=1 if row["content"] else 0
+            if row["id"] in rows:
+                result["skipped"].append(row["id"])
+                continue
+            rows[row["id"]]=row
+        if not rows:
+            return result
+        session=self.get_session()
+        try:
+            existing={r[0] for r in session.query(Article.id).filter(Article.id.in_(list(rows.keys()))).all()}
+            new_rows=[row for id,row in rows.items() if id not in existing]
+            result["skipped"].extend(existing)
+            if new_rows:
+                session.execute(self._insert_ignore(),new_rows)
+            session.commit()
+            result["inserted"]=[row["id"] for row in new_rows]
+        except Exception as e:
+            session.rollback()
+            print_error(f"Failed to add articles: {e}")
+            # 写入失败与已存在区分开，调用方不能把这些文章当作已入库
+            result["inserted"]=[]
+            result["skipped"]=[]
+            result["failed"]=list(rows.keys())
+            return result
+        for mp_id in {row["mp_id"] for row in new_rows}:
+            FEED_STORE.touch(mp_id)
+        if result["skipped"]:
+            print_warning(f"Articles already exist: {len(result['skipped'])}")
+        return result
+
     def get_articles(self, id:str=None, limit:int=30, offset:int=0) -> List[Article]:
         try:
             data = self.get_session().query(Article).limit(limit).offset(offset)
@@ -201,17 +325,7 @@ class Db:
             print_info(f"[{self.tag}] Session is already closed.")
             _session()
             return self.Session()
-        # 检查数据库连接是否已断开
-        try:
-            from core.models import User
-            # 尝试执行一个简单的查询来检查连接状态
-            session.query(User.id).count()
-        except Exception as e:
-            from core.print import print_warning
-            print_warning(f"[{self.tag}] Database connection lost: {e}. Reconnecting...")
-            self.init(self.connection_str)
-            _session()
-            return self.Session()
+        # 连接可用性由连接池pre_ping在借出时检测，这里不再逐次查询
         return session
     def auto_refresh(self):
         # 定义一个事件监听器，在对象更新后自动刷新
@@ -223,12 +337,14 @@ class Db:
         
     def session_dependency(self):
         """FastAPI依赖项，用于请求范围的会话管理"""
-        session = self.get_session()
+        session = self.session_factory()
         try:
             yield session
+        except Exception:
+            session.rollback()
+            raise
         finally:
-            session.remove()
+            session.close()
 
 # 全局数据库实例
-DB = Db(User_In_Thread=True)
-DB.init(cfg.get("db"))
\ No newline at end of file
+DB = Db(User_In_Thread=True)
\ No newline at end of file
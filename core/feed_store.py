@@ -0,0 +1,125 @@
+import os
+import time
+from typing import Optional
+from core.config import cfg
+from core.lru_cache import LRUCache
+from core.print import print_warning
+
+
+class FeedStore:
+    """订阅源渲染结果存储
+
+    data/cache/rss 下的渲染文件即为各订阅源的物化结果。文章入库时只为对应公众号
+    (以及聚合源 all)刷新一个更新戳(stamp)文件，读取时只要渲染文件的时间不早于
+    依赖的更新戳就直接返回，不再查询数据库、不再重新序列化。
+
+    文件之前还有一层进程内LRU+TTL缓存，键与缓存文件名一致
+    ({tag_id}_{feed_id}_{limit}_{offset}.{ext})，值为(依赖的更新戳ID, 渲染时间, 内容)，
+    命中时不打开文件；本进程内的文章入库立即刷新内存中的更新戳，其他进程的入库
+    通过更新戳文件在stamp_ttl秒内感知。缓存键和更新戳ID来自请求参数，两者都有容量上限。
+    """
+    ALL = "all"
+
+    def __init__(self, cache_dir: str = "data/cache/rss"):
+        self.cache_dir = os.path.normpath(cache_dir)
+        self.stamp_dir = os.path.normpath(f"{self.cache_dir}/stamp")
+        os.makedirs(self.stamp_dir, exist_ok=True)
+        self.memory = LRUCache(
+            max_items=int(cfg.get("rss.cache_items", 256) or 256),
+            max_bytes=int(cfg.get("rss.cache_mb", 64) or 64) * 1024 * 1024,
+            ttl=int(cfg.get("rss.cache_ttl", 300) or 300),
+        )
+        self.stamp_ttl = float(cfg.get("rss.stamp_ttl", 1) or 0)
+        # 更新戳ID -> (修改时间, 检查时间)
+        self._stamps = LRUCache(max_items=int(cfg.get("rss.stamp_items", 4096) or 4096), ttl=0)
+
+    def _stamp_path(self, feed_id: str) -> str:
+        path = os.path.normpath(f"{self.stamp_dir}/{feed_id}")
+        if not path.startswith(self.stamp_dir):
+            raise ValueError("Invalid stamp path: Path traversal detected.")
+        return path
+
+    def touch(self, feed_id: str = None) -> None:
+        """标记订阅源内容已变更，并使本进程内相关的内存缓存失效
+
+        Args:
+            feed_id: 公众号ID，聚合源all总是会一并刷新
+        """
+        now = time.time()
+        ids = {str(feed_id or self.ALL), self.ALL}
+        for fid in ids:
+            try:
+                path = self._stamp_path(fid)
+                with open(path, "a"):
+                    pass
+                os.utime(path, (now, now))
+            except Exception as e:
+                print_warning(f"刷新订阅源更新戳失败 {fid}: {e}")
+        # 内存中早于新更新戳的渲染结果在下次读取时判定为过期
+        for fid in ids:
+            self._stamps.set(fid, (now, now))
+
+    def stamp(self, feed_id: str) -> float:
+        """返回订阅源最后一次变更的时间戳，从未变更返回0"""
+        feed_id = feed_id or self.ALL
+        now = time.time()
+        memo = self._stamps.get(feed_id)
+        if memo is not None and now - memo[1] < self.stamp_ttl:
+            return memo[0]
+        try:
+            mtime = os.stat(self._stamp_path(feed_id)).st_mtime
+        except (OSError, ValueError):
+            mtime = 0
+        self._stamps.set(feed_id, (mtime, now))
+        return mtime
+
+    def depend_id(self, feed_id: str = None, tag_id: str = None) -> str:
+        """渲染结果依赖的更新戳，单个公众号依赖自身，聚合源和标签源依赖all"""
+        if feed_id in (None, "", self.ALL) or tag_id:
+            return self.ALL
+        return str(feed_id)
+
+    def lookup(self, rss_file: str, depend_id: str) -> Optional[tuple]:
+        """读取仍然有效的渲染结果，返回(内容, 渲染时间)，过期或不存在返回None"""
+        key = os.path.basename(rss_file)
+        stamp = self.stamp(depend_id)
+        entry = self.memory.get(key)
+        if entry is not None:
+            depend, rendered_at, text = entry
+            if depend == depend_id and rendered_at >= stamp:
+                return text, rendered_at
+            self.memory.delete(key)
+        try:
+            rendered_at = os.stat(rss_file).st_mtime
+            if rendered_at < stamp:
+                return None
+            with open(rss_file, "r", encoding="utf-8", newline="") as f:
+                text = f.read()
+        except (OSError, ValueError):
+            return None
+        self.memory.set(key, (depend_id, rendered_at, text))
+        return text, rendered_at
+
+    def get(self, rss_file: str, depend_id: str) -> Optional[str]:
+        """读取仍然有效的渲染结果，过期或不存在返回None"""
+        entry = self.lookup(rss_file, depend_id)
+        return entry[0] if entry is not None else None
+
+    def mark(self, rss_file: str, started_at: float) -> None:
+        """把渲染文件的时间回拨到开始查询数据库的时刻
+
+        渲染期间如有新文章入库，其更新戳会晚于该时刻，下次读取时即可判定为过期
+        """
+        try:
+            os.utime(rss_file, (started_at, started_at))
+        except OSError:
+            pass
+
+    def info(self) -> dict:
+        info = self.memory.info()
+        info['stamp_ttl'] = self.stamp_ttl
+        info['stamps'] = self._stamps.info()['items']
+        return info
+
+
+FEED_STORE = FeedStore()
@@ -0,0 +1,198 @@
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Tuple
+
+# 耗时直方图的默认分桶(秒)，覆盖毫秒级数据库写入到分钟级的公众号采集
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+
+class Histogram:
+    """累计分桶直方图，与Prometheus histogram的语义一致"""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * len(self.buckets)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+        self.last = 0.0
+
+    def observe(self, value: float) -> None:
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+        self.last = value
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+
+    def cumulative(self) -> List[Tuple[float, int]]:
+        total = 0
+        result = []
+        for bound, count in zip(self.buckets, self.counts):
+            total += count
+            result.append((bound, total))
+        return result
+
+    def quantile(self, q: float) -> float:
+        """按分桶估算分位数，返回所在分桶的上界"""
+        if not self.count:
+            return 0
+        target = q * self.count
+        for bound, total in self.cumulative():
+            if total >= target:
+                return bound
+        return self.max
+
+    def info(self) -> dict:
+        return {
+            'count': self.count,
+            'sum': round(self.sum, 3),
+            'avg': round(self.sum / self.count, 3) if self.count else 0,
+            'p50': self.quantile(0.5),
+            'p95': self.quantile(0.95),
+            'max': round(self.max, 3),
+            'last': round(self.last, 3),
+        }
+
+
+def _label_key(labels: dict) -> tuple:
+    return tuple(sorted((k, str(v)) for k, v in (labels or {}).items()))
+
+
+def _format_labels(key: tuple, extra: tuple = ()) -> str:
+    items = list(key) + list(extra)
+    if not items:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n") for _, v in items)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(items, escaped)) + "}"
+
+
+class Metrics:
+    """进程内指标：计数器、瞬时值和耗时直方图
+
+    指标名与标签组合唯一确定一个序列，可导出为JSON或Prometheus文本格式。
+    collector在导出时调用，用于调度器下次运行时间这类随时变化的值。
+    """
+
+    def __init__(self, prefix: str = "werss"):
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self._counters: Dict[str, Dict[tuple, float]] = {}
+        self._gauges: Dict[str, Dict[tuple, float]] = {}
+        self._histograms: Dict[str, Dict[tuple, Histogram]] = {}
+        self._help: Dict[str, str] = {}
+        self._collectors: List[Callable[[], List[Tuple[str, dict, float]]]] = []
+
+    def describe(self, name: str, text: str) -> None:
+        self._help[name] = text
+
+    def inc(self, name: str, labels: dict = None, value: float = 1) -> None:
+        key = _label_key(labels)
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+
+    def set(self, name: str, labels: dict = None, value: float = 0) -> None:
+        with self._lock:
+            self._gauges.setdefault(name, {})[_label_key(labels)] = value
+
+    def observe(self, name: str, labels: dict = None, value: float = 0) -> None:
+        key = _label_key(labels)
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            hist = series.get(key)
+            if hist is None:
+                hist = series[key] = Histogram()
+            hist.observe(value)
+
+    @contextmanager
+    def timer(self, name: str, labels: dict = None):
+        """记录代码块耗时，异常时同样记录并计入{name}_errors"""
+        start = time.perf_counter()
+        try:
+            yield
+        except Exception:
+            self.inc(f"{name}_errors", labels)
+            raise
+        finally:
+            self.observe(name, labels, time.perf_counter() - start)
+
+    def add_collector(self, collector: Callable[[], List[Tuple[str, dict, float]]]) -> None:
+        """collector返回[(指标名, 标签, 值)]，作为瞬时值导出"""
+        with self._lock:
+            self._collectors.append(collector)
+
+    def _collect(self) -> Dict[str, Dict[tuple, float]]:
+        with self._lock:
+            gauges = {name: dict(series) for name, series in self._gauges.items()}
+            collectors = list(self._collectors)
+        for collector in collectors:
+            try:
+                for name, labels, value in collector():
+                    gauges.setdefault(name, {})[_label_key(labels)] = value
+            except Exception:
+                continue
+        return gauges
+
+    def snapshot(self) -> dict:
+        gauges = self._collect()
+        with self._lock:
+            return {
+                'counters': {name: [{'labels': dict(k), 'value': v} for k, v in series.items()]
+                             for name, series in self._counters.items()},
+                'gauges': {name: [{'labels': dict(k), 'value': v} for k, v in series.items()]
+                           for name, series in gauges.items()},
+                'histograms': {name: [{'labels': dict(k), **h.info()} for k, h in series.items()]
+                               for name, series in self._histograms.items()},
+            }
+
+    def prometheus(self) -> str:
+        gauges = self._collect()
+        lines = []
+
+        def header(name: str, kind: str, suffix: str = "", help_key: str = None):
+            full = f"{self.prefix}_{name}{suffix}"
+            help_key = help_key or name
+            if help_key in self._help:
+                lines.append(f"# HELP {full} {self._help[help_key]}")
+            lines.append(f"# TYPE {full} {kind}")
+            return full
+
+        with self._lock:
+            for name, series in sorted(self._counters.items()):
+                # 0.0.4文本格式中TYPE行必须与样本同名，计数器样本统一带_total后缀
+                base = name[:-len("_total")] if name.endswith("_total") else name
+                full = header(base, "counter", "_total", name)
+                for key, value in series.items():
+                    lines.append(f"{full}{_format_labels(key)} {value}")
+            for name, series in sorted(gauges.items()):
+                full = header(name, "gauge")
+                for key, value in series.items():
+                    lines.append(f"{full}{_format_labels(key)} {value}")
+            for name, series in sorted(self._histograms.items()):
+                full = header(name, "histogram")
+                for key, hist in series.items():
+                    for bound, total in hist.cumulative():
+                        lines.append(f"{full}_bucket{_format_labels(key, (('le', bound),))} {total}")
+                    lines.append(f"{full}_bucket{_format_labels(key, (('le', '+Inf'),))} {hist.count}")
+                    lines.append(f"{full}_sum{_format_labels(key)} {hist.sum}")
+                    lines.append(f"{full}_count{_format_labels(key)} {hist.count}")
+        return "\n".join(lines) + "\n"
+
+
+METRICS = Metrics()
+METRICS.describe("queue_wait_seconds", "任务在队列中等待的时间")
+METRICS.describe("queue_run_seconds", "队列任务执行耗时")
+METRICS.describe("queue_tasks", "队列任务执行次数")
+METRICS.describe("scheduler_job_seconds", "定时任务触发函数的执行耗时")
+METRICS.describe("scheduler_runs", "定时任务执行次数")
+METRICS.describe("scheduler_last_run_timestamp", "定时任务上次执行时间")
+METRICS.describe("scheduler_next_run_timestamp", "定时任务下次执行时间")
+METRICS.describe("wx_request_seconds", "公众号平台接口请求耗时")
+METRICS.describe("content_fetch_seconds", "文章正文抓取耗时")
+METRICS.describe("db_write_seconds", "文章入库耗时")
+METRICS.describe("webhook_seconds", "消息推送耗时")
+METRICS.describe("feed_gather_seconds", "单个公众号采集总耗时")
@@ -1,5 +1,7 @@
 # 导入文章模型
 from .article import Article 
+# 导入文章格式转换结果模型
+from .article_format import ArticleFormat
 # 导入订阅源模型
 from .feed import Feed
 # 导入用户模型
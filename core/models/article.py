@@ -1,4 +1,5 @@
 from  .base import Base,Column,String,Integer,DateTime,Text,DATA_STATUS
+from sqlalchemy import Index,event
 class ArticleBase(Base):
     from_attributes = True
     __tablename__ = 'articles'
@@ -13,5 +14,22 @@ class ArticleBase(Base):
     created_at = Column(DateTime)
     updated_at = Column(DateTime)  
     is_export = Column(Integer)
+    # 正文是否已采集，随content赋值自动维护，避免按大字段content判空扫描全表
+    has_content = Column(Integer,default=0)
+    # 内容补全任务：已尝试次数，以及下次可领取的时间(秒级时间戳)，领取时写入租约到期时间
+    content_attempts = Column(Integer,default=0)
+    content_retry_at = Column(Integer,default=0)
+    __table_args__ = (
+        # 单个公众号的订阅源：按mp_id过滤，按发布时间倒序
+        Index('ix_articles_mp_id_publish_time','mp_id','publish_time'),
+        # 文章列表：按状态过滤，按发布时间倒序
+        Index('ix_articles_status_publish_time','status','publish_time'),
+        # 内容补全任务：查找未采集正文的文章
+        Index('ix_articles_has_content_publish_time','has_content','publish_time'),
+    )
 class Article(ArticleBase):
     content = Column(Text)
+
+@event.listens_for(Article.content,'set')
+def _sync_has_content(target,value,oldvalue,initiator):
+    target.has_content=1 if value else 0
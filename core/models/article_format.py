@@ -0,0 +1,15 @@
+from .base import Base,Column,String,Integer,Text
+class ArticleFormat(Base):
+    """文章正文的格式转换结果(markdown/text)
+
+    每篇文章每种格式一条，记录转换器版本和源HTML的哈希，
+    版本或正文变化后视为失效，下次使用时重新转换并覆盖
+    """
+    from_attributes = True
+    __tablename__ = 'article_formats'
+    article_id = Column(String(255), primary_key=True)
+    format = Column(String(20), primary_key=True)
+    version = Column(Integer,default=0)
+    source_hash = Column(String(40))
+    content = Column(Text)
+    updated_at = Column(Integer)
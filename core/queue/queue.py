@@ -1,36 +1,295 @@
 import queue
 import threading
 import time
-import gc
+import uuid
+import json
+import os
+import sqlite3
+import importlib
+import itertools
 from typing import Callable, Any, Optional
+from core.config import cfg
+from core.metrics import METRICS
 from core.print import print_error, print_info, print_warning, print_success
+
+
+class QueueTask:
+    """队列中的一个任务"""
+
+    def __init__(self, task: Callable[..., Any], args: tuple, kwargs: dict, priority: int = 0,
+                 key: str = None, task_id: str = None, persist: bool = False):
+        self.id = task_id or uuid.uuid4().hex
+        self.task = task
+        self.args = args
+        self.kwargs = kwargs
+        self.priority = priority
+        self.key = key
+        self.persist = persist
+        self.created = time.time()
+        self.started = 0.0
+        self.cancelled = False
+
+    @property
+    def name(self) -> str:
+        return getattr(self.task, "__qualname__", repr(self.task))
+
+    def info(self) -> dict:
+        return {
+            'id': self.id,
+            'name': self.name,
+            'key': self.key,
+            'priority': self.priority,
+            'waited': round((self.started or time.time()) - self.created, 2),
+        }
+
+
+def task_path(task: Callable[..., Any]) -> Optional[str]:
+    """模块级函数返回"模块:函数名"，其他可调用对象无法持久化返回None"""
+    module = getattr(task, "__module__", None)
+    qualname = getattr(task, "__qualname__", "")
+    if not module or not qualname or "." in qualname or "<" in qualname:
+        return None
+    return f"{module}:{qualname}"
+
+
+def load_task(path: str) -> Callable[..., Any]:
+    module, name = path.split(":", 1)
+    return getattr(importlib.import_module(module), name)
+
+
+class QueueStore:
+    """把等待中的任务保存到SQLite，重启后恢复"""
+
+    def __init__(self, path: str):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._lock = threading.Lock()
+        self._conn.execute("""CREATE TABLE IF NOT EXISTS queue_tasks (
+            id TEXT PRIMARY KEY, queue TEXT, task TEXT, args TEXT, kwargs TEXT,
+            priority INTEGER, task_key TEXT, created REAL)""")
+
+    def save(self, name: str, item: QueueTask) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO queue_tasks VALUES (?,?,?,?,?,?,?,?)",
+                (item.id, name, task_path(item.task), json.dumps(list(item.args)), json.dumps(item.kwargs),
+                 item.priority, item.key, item.created))
+
+    def remove(self, task_id: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM queue_tasks WHERE id=?", (task_id,))
+
+    def load(self, name: str) -> list:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, task, args, kwargs, priority, task_key, created FROM queue_tasks WHERE queue=? ORDER BY created",
+                (name,)).fetchall()
+        items = []
+        for task_id, path, args, kwargs, priority, key, created in rows:
+            try:
+                item = QueueTask(load_task(path), tuple(json.loads(args)), json.loads(kwargs),
+                                 priority=priority, key=key, task_id=task_id, persist=True)
+                item.created = created
+                items.append(item)
+            except Exception as e:
+                # 保留记录，下次启动时再尝试恢复
+                print_error(f"恢复队列任务失败({path}): {e}")
+        return items
+
+
 class TaskQueueManager:
-    """任务队列管理器，用于管理和执行排队任务"""
-    
-    def __init__(self,maxsize=0,tag:str=""):
+    """任务队列管理器，用于管理和执行排队任务
+
+    多个工作线程按优先级(数值大的先执行)和入队顺序取任务；带key的任务在等待或执行期间
+    不会重复入队；等待中的任务可按ID取消。启用queue.persist时，
+    参数可JSON序列化的模块级函数任务会保存到SQLite，重启后继续执行。
+    """
+
+    def __init__(self, maxsize=0, tag: str = "", workers: int = None, name: str = "default"):
         """初始化任务队列"""
-        self._queue = queue.Queue(maxsize=maxsize)
+        self._queue = queue.PriorityQueue(maxsize=maxsize)
         self._lock = threading.Lock()
         self._is_running = False
-        self.tag=tag
-        
-    def add_task(self, task: Callable[..., Any], *args: Any, **kwargs: Any) -> None:
+        self._threads = []
+        self._seq = itertools.count()
+        self._tasks = {}
+        self._keys = {}
+        self._running = {}
+        self.tag = tag
+        self.name = name
+        self.workers = workers
+        self.completed = 0
+        self.failed = 0
+        self.cancelled = 0
+        self.deduped = 0
+        self._store = None
+        self._restored = False
+        if cfg.get("queue.persist", False):
+            try:
+                self._store = QueueStore(cfg.get("queue.persist_path", "./data/queue.db"))
+            except Exception as e:
+                print_error(f"队列持久化初始化失败: {e}")
+
+    def get_workers(self) -> int:
+        return max(1, int(self.workers or cfg.get("queue.workers", 0) or cfg.get("gather.concurrency", 4) or 1))
+
+    def _put(self, item: QueueTask) -> None:
+        # 同优先级按入队顺序执行
+        self._queue.put((-item.priority, next(self._seq), item))
+
+    def submit(self, task: Callable[..., Any], args: tuple = (), kwargs: dict = None, priority: int = 0,
+               key: str = None, persist: bool = True) -> Optional[str]:
         """添加任务到队列
-        
+
+        Args:
+            task: 要执行的任务函数
+            args: 任务函数的参数
+            kwargs: 任务函数的关键字参数
+            priority: 优先级，数值大的先执行
+            key: 去重键，同一key的任务在等待或执行期间再次添加会被忽略
+            persist: 启用持久化时是否保存该任务
+
+        Returns:
+            任务ID，因重复被忽略时返回None
+        """
+        item = QueueTask(task, tuple(args), dict(kwargs or {}), priority=priority, key=key)
+        with self._lock:
+            if key is not None and key in self._keys:
+                self.deduped += 1
+                print_warning(f"{self.tag}任务[{key}]已在队列中，忽略")
+                return None
+            if key is not None:
+                self._keys[key] = item.id
+            self._tasks[item.id] = item
+            if persist and self._store is not None and task_path(task):
+                try:
+                    self._store.save(self.name, item)
+                    item.persist = True
+                except (TypeError, ValueError, sqlite3.Error) as e:
+                    print_warning(f"{self.tag}任务[{item.name}]无法持久化: {e}")
+        self._put(item)
+        print_success(f"{self.tag}队列任务添加成功\n")
+        return item.id
+
+    def add_task(self, task: Callable[..., Any], *args: Any, **kwargs: Any) -> Optional[str]:
+        """添加任务到队列
+
         Args:
             task: 要执行的任务函数
             *args: 任务函数的参数
             **kwargs: 任务函数的关键字参数
         """
+        return self.submit(task, args, kwargs)
+
+    def _release(self, item: QueueTask) -> None:
+        """任务结束或取消后释放去重键和持久化记录，调用方需持有锁"""
+        self._tasks.pop(item.id, None)
+        self._running.pop(item.id, None)
+        if item.key is not None and self._keys.get(item.key) == item.id:
+            del self._keys[item.key]
+        if item.persist and self._store is not None:
+            try:
+                self._store.remove(item.id)
+            except sqlite3.Error as e:
+                print_error(f"删除持久化任务失败: {e}")
+
+    def has_key(self, key: str) -> bool:
+        """是否有该key的任务在等待或执行"""
+        with self._lock:
+            return key in self._keys
+
+    def cancel(self, task_id: str) -> bool:
+        """取消等待中的任务，正在执行的任务无法取消"""
+        with self._lock:
+            item = self._tasks.get(task_id)
+            if item is None or item.id in self._running:
+                return False
+            item.cancelled = True
+            self.cancelled += 1
+            self._release(item)
+        return True
+
+    def restore(self) -> None:
+        """恢复持久化的等待任务
+
+        任务函数需要按模块路径重新导入，必须在所有模块加载完成后调用(由start_all_task调用)，
+        在队列模块导入时恢复会因循环导入失败。重复调用只恢复一次。
+        """
+        if self._store is None:
+            return
         with self._lock:
-            self._queue.put((task, args, kwargs))
-        print_success(f"{self.tag}队列任务添加成功\n")
-    def run_task_background(self)->None:
-        threading.Thread(target=self.run_tasks, daemon=True).start()  
-        print_warning("队列任务后台运行")
+            if self._restored:
+                return
+            self._restored = True
+        items = self._store.load(self.name)
+        with self._lock:
+            # 恢复前已重新提交的任务不再重复加入
+            items = [item for item in items if item.id not in self._tasks
+                     and (item.key is None or item.key not in self._keys)]
+            for item in items:
+                if item.key is not None:
+                    self._keys[item.key] = item.id
+                self._tasks[item.id] = item
+        for item in items:
+            self._put(item)
+        if items:
+            print_info(f"{self.tag}恢复{len(items)}个未执行的任务")
+
+    def run_task_background(self) -> None:
+        with self._lock:
+            if self._is_running:
+                return
+            self._is_running = True
+        for i in range(self.get_workers()):
+            t = threading.Thread(target=self._worker, name=f"queue-{self.name}-{i}", daemon=True)
+            t.start()
+            self._threads.append(t)
+        print_warning(f"队列任务后台运行，工作线程{self.get_workers()}个")
+
+    def _execute(self, item: QueueTask) -> None:
+        with self._lock:
+            if item.cancelled:
+                return
+            item.started = time.time()
+            self._running[item.id] = item
+        labels = {"queue": self.name, "task": item.name}
+        METRICS.observe("queue_wait_seconds", labels, item.started - item.created)
+        ok = False
+        # 记录任务开始时间
+        start_time = time.time()
+        try:
+            item.task(*item.args, **item.kwargs)
+            ok = True
+            print_info(f"\n任务执行完成，耗时: {time.time() - start_time:.2f}秒")
+        except Exception as e:
+            print_error(f"队列任务执行失败: {e}")
+        finally:
+            # 记录任务执行时间
+            METRICS.observe("queue_run_seconds", labels, time.time() - start_time)
+            METRICS.inc("queue_tasks", {**labels, "status": "ok" if ok else "failed"})
+            with self._lock:
+                if ok:
+                    self.completed += 1
+                else:
+                    self.failed += 1
+                self._release(item)
+
+    def _worker(self, timeout: float = 1.0) -> None:
+        while self._is_running:
+            try:
+                # 阻塞获取任务，避免CPU空转
+                _, _, item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                # 超时无任务，继续检查运行状态
+                continue
+            try:
+                self._execute(item)
+            finally:
+                self._queue.task_done()
+
     def run_tasks(self, timeout: float = 1.0) -> None:
-        """执行队列中的所有任务，并持续运行以接收新任务
-        
+        """在当前线程中执行队列中的任务，并持续运行以接收新任务
+
         Args:
             timeout: 等待新任务的超时时间(秒)
         """
@@ -38,83 +297,66 @@ class TaskQueueManager:
             if self._is_running:
                 return
             self._is_running = True
-            
         try:
-            while self._is_running:
-                time.sleep(0.1)  # 避免过于频繁的任务获取 
-                try:
-                    # 阻塞获取任务，避免CPU空转
-                    task, args, kwargs = self._queue.get(timeout=timeout)
-                    
-                    try:
-                        # 记录任务开始时间
-                        start_time = time.time()
-                        task(*args, **kwargs)
-                        # 记录任务执行时间
-                        duration = time.time() - start_time
-                        print_info(f"\n任务执行完成，耗时: {duration:.2f}秒")
-                    except Exception as e:
-                        print_error(f"队列任务执行失败: {e}")
-                        # raise
-                    finally:
-                        # 确保任务完成标记和资源释放
-                        self._queue.task_done()
-                        # 强制垃圾回收
-                        gc.collect()
-                    
-                except queue.Empty:
-                    # 超时无任务，继续检查运行状态
-                    continue
-                    
+            self._worker(timeout)
         finally:
-            # 确保停止状态设置和资源清理
             with self._lock:
                 self._is_running = False
-            # 清理可能残留的资源
-            gc.collect()
-    
+
     def stop(self) -> None:
         """停止任务执行"""
         with self._lock:
             self._is_running = False
-    
+
     def get_queue_info(self) -> dict:
         """
         获取队列的当前状态信息
-        
+
         返回:
             dict: 包含队列信息的字典，包括:
                 - is_running: 队列是否正在运行
                 - pending_tasks: 等待执行的任务数量
+                - running: 正在执行的任务
         """
         with self._lock:
             return {
                 'is_running': self._is_running,
-                'pending_tasks': self._queue.qsize()
+                'workers': self.get_workers(),
+                'pending_tasks': len(self._tasks) - len(self._running),
+                'running': [item.info() for item in self._running.values()],
+                'completed': self.completed,
+                'failed': self.failed,
+                'cancelled': self.cancelled,
+                'deduped': self.deduped,
+                'persist': self._store is not None,
             }
-            
-    def clear_queue(self) -> None:
-        """清空队列中的所有任务"""
+
+    def clear_queue(self, prefix: str = None) -> int:
+        """取消等待中的任务
+
+        Args:
+            prefix: 只取消key以prefix开头的任务，为None时取消全部等待中的任务
+
+        Returns:
+            取消的任务数量
+        """
         with self._lock:
-            while not self._queue.empty():
-                try:
-                    self._queue.get_nowait()
-                    self._queue.task_done()
-                except queue.Empty:
-                    break
-            print_success("队列已清空")
-            
+            items = [item for item in self._tasks.values() if item.id not in self._running
+                     and (prefix is None or (item.key or "").startswith(prefix))]
+            for item in items:
+                item.cancelled = True
+                self._release(item)
+            self.cancelled += len(items)
+        print_success(f"队列已清空{f'[{prefix}]' if prefix else ''}: {len(items)}个任务")
+        return len(items)
+
     def delete_queue(self) -> None:
         """删除队列(停止并清空所有任务)"""
-        with self._lock:
-            self._is_running = False
-            while not self._queue.empty():
-                try:
-                    self._queue.get_nowait()
-                    self._queue.task_done()
-                except queue.Empty:
-                    break
-            print_success("队列已删除")
+        self.stop()
+        self.clear_queue()
+        print_success("队列已删除")
+
+
 TaskQueue = TaskQueueManager(tag="默认队列")
 TaskQueue.run_task_background()
 if __name__ == "__main__":
@@ -127,4 +369,4 @@ if __name__ == "__main__":
     manager = TaskQueueManager()
     manager.add_task(task1)
     manager.add_task(task2, "测试任务")
-    manager.run_tasks()  # 按顺序执行任务1和任务2
\ No newline at end of file
+    manager.run_tasks()  # 按顺序执行任务1和任务2
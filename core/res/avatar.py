@@ -14,25 +14,11 @@ def save_avatar_locally(avatar_url):
     if not avatar_url:
         return None
     
-    # 确保存储目录存在
-    save_dir = avatar_dir
-    os.makedirs(save_dir, exist_ok=True)
-    
-    # 生成唯一文件名
-    file_ext = os.path.splitext(urlparse(avatar_url).path)[1]
-    if not file_ext:
-        file_ext = ".jpg"
-    file_name = f"{uuid.uuid4().hex}{file_ext}"
-    file_path = os.path.join(save_dir, file_name)
-    
-    # 下载并保存文件
-    try:
-        response = requests.get(avatar_url)
-        response.raise_for_status()
-        with open(file_path, "wb") as f:
-            f.write(response.content)
-        return file_path
-    except Exception as e:
-        print(f"保存头像失败: {str(e)}")
+    # 与文章图片共用按内容去重的存储，同一头像只保存一份
+    from .images import IMAGE_STORE
+    rel = IMAGE_STORE.download(avatar_url)
+    if rel is None:
+        print(f"保存头像失败: {avatar_url}")
         return None
+    return f"{files_dir}/{rel}"
 
@@ -0,0 +1,208 @@
+import hashlib
+import io
+import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+from urllib.parse import urlparse, parse_qs
+import requests
+from core.config import cfg
+from core.lru_cache import LRUCache
+from core.print import print_error, print_info
+from .avatar import files_dir
+
+IMAGE_SRC = re.compile(r'(<img\b[^>]*?\bsrc=["\'])(https?://[^"\']+)(["\'])', re.IGNORECASE)
+CONTENT_TYPES = {"image/jpeg": ".jpg", "image/jpg": ".jpg", "image/png": ".png", "image/gif": ".gif",
+                 "image/webp": ".webp", "image/svg+xml": ".svg", "image/bmp": ".bmp"}
+EXTENSIONS = set(CONTENT_TYPES.values()) | {".jpeg"}
+
+
+class ImageStore:
+    """图片本地存储
+
+    文件以原图内容的sha256命名，保存在data/files/images/<前两位>/下，同一张图片
+    无论来自哪篇文章或哪个头像地址只保存一份。启用image.webp时用Pillow转为WebP，
+    宽度超过image.max_width的等比缩小(动图保持原样)。
+    下载在共享线程池中进行，并发数受image.concurrency限制；只保存image/*类型且不超过
+    image.max_mb的响应。已下载的地址记录在内存中，重复出现时不再请求。
+    """
+
+    def __init__(self, root: str = f"{files_dir}/images"):
+        self.root = os.path.normpath(root)
+        self._session = requests.Session()
+        self._pool = None
+        self._lock = threading.Lock()
+        self._urls = LRUCache(max_items=20000, ttl=0)
+        self.downloaded = 0
+        self.deduped = 0
+        self.failed = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+
+    def enabled(self) -> bool:
+        return bool(cfg.get("image.mirror", False))
+
+    def workers(self) -> int:
+        return max(1, int(cfg.get("image.concurrency", 4) or 4))
+
+    def max_bytes(self) -> int:
+        return int(cfg.get("image.max_mb", 20) or 20) * 1024 * 1024
+
+    def pool(self) -> ThreadPoolExecutor:
+        if self._pool is None:
+            with self._lock:
+                if self._pool is None:
+                    self._pool = ThreadPoolExecutor(max_workers=self.workers(), thread_name_prefix="image")
+        return self._pool
+
+    @staticmethod
+    def guess_ext(url: str, content_type: str = None) -> str:
+        content_type = (content_type or "").split(";")[0].strip().lower()
+        if content_type in CONTENT_TYPES:
+            return CONTENT_TYPES[content_type]
+        parsed = urlparse(url)
+        # 公众号图片地址通过wx_fmt参数标明格式
+        fmt = parse_qs(parsed.query).get("wx_fmt", [""])[0].lower()
+        if fmt:
+            return ".jpg" if fmt == "jpeg" else f".{fmt}"
+        ext = os.path.splitext(parsed.path)[1].lower()
+        return ext if ext in EXTENSIONS else ".jpg"
+
+    def _convert(self, data: bytes) -> Optional[bytes]:
+        """转为WebP，无法转换或不需要转换时返回None"""
+        if not cfg.get("image.webp", False):
+            return None
+        try:
+            from PIL import Image
+            with Image.open(io.BytesIO(data)) as img:
+                if getattr(img, "is_animated", False):
+                    return None
+                max_width = int(cfg.get("image.max_width", 1080) or 0)
+                if max_width and img.width > max_width:
+                    img = img.resize((max_width, max(1, img.height * max_width // img.width)))
+                if img.mode not in ("RGB", "RGBA"):
+                    img = img.convert("RGBA" if "transparency" in img.info else "RGB")
+                out = io.BytesIO()
+                img.save(out, "WEBP", quality=int(cfg.get("image.quality", 80) or 80))
+                return out.getvalue()
+        except Exception as e:
+            print_error(f"图片转换WebP失败: {e}")
+            return None
+
+    def save(self, data: bytes, ext: str = ".jpg") -> str:
+        """保存图片内容，返回相对data/files的路径"""
+        digest = hashlib.sha256(data).hexdigest()
+        webp = cfg.get("image.webp", False) and ext not in (".gif", ".svg")
+        rel = f"images/{digest[:2]}/{digest}{'.webp' if webp else ext}"
+        path = os.path.join(files_dir, rel)
+        if os.path.exists(path):
+            with self._lock:
+                self.deduped += 1
+            return rel
+        if webp:
+            converted = self._convert(data)
+            if converted is None:
+                rel = f"images/{digest[:2]}/{digest}{ext}"
+                path = os.path.join(files_dir, rel)
+                if os.path.exists(path):
+                    with self._lock:
+                        self.deduped += 1
+                    return rel
+            else:
+                data = converted
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+        with self._lock:
+            self.bytes_out += len(data)
+        return rel
+
+    def download(self, url: str) -> Optional[str]:
+        """下载并保存图片，返回相对data/files的路径，失败返回None"""
+        if not url or not url.startswith(("http://", "https://")):
+            return None
+        rel = self._urls.get(url)
+        if rel is not None and os.path.exists(os.path.join(files_dir, rel)):
+            with self._lock:
+                self.deduped += 1
+            return rel
+        try:
+            with self._session.get(url, timeout=(5, 30), stream=True) as r:
+                r.raise_for_status()
+                content_type = r.headers.get("Content-Type", "")
+                # 错误页面等非图片内容不保存，保留原地址
+                if not content_type.lower().startswith("image/"):
+                    raise ValueError(f"不是图片({content_type or '未知类型'})")
+                limit = self.max_bytes()
+                if int(r.headers.get("Content-Length") or 0) > limit:
+                    raise ValueError(f"图片超过{limit}字节")
+                chunks = []
+                size = 0
+                for chunk in r.iter_content(64 * 1024):
+                    size += len(chunk)
+                    if size > limit:
+                        raise ValueError(f"图片超过{limit}字节")
+                    chunks.append(chunk)
+                data = b"".join(chunks)
+            rel = self.save(data, self.guess_ext(url, content_type))
+        except Exception as e:
+            with self._lock:
+                self.failed += 1
+            print_error(f"下载图片失败({url}): {e}")
+            return None
+        with self._lock:
+            self.downloaded += 1
+            self.bytes_in += len(data)
+        self._urls.set(url, rel)
+        return rel
+
+    def local_url(self, rel: str) -> str:
+        """文章中使用的图片地址，配置了rss.base_url时使用完整地址，订阅源阅读器也能访问"""
+        base = cfg.get("rss.base_url", "") or ""
+        if base and not base.endswith("/"):
+            base += "/"
+        return f"{base or '/'}files/{rel}"
+
+    def mirror_html(self, html: str) -> str:
+        """下载正文中的全部图片并把地址改写为本地地址，下载失败的保留原地址"""
+        if not html or not self.enabled():
+            return html
+        urls = list(dict.fromkeys(m.group(2) for m in IMAGE_SRC.finditer(html)))
+        if not urls:
+            return html
+        local = {}
+        for url, rel in zip(urls, self.pool().map(self.download, urls)):
+            if rel:
+                local[url] = self.local_url(rel)
+        print_info(f"文章图片本地化: {len(local)}/{len(urls)}")
+        return IMAGE_SRC.sub(lambda m: f"{m.group(1)}{local.get(m.group(2), m.group(2))}{m.group(3)}", html)
+
+    def info(self) -> dict:
+        with self._lock:
+            return {
+                'enabled': self.enabled(),
+                'webp': bool(cfg.get("image.webp", False)),
+                'workers': self.workers(),
+                'downloaded': self.downloaded,
+                'deduped': self.deduped,
+                'failed': self.failed,
+                'bytes_in': self.bytes_in,
+                'bytes_out': self.bytes_out,
+            }
+
+
+IMAGE_STORE = ImageStore()
+
+
+def mirror_content(html: str) -> str:
+    """入库前本地化正文图片，未启用image.mirror时原样返回"""
+    if not html or html == "DELETED":
+        return html
+    try:
+        return IMAGE_STORE.mirror_html(html)
+    except Exception as e:
+        print_error(f"文章图片本地化失败: {e}")
+        return html
@@ -0,0 +1,315 @@
+import asyncio
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+import anyio
+from core.config import cfg
+from core.print import print_error, print_info
+
+# 允许反向代理的公众号图片域名
+PROXY_HOSTS = ("mmbiz.qpic.cn", "mmbiz.qlogo.cn", "mmecoa.qpic.cn")
+# 缓存并返回给客户端的响应头，其余(编码、长度、连接相关)由本服务重新生成
+KEEP_HEADERS = ("content-type", "cache-control", "last-modified", "etag", "expires")
+# 旧版本直接保存在缓存目录下的文件(sha256文件名和.headers)，没有大小限制，加载时清理
+LEGACY_FILE = re.compile(r"^[0-9a-f]{64}(\.headers)?$")
+
+
+class CacheEntry:
+    __slots__ = ("key", "url", "size", "content_type", "headers", "created", "accessed")
+
+    def __init__(self, key: str, url: str, size: int, content_type: str, headers: dict,
+                 created: float, accessed: float):
+        self.key = key
+        self.url = url
+        self.size = size
+        self.content_type = content_type
+        self.headers = headers
+        self.created = created
+        self.accessed = accessed
+
+
+class CacheIndex:
+    """缓存元数据索引(SQLite)，替代每个缓存文件旁的.headers文件"""
+
+    def __init__(self, path: str):
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._lock = threading.Lock()
+        self._conn.execute("""CREATE TABLE IF NOT EXISTS entries (
+            key TEXT PRIMARY KEY, url TEXT, size INTEGER, content_type TEXT, headers TEXT,
+            created REAL, accessed REAL)""")
+
+    def load(self) -> list:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT key, url, size, content_type, headers, created, accessed FROM entries ORDER BY accessed").fetchall()
+        return [CacheEntry(key, url, size, content_type, json.loads(headers or "{}"), created, accessed)
+                for key, url, size, content_type, headers, created, accessed in rows]
+
+    def save(self, entry: CacheEntry) -> None:
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO entries VALUES (?,?,?,?,?,?,?)",
+                               (entry.key, entry.url, entry.size, entry.content_type,
+                                json.dumps(entry.headers), entry.created, entry.accessed))
+
+    def touch(self, keys: list, accessed: float) -> None:
+        with self._lock:
+            self._conn.executemany("UPDATE entries SET accessed=? WHERE key=?", [(accessed, k) for k in keys])
+
+    def remove(self, keys: list) -> None:
+        with self._lock:
+            self._conn.executemany("DELETE FROM entries WHERE key=?", [(k,) for k in keys])
+
+
+class ProxyCache:
+    """图片反向代理的磁盘缓存
+
+    文件按sha256(请求)命名保存在{cache.dir}/res下，元数据集中保存在index.db。
+    总大小受res.cache_max_mb限制，超出时按最近访问时间淘汰；超过res.cache_ttl秒的条目视为过期。
+    同一地址的并发未命中只由第一个请求回源，响应边转发给客户端边写入缓存，
+    其余请求等待其完成后直接读缓存。索引在事件循环内维护，SQLite与文件操作放到工作线程执行。
+    """
+
+    def __init__(self, cache_dir: str):
+        self.cache_dir = os.path.normpath(cache_dir)
+        self._entries: "OrderedDict[str, CacheEntry]" = OrderedDict()
+        self._inflight = {}
+        self._touched = {}
+        self._index: Optional[CacheIndex] = None
+        self._client = None
+        self._loaded = False
+        self._load_lock = None
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.errors = 0
+
+    def max_bytes(self) -> int:
+        return int(cfg.get("res.cache_max_mb", 1024) or 1024) * 1024 * 1024
+
+    def ttl(self) -> int:
+        return int(cfg.get("res.cache_ttl", 7 * 86400) or 0)
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key)
+
+    def client(self):
+        """进程内共享的连接池客户端"""
+        if self._client is None:
+            import httpx
+            connections = int(cfg.get("res.max_connections", 20) or 20)
+            self._client = httpx.AsyncClient(
+                limits=httpx.Limits(max_connections=connections, max_keepalive_connections=connections),
+                timeout=httpx.Timeout(30, connect=10),
+                follow_redirects=True,
+            )
+        return self._client
+
+    async def close(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def _load_sync(self) -> list:
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self._index = CacheIndex(os.path.join(self.cache_dir, "index.db"))
+        entries = []
+        missing = []
+        for entry in self._index.load():
+            if os.path.exists(self.path(entry.key)):
+                entries.append(entry)
+            else:
+                missing.append(entry.key)
+        if missing:
+            self._index.remove(missing)
+        # 清理上次中断留下的临时文件
+        for name in os.listdir(self.cache_dir):
+            if name.endswith(".tmp"):
+                try:
+                    os.remove(os.path.join(self.cache_dir, name))
+                except OSError:
+                    pass
+        parent = os.path.dirname(self.cache_dir)
+        for name in os.listdir(parent):
+            path = os.path.join(parent, name)
+            if LEGACY_FILE.match(name) and os.path.isfile(path):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+        return entries
+
+    async def _ensure_loaded(self) -> None:
+        if self._loaded:
+            return
+        if self._load_lock is None:
+            self._load_lock = asyncio.Lock()
+        async with self._load_lock:
+            if self._loaded:
+                return
+            for entry in await anyio.to_thread.run_sync(self._load_sync):
+                self._entries[entry.key] = entry
+                self.bytes += entry.size
+            self._loaded = True
+            print_info(f"图片缓存索引加载完成: {len(self._entries)}个文件")
+            await self._evict()
+
+    async def get(self, key: str) -> Optional[CacheEntry]:
+        await self._ensure_loaded()
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        now = time.time()
+        ttl = self.ttl()
+        if ttl and now - entry.created > ttl:
+            self.expirations += 1
+            await self._drop([entry])
+            return None
+        self._entries.move_to_end(key)
+        entry.accessed = now
+        self._touched[key] = now
+        # 访问时间批量写回，重启后按最近访问时间恢复淘汰顺序
+        if len(self._touched) >= 100:
+            touched, self._touched = self._touched, {}
+            await anyio.to_thread.run_sync(self._index.touch, list(touched), now)
+        self.hits += 1
+        return entry
+
+    async def _drop(self, entries: list) -> None:
+        for entry in entries:
+            if self._entries.pop(entry.key, None) is not None:
+                self.bytes -= entry.size
+            self._touched.pop(entry.key, None)
+
+        def remove():
+            for entry in entries:
+                try:
+                    os.remove(self.path(entry.key))
+                except OSError:
+                    pass
+            self._index.remove([e.key for e in entries])
+        await anyio.to_thread.run_sync(remove)
+
+    async def _evict(self) -> None:
+        limit = self.max_bytes()
+        victims = []
+        remaining = self.bytes
+        for entry in self._entries.values():
+            if remaining <= limit:
+                break
+            victims.append(entry)
+            remaining -= entry.size
+        if victims:
+            self.evictions += len(victims)
+            await self._drop(victims)
+
+    async def add(self, entry: CacheEntry, tmp_path: str) -> None:
+        def commit():
+            os.replace(tmp_path, self.path(entry.key))
+            self._index.save(entry)
+        await anyio.to_thread.run_sync(commit)
+        old = self._entries.pop(entry.key, None)
+        if old is not None:
+            self.bytes -= old.size
+        self._entries[entry.key] = entry
+        self.bytes += entry.size
+        await self._evict()
+
+    def begin(self, key: str):
+        """登记一次回源，返回(是否由本请求回源, 等待对象)"""
+        future = self._inflight.get(key)
+        if future is not None:
+            self.coalesced += 1
+            return False, future
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        self.misses += 1
+        return True, future
+
+    def finish(self, key: str, cached: bool, future=None) -> None:
+        """结束一次回源并唤醒等待的请求，指定future时只结束该次回源(已结束则忽略)"""
+        if future is not None and self._inflight.get(key) is not future:
+            return
+        future = self._inflight.pop(key, None)
+        if future is not None and not future.done():
+            future.set_result(cached)
+
+    async def tee(self, key: str, url: str, resp):
+        """转发上游响应，同时写入临时文件，完整读完且成功时加入缓存"""
+        cacheable = resp.status_code == 200
+        # 单个文件不超过缓存总量的1/4
+        file_limit = self.max_bytes() // 4
+        tmp_path = f"{self.path(key)}.{id(resp)}.tmp"
+        f = None
+        size = 0
+        complete = False
+        try:
+            if cacheable:
+                f = await anyio.open_file(tmp_path, "wb")
+            async for chunk in resp.aiter_bytes():
+                size += len(chunk)
+                if f is not None:
+                    if size > file_limit:
+                        await f.aclose()
+                        f = None
+                        await anyio.to_thread.run_sync(os.remove, tmp_path)
+                    else:
+                        await f.write(chunk)
+                yield chunk
+            complete = True
+        finally:
+            # 客户端断开时任务已被取消，清理工作需要屏蔽取消，否则等待中的请求无法被唤醒
+            with anyio.CancelScope(shield=True):
+                cached = False
+                try:
+                    await resp.aclose()
+                    if f is not None:
+                        await f.aclose()
+                        if complete:
+                            headers = {k: v for k, v in resp.headers.items() if k.lower() in KEEP_HEADERS}
+                            now = time.time()
+                            await self.add(CacheEntry(key, url, size, resp.headers.get("content-type"),
+                                                      headers, now, now), tmp_path)
+                            cached = True
+                except Exception as e:
+                    self.errors += 1
+                    print_error(f"缓存响应失败: {str(e)}")
+                finally:
+                    if f is not None and not cached:
+                        try:
+                            await anyio.to_thread.run_sync(os.remove, tmp_path)
+                        except OSError:
+                            pass
+                    self.finish(key, cached)
+
+    def info(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            'items': len(self._entries),
+            'bytes': self.bytes,
+            'max_bytes': self.max_bytes(),
+            'ttl': self.ttl(),
+            'inflight': len(self._inflight),
+            'hits': self.hits,
+            'misses': self.misses,
+            'coalesced': self.coalesced,
+            'evictions': self.evictions,
+            'expirations': self.expirations,
+            'errors': self.errors,
+            'hit_rate': round(self.hits / total, 4) if total else 0,
+        }
+
+
+PROXY_CACHE = ProxyCache(os.path.join(cfg.get("cache.dir", "data/cache") or "data/cache", "res"))
+
+
+def cache_key(method: str, url: str) -> str:
+    return hashlib.sha256(f"{method}_{url}".encode("utf-8")).hexdigest()
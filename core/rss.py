@@ -1,8 +1,16 @@
 import xml.etree.ElementTree as ET
 from datetime import datetime, timedelta
 import os
+import re
 import json
-from core.content_format import format_content
+import textwrap
+from xml.sax.saxutils import escape
+from core.content_format import FORMAT_STORE
+from core.res.proxy_cache import PROXY_HOSTS
+# 属性值中需要额外转义的字符，与ElementTree保持一致
+_ATTR_ENTITIES = {'"': "&quot;", "\n": "&#10;", "\r": "&#13;", "\t": "&#09;"}
+# 文章页中公众号图床的图片走本地代理；已加过前缀或已本地化(/files/)的图片保持不变
+_LOGO_PREFIX_PATTERN = re.compile(r'(<img[^>]*src=["\'])(https?://(?:%s)/[^"\']*)' % "|".join(map(re.escape, PROXY_HOSTS)), re.IGNORECASE)
 class RSS:
     cache_dir = os.path.normpath("data/cache/rss")
     content_cache_dir = os.path.normpath("data/cache/content")
@@ -26,15 +34,26 @@ class RSS:
             return "application/json"
         return "text/plain"
     
-    def cache_content(self, content_id: str, content: dict):
-        """缓存文章内容"""
-        content["content"]=self.add_logo_prefix_to_urls(content["content"])
+    def cache_content(self, content_id: str, content: dict, mtime: int = None):
+        """缓存文章内容
+
+        图片地址在写入时加上代理前缀，读取后直接输出。
+        传入mtime(文章更新时间)时写入为文件修改时间，文章未更新则不再重复写入
+        """
         content_path = os.path.normpath(f"{self.content_cache_dir}/{content_id}.json")
         if not content_path.startswith(self.content_cache_dir):
             raise ValueError("Invalid content path: Path traversal detected.")
-        
+        if mtime is not None:
+            try:
+                if int(os.path.getmtime(content_path)) == int(mtime):
+                    return
+            except OSError:
+                pass
+        content["content"]=self.add_logo_prefix_to_urls(content["content"])
         with open(content_path, "w", encoding="utf-8") as f:
-            json.dump(content, f, ensure_ascii=False, indent=2)
+            json.dump(content, f, ensure_ascii=False)
+        if mtime is not None:
+            os.utime(content_path, (mtime, mtime))
 
     def get_cached_content(self, content_id: str) -> dict:
         """获取缓存的文章内容"""
@@ -49,7 +68,7 @@ class RSS:
             return None
     def serialize_datetime(self,obj):
         if isinstance(obj, datetime):
-            return obj.isoformat
+            return obj.isoformat()
         return obj
         
     def datetime_to_rfc822(self,dt:str)->str:
@@ -58,7 +77,7 @@ class RSS:
         return dt.strftime('%a, %d %b %Y %H:%M:%S %z')
     
     def add_logo_prefix_to_urls(self, text: str) -> str:
-        """在字符串中所有http/https开头的图片URL前添加/static/res/logo/前缀
+        """在字符串中公众号图床的图片URL前添加/static/res/logo/前缀
         
         Args:
             text: 包含URL的原始字符串
@@ -66,79 +85,89 @@ class RSS:
         Returns:
             处理后的字符串，所有图片URL前添加了前缀
         """
-        import re
         try:
-            pattern = re.compile(r'(<img[^>]*src=["\'])(?!\/static\/res\/logo\/)([^"\']*)', re.IGNORECASE)
-            return pattern.sub(r'\1/static/res/logo/\2', text)
+            return _LOGO_PREFIX_PATTERN.sub(r'\1/static/res/logo/\2', text)
         except:
             return text
        
-    def generate_rss(self,rss_list: dict, title: str = "Mp-We-Rss", 
+    def _xml_text(self, value) -> str:
+        if value is None:
+            return ""
+        return escape(str(value))
+
+    def _xml_attrs(self, attrs: dict) -> str:
+        return "".join(f' {k}="{escape(str(v), _ATTR_ENTITIES)}"' for k, v in attrs.items())
+
+    def _xml_element(self, tag: str, text=None, **attrs) -> str:
+        """序列化单个XML元素，与ElementTree的转义规则保持一致"""
+        return f"<{tag}{self._xml_attrs(attrs)}>{self._xml_text(text)}</{tag}>"
+
+    def _xml_cdata(self, tag: str, text) -> str:
+        # CDATA内容中的]]>需要拆开，否则会提前结束CDATA段
+        text = str(text).replace("]]>", "]]]]><![CDATA[>")
+        return f"<{tag}><![CDATA[{text}]]></{tag}>"
+
+    def iter_rss(self,rss_list: dict, title: str = "Mp-We-Rss", 
                     link: str = "https://github.com/rachelos/we-mp-rss",
                     description: str = "RSS频道", language: str = "zh-CN",image_url:str=""):
+        """逐条生成RSS 2.0文档片段，不在内存中构建整棵XML树"""
         from core.config import cfg
         full_context=bool(cfg.get("rss.full_context",False))
-        
+        add_cover=cfg.get("rss.add_cover",False)==True
+        cdata=cfg.get("rss.cdata",False)==True
+        el=self._xml_element
+
         # 创建根元素(RSS标准)
-        rss = ET.Element("rss", version="2.0")
+        attrs={"version":"2.0"}
         if full_context==True:
-            rss.attrib["xmlns:content"] = "http://purl.org/rss/1.0/modules/content/"
-        channel=ET.SubElement(rss, "channel")
+            attrs["xmlns:content"] = "http://purl.org/rss/1.0/modules/content/"
+        head=['<?xml version="1.0" encoding="utf-8"?>\r\n', f"<rss{self._xml_attrs(attrs)}>", "<channel>"]
         # 设置渠道信息
-        ET.SubElement(channel, "title").text = title
-        ET.SubElement(channel, "link").text = link
-        ET.SubElement(channel, "description").text = description
-        ET.SubElement(channel, "language").text = language
-        ET.SubElement(channel, "generator").text = "Mp-We-Rss"
-        ET.SubElement(channel, "lastBuildDate").text =datetime.now().strftime("%a, %d %b %Y %H:%M:%S %z")
-    
+        head.append(el("title",title))
+        head.append(el("link",link))
+        head.append(el("description",description))
+        head.append(el("language",language))
+        head.append(el("generator","Mp-We-Rss"))
+        head.append(el("lastBuildDate",datetime.now().strftime("%a, %d %b %Y %H:%M:%S %z")))
         # 设置image子项
-        if cfg.get("rss.add_cover",False)==True and image_url != "":
-            image = ET.SubElement(channel, "image")
-            ET.SubElement(image, "url").text = image_url
-            ET.SubElement(image, "title").text = title
-            ET.SubElement(image, "link").text = link
+        if add_cover and image_url != "":
+            head.append("<image>"+el("url",image_url)+el("title",title)+el("link",link)+"</image>")
+        yield "".join(head)
 
         for rss_item in rss_list:
-            item = ET.SubElement(channel, "item")
-            ET.SubElement(item, "id").text = rss_item["id"]
-            ET.SubElement(item, "title").text = rss_item["title"]
-            ET.SubElement(item, "description").text = rss_item["description"] 
-            ET.SubElement(item, "guid").text = rss_item["link"]
+            item=["<item>"]
+            item.append(el("id",rss_item["id"]))
+            item.append(el("title",rss_item["title"]))
+            item.append(el("description",rss_item["description"]))
+            item.append(el("guid",rss_item["link"]))
             # 添加图片封面
-            if cfg.get("rss.add_cover",False)==True:
-                enclosure = ET.SubElement(item, "enclosure")
-                enclosure.set("url", rss_item["image"])
-                enclosure.set("length", "0")
-                enclosure.set("type", "image/jpeg")
+            if add_cover:
+                item.append(el("enclosure",url=rss_item["image"],length="0",type="image/jpeg"))
             if full_context==True:
                 try:
-                    if cfg.get("rss.cdata",False)==True:
-                        content = f"<![CDATA[{str(rss_item['content'])}]]>"  # 使用CDATA包裹内容
+                    if cdata:
+                        item.append(self._xml_cdata("content:encoded",rss_item['content']))  # 使用CDATA包裹内容
                     else:
-                        content = str(rss_item['content'])
-                    ET.SubElement(item, "content:encoded").text = content
+                        item.append(el("content:encoded",rss_item['content']))
                 except Exception as e:
                     print(f"Error adding content:encoded element: {e}")
-                pass
-            # ET.SubElement(item, "category").text = rss_item["category"]
-            # ET.SubElement(item, "author").text = rss_item["author"]
-            ET.SubElement(item, "link").text = rss_item["link"]
-            ET.SubElement(item, "pubDate").text = self.datetime_to_rfc822(str(rss_item["updated"]))
+            item.append(el("link",rss_item["link"]))
+            item.append(el("pubDate",self.datetime_to_rfc822(str(rss_item["updated"]))))
+            item.append("</item>")
+            yield "".join(item)
+        yield "</channel></rss>"
 
-        # 生成XML字符串(添加声明和美化输出)
-        tree_str = '<?xml version="1.0" encoding="utf-8"?>\r\n' + \
-                ET.tostring(rss, encoding="utf-8", method="xml", short_empty_elements=False).decode("utf-8")
-        
-        if self.rss_file is not None:
-            with open(self.rss_file, "w", encoding="utf-8") as f:
-                f.write(tree_str)
+    def generate_rss(self,rss_list: dict, title: str = "Mp-We-Rss", 
+                    link: str = "https://github.com/rachelos/we-mp-rss",
+                    description: str = "RSS频道", language: str = "zh-CN",image_url:str=""):
+        tree_str="".join(self.iter_rss(rss_list, title=title, link=link, description=description, language=language, image_url=image_url))
+        self.save_cache(tree_str)
         return tree_str
-     
-    def generate_atom(self,rss_list: dict, title: str = "Mp-We-Rss", 
+
+    def iter_atom(self,rss_list: dict, title: str = "Mp-We-Rss", 
                     link: str = "https://github.com/rachelos/we-mp-rss",
-                    description: str = "RSS频道", language: str = "zh-CN",image_url:str="") -> str:
-        """生成Atom格式的RSS内容
+                    description: str = "RSS频道", language: str = "zh-CN",image_url:str=""):
+        """逐条生成Atom文档片段
         
         Args:
             rss_list: RSS条目列表
@@ -147,65 +176,65 @@ class RSS:
             description: 频道描述
             language: 语言
             
-        Returns:
-            Atom格式的XML字符串
+        Yields:
+            Atom格式的XML片段
         """
         from core.config import cfg
         full_context = bool(cfg.get("rss.full_context", False))
+        add_cover=cfg.get("rss.add_cover",False)==True
+        cdata=cfg.get("rss.cdata",False)==True
+        el=self._xml_element
         
         # 创建根元素(Atom标准)
-        feed = ET.Element("feed", xmlns="http://www.w3.org/2005/Atom")
+        attrs={"xmlns":"http://www.w3.org/2005/Atom"}
         if full_context==True:
-            feed.attrib["xmlns:content"] = "http://purl.org/rss/1.0/modules/content/"
-        ET.SubElement(feed, "title").text = title
-        ET.SubElement(feed, "link",rel="alternate", href=link)
-        ET.SubElement(feed, "link",rel="icon", href=image_url)
-        ET.SubElement(feed, "logo").text=str(image_url)
-        ET.SubElement(feed, "icon").text=str(image_url)
-        ET.SubElement(feed, "updated").text = datetime.now().strftime("%a, %d %b %Y %H:%M:%S %z")
-        ET.SubElement(feed, "id").text = str(link)
-        ET.SubElement(feed, "author").text = "Mp-We-Rss"
+            attrs["xmlns:content"] = "http://purl.org/rss/1.0/modules/content/"
+        head=['<?xml version="1.0" encoding="utf-8"?>\r\n', f"<feed{self._xml_attrs(attrs)}>"]
+        head.append(el("title",title))
+        head.append(el("link",rel="alternate", href=link))
+        head.append(el("link",rel="icon", href=image_url))
+        head.append(el("logo",str(image_url)))
+        head.append(el("icon",str(image_url)))
+        head.append(el("updated",datetime.now().strftime("%a, %d %b %Y %H:%M:%S %z")))
+        head.append(el("id",str(link)))
+        head.append(el("author","Mp-We-Rss"))
         # 设置image子项
-        if cfg.get("rss.add_cover",False)==True and image_url != "":
-            image = ET.SubElement(feed, "image")
-            ET.SubElement(image, "url").text = str(image_url)
-            ET.SubElement(image, "title").text = str(title)
-            ET.SubElement(image, "link").text = str(link)
+        if add_cover and image_url != "":
+            head.append("<image>"+el("url",str(image_url))+el("title",str(title))+el("link",str(link))+"</image>")
+        yield "".join(head)
+
+        type=self.get_content_type()
         for rss_item in rss_list:
-            entry = ET.SubElement(feed, "entry")
-            ET.SubElement(entry, "id").text = rss_item["id"]
-            ET.SubElement(entry, "title").text = str(rss_item["title"])
-            ET.SubElement(entry, "link", href=str(rss_item["link"]))
-            ET.SubElement(entry, "updated").text =self.datetime_to_rfc822(str(rss_item["updated"]))
-            ET.SubElement(entry, "summary").text = str(rss_item["description"])
-            ET.SubElement(entry, "author").text = str(rss_item["mp_name"])
+            entry=["<entry>"]
+            entry.append(el("id",rss_item["id"]))
+            entry.append(el("title",str(rss_item["title"])))
+            entry.append(el("link",href=str(rss_item["link"])))
+            entry.append(el("updated",self.datetime_to_rfc822(str(rss_item["updated"]))))
+            entry.append(el("summary",str(rss_item["description"])))
+            entry.append(el("author",str(rss_item["mp_name"])))
              # 添加图片封面
-            if cfg.get("rss.add_cover",False)==True:
-                enclosure = ET.SubElement(entry, "enclosure")
-                enclosure.set("url", str(rss_item["image"]))
-                enclosure.set("length", "0")
-                enclosure.set("type", "image/jpeg")
+            if add_cover:
+                entry.append(el("enclosure",url=str(rss_item["image"]),length="0",type="image/jpeg"))
             
             if full_context:
-                type=self.get_content_type()
-                # content = ET.SubElement(entry, "content", type=f"{str(type)}") 
-                # content.text = format_content(rss_item["content"],type)
-                content=format_content(rss_item["content"],type)
+                content=FORMAT_STORE.format(rss_item["id"],rss_item["content"],type)
                 try:
-                    if cfg.get("rss.cdata",False)==True:
-                        content = f"<![CDATA[{content}]]>"  # 使用CDATA包裹内容
+                    if cdata:
+                        entry.append(self._xml_cdata("content:encoded",content))  # 使用CDATA包裹内容
                     else:
-                        ET.SubElement(entry, "content:encoded").text = content
+                        entry.append(el("content:encoded",content))
                 except Exception as e:
                     print(f"Error adding content:encoded element: {e}")
-                pass
-        # 生成XML字符串
-        tree_str = '<?xml version="1.0" encoding="utf-8"?>\r\n' + \
-                  ET.tostring(feed, encoding="utf-8", method="xml").decode("utf-8")
-        
-        if self.rss_file is not None:
-            with open(self.rss_file, "w", encoding="utf-8") as f:
-                f.write(tree_str)
+            entry.append("</entry>")
+            yield "".join(entry)
+        yield "</feed>"
+     
+    def generate_atom(self,rss_list: dict, title: str = "Mp-We-Rss", 
+                    link: str = "https://github.com/rachelos/we-mp-rss",
+                    description: str = "RSS频道", language: str = "zh-CN",image_url:str="") -> str:
+        """生成Atom格式的RSS内容，返回Atom格式的XML字符串"""
+        tree_str="".join(self.iter_atom(rss_list, title=title, link=link, description=description, language=language, image_url=image_url))
+        self.save_cache(tree_str)
         return tree_str
     def set_content_type(self,type:str=None):
         self.content_type=type
@@ -218,38 +247,59 @@ class RSS:
         elif ext in("txt"):
             return "text"
         return "html"
-    def generate_json(self, rss_list: dict,title: str = "Mp-We-Rss", 
+    def iter_json(self, rss_list: dict,title: str = "Mp-We-Rss", 
                     link: str = "https://github.com/rachelos/we-mp-rss",
-                    description: str = "RSS频道", language: str = "zh-CN",image_url:str="") -> str:
-        """获取JSON格式的RSS内容
+                    description: str = "RSS频道", language: str = "zh-CN",image_url:str=""):
+        """逐条生成JSON格式的RSS内容
         
         Args:
             rss_list: RSS条目列表
             
-        Returns:
-            JSON格式的字符串
+        Yields:
+            JSON文档片段，拼接后为完整的JSON字符串
         """
         type=self.get_content_type()
-        result = {
+        head = {
             "name":title,
             "link":link,
             "description":description,
             "language": language,
             "cover":image_url,
-            "items": [
-                {
-                    "id": item["id"],
-                    "title": item["title"],
-                    "description": item["description"],
-                    "link": item["link"],
-                    "updated": item["updated"].isoformat() if isinstance(item["updated"], datetime) else item["updated"],
-                    "content": format_content(item["content"],type),
-                    "channel_name": item.get("mp_name", ""),
-                    "feed": item.get("feed")
-                } for item in rss_list
-            ]
         }
-        return json.dumps(result, ensure_ascii=False, indent=2, default=self.serialize_datetime)
+        dumps=lambda v: json.dumps(v, ensure_ascii=False, indent=2, default=self.serialize_datetime)
+        yield "{\n" + "".join(f"  {dumps(k)}: {dumps(v)},\n" for k, v in head.items()) + '  "items": ['
+        for i, item in enumerate(rss_list):
+            data = {
+                "id": item["id"],
+                "title": item["title"],
+                "description": item["description"],
+                "link": item["link"],
+                "updated": item["updated"].isoformat() if isinstance(item["updated"], datetime) else item["updated"],
+                "content": FORMAT_STORE.format(item["id"],item["content"],type),
+                "channel_name": item.get("mp_name", ""),
+                "feed": item.get("feed")
+            }
+            yield ("," if i else "") + "\n" + textwrap.indent(dumps(data), "    ")
+        yield "\n  ]\n}"
+
+    def generate_json(self, rss_list: dict,title: str = "Mp-We-Rss", 
+                    link: str = "https://github.com/rachelos/we-mp-rss",
+                    description: str = "RSS频道", language: str = "zh-CN",image_url:str="") -> str:
+        """获取JSON格式的RSS内容，返回JSON格式的字符串"""
+        return "".join(self.iter_json(rss_list, title=title, link=link, description=description, language=language, image_url=image_url))
+    def save_cache(self, text: str) -> None:
+        """写入渲染结果，先写临时文件再替换，避免其他进程读到半截内容"""
+        if not getattr(self, 'rss_file', None):
+            return
+        tmp_file = f"{self.rss_file}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_file, "w", encoding="utf-8") as f:
+                f.write(text)
+            os.replace(tmp_file, self.rss_file)
+        except Exception as e:
+            print(f"Error saving cache {self.rss_file}: {e}")
+            if os.path.exists(tmp_file):
+                os.unlink(tmp_file)
 
     def get_cache(self):
         if not hasattr(self, 'rss_file') or not self.rss_file:
@@ -259,34 +309,74 @@ class RSS:
                 return f.read()  
         except FileNotFoundError:
             return None     
-    def generate(self,rss_list: dict,ext=str, title: str = "Mp-We-Rss", 
+    def iter_feed(self,rss_list: dict,ext=str, title: str = "Mp-We-Rss", 
                     link: str = "https://github.com/rachelos/we-mp-rss",
-                    description: str = "RSS频道", language: str = "zh-CN",image_url:str="",template:str=None) -> str:
-        """根据扩展名获取对应格式的RSS内容
+                    description: str = "RSS频道", language: str = "zh-CN",image_url:str="",template:str=None):
+        """根据扩展名返回对应格式的片段迭代器
         
         Args:
-            rss_list: RSS条目列表
+            rss_list: RSS条目列表(可以是惰性生成器，模板格式除外)
             ext: 文件扩展名(.rss/.xml/.atom/.json)
             **kwargs: 传递给各格式生成方法的参数
             
         Returns:
-            对应格式的字符串
+            逐条产出文档片段的迭代器
             
         Raises:
-            ValueError: 当扩展名不支持时
+            ValueError: 当扩展名不支持时(在开始输出之前抛出)
         """
         ext = ext.lower().strip('.')
         self.ext=ext
+        kwargs=dict(title=title, link=link, description=description,language=language,image_url=image_url)
         if ext in ('rss', 'xml'):
-            return self.generate_rss(rss_list, title=title, link=link, description=description,language=language,image_url=image_url)
+            return self.iter_rss(rss_list, **kwargs)
         elif ext in ('atom','md','txt'):
-            return self.generate_atom(rss_list, title=title, link=link, description=description,language=language,image_url=image_url)
+            return self.iter_atom(rss_list, **kwargs)
         elif ext in ('json','jmd'):
-            return self.generate_json(rss_list, title=title, link=link, description=description,language=language,image_url=image_url)
+            return self.iter_json(rss_list, **kwargs)
         elif template is not None:
-            return self.generate_by_template(rss_list,template, title=title, link=link, description=description,language=language,image_url=image_url)
+            # 模板需要完整的文章列表(循环长度、loop.last等)，只能整体渲染
+            return iter([self.generate_by_template(list(rss_list),template, **kwargs)])
         else:
             raise ValueError(f"Unsupported extension: {ext}")
+    def generate(self,rss_list: dict,ext=str, title: str = "Mp-We-Rss", 
+                    link: str = "https://github.com/rachelos/we-mp-rss",
+                    description: str = "RSS频道", language: str = "zh-CN",image_url:str="",template:str=None) -> str:
+        """根据扩展名获取对应格式的RSS内容，返回完整字符串并写入缓存"""
+        text="".join(self.iter_feed(rss_list,ext=ext,title=title,link=link,description=description,language=language,image_url=image_url,template=template))
+        self.save_cache(text)
+        return text
+    def stream(self,rss_list: dict,ext=str, title: str = "Mp-We-Rss", 
+                    link: str = "https://github.com/rachelos/we-mp-rss",
+                    description: str = "RSS频道", language: str = "zh-CN",image_url:str="",template:str=None,mtime:float=None):
+        """边生成边输出，同时把同样的片段写入缓存文件
+        
+        输出完整结束后才替换缓存文件，客户端中途断开时丢弃临时文件
+        
+        Args:
+            mtime: 缓存文件的修改时间，用于订阅源存储判断是否过期
+            
+        Returns:
+            可直接交给StreamingResponse的片段生成器
+        """
+        chunks=self.iter_feed(rss_list,ext=ext,title=title,link=link,description=description,language=language,image_url=image_url,template=template)
+        return self._tee_to_cache(chunks,mtime)
+    def _tee_to_cache(self,chunks,mtime:float=None):
+        tmp_file = f"{self.rss_file}.{os.getpid()}.{id(chunks)}.tmp"
+        f = open(tmp_file, "w", encoding="utf-8")
+        try:
+            for chunk in chunks:
+                f.write(chunk)
+                yield chunk
+            f.close()
+            os.replace(tmp_file, self.rss_file)
+            if mtime is not None:
+                os.utime(self.rss_file, (mtime, mtime))
+        finally:
+            if not f.closed:
+                f.close()
+            if os.path.exists(tmp_file):
+                os.unlink(tmp_file)
     def generate_by_template(self,rss_list: dict, template: str, title: str = "Mp-We-Rss",link: str = "https://github.com/rachelos/we-mp-rss",description: str = "RSS频道",language: str = "zh-CN",image_url:str=""):
             from core.lax import TemplateParser
             template = TemplateParser(template)
@@ -294,23 +384,10 @@ class RSS:
             pass
     def clear_cache(self,mp_id:str=""):
 
-        """清除所有缓存文件
+        """使公众号相关的RSS缓存失效
         
-        删除data/cache/rss和data/cache/content目录中包含'mp_id'的文件
-        保持与现有方法相同的路径安全检查机制
+        只刷新该公众号(以及聚合源all)的更新戳并清除本进程内存缓存，
+        旧的渲染文件在下次读取时判定为过期并被覆盖，不再遍历整个缓存目录
         """
-        import shutil
-        
-        # 清除rss缓存目录
-        if os.path.exists(self.cache_dir):
-            for filename in os.listdir(self.cache_dir):
-                if f'{mp_id}_' not in filename:
-                    continue
-                file_path = os.path.normpath(f"{self.cache_dir}/{filename}")
-                if not file_path.startswith(self.cache_dir):
-                    raise ValueError("Invalid file path: Path traversal detected.")
-                try:
-                    if os.path.isfile(file_path):
-                        os.unlink(file_path)
-                except Exception as e:
-                    print(f"Error deleting {file_path}: {e}")
\ No newline at end of file
+        from core.feed_store import FEED_STORE
+        FEED_STORE.touch(mp_id or None)
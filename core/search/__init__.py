@@ -0,0 +1,24 @@
+from sqlalchemy.engine import Engine
+from core.config import cfg
+from .base import SearchIndex, split_words
+
+
+def get_search_index(engine: Engine) -> SearchIndex:
+    """按数据库方言选择全文索引实现，search.index关闭时使用LIKE匹配"""
+    if not cfg.get("search.index", True):
+        return SearchIndex(engine)
+    dialect = engine.dialect.name
+    if dialect == "sqlite":
+        from .sqlite import SqliteSearchIndex
+        return SqliteSearchIndex(engine)
+    if dialect in ("mysql", "mariadb"):
+        from .mysql import MysqlSearchIndex
+        return MysqlSearchIndex(engine)
+    if dialect == "postgresql":
+        from .postgres import PostgresSearchIndex
+        return PostgresSearchIndex(engine)
+    return SearchIndex(engine)
+
+
+from core.db import DB
+SEARCH = get_search_index(DB.get_engine())
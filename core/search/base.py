@@ -0,0 +1,68 @@
+from typing import List
+from sqlalchemy import or_, false
+from sqlalchemy.engine import Engine
+from core.models.article import Article
+
+
+def split_words(keyword: str) -> List[str]:
+    """拆分搜索关键词，空格、-、| 均视为分隔符，多个词之间为或关系"""
+    words = (keyword or "").replace("-", " ").replace("|", " ").split(" ")
+    return [w for w in words if w]
+
+
+class SearchIndex:
+    """文章搜索索引基类
+
+    子类按数据库方言提供全文索引，建立索引失败或不可用时退回到LIKE匹配。
+    filter()返回可直接用于query.filter的条件，rank()在条件之外附加相关度排序。
+    """
+    name = "like"
+    # LIKE匹配的字段，全文字段(content)太大不做LIKE扫描
+    like_columns = (Article.title, Article.description)
+
+    def __init__(self, engine: Engine):
+        self.engine = engine
+        self._available = None
+
+    def like(self, words: List[str]):
+        return or_(*[c.like(f"%{w}%") for w in words for c in self.like_columns])
+
+    def ensure(self) -> bool:
+        """建立索引及同步所需的结构，已存在时直接返回"""
+        return True
+
+    def rebuild(self) -> None:
+        """按文章表重建索引"""
+        pass
+
+    def check(self) -> bool:
+        """检测索引是否已建立"""
+        return True
+
+    @property
+    def available(self) -> bool:
+        if self._available is None:
+            try:
+                self._available = self.check()
+            except Exception:
+                self._available = False
+        return self._available
+
+    def match(self, words: List[str]):
+        return self.like(words)
+
+    def filter(self, keyword: str):
+        """关键词对应的过滤条件"""
+        words = split_words(keyword)
+        if not words:
+            return false()
+        if not self.available:
+            return SearchIndex.match(self, words)
+        return self.match(words)
+
+    def rank(self, query, keyword: str):
+        """在query上附加关键词过滤，并按相关度排序(相关度相同的按调用方后续排序)"""
+        return query.filter(self.filter(keyword))
+
+    def info(self) -> dict:
+        return {"engine": self.name if self.available else SearchIndex.name}
@@ -0,0 +1,64 @@
+from typing import List
+from sqlalchemy import text, or_
+from sqlalchemy.dialects.mysql import match as mysql_match
+from core.models.article import Article
+from core.print import print_info, print_error
+from .base import SearchIndex, split_words
+
+INDEX_NAME = "ft_articles"
+# ngram解析器按ngram_token_size(默认2)切分中日韩文本
+CREATE_SQL = f"ALTER TABLE articles ADD FULLTEXT INDEX {INDEX_NAME} (title, description, content) WITH PARSER ngram"
+# 少于ngram_token_size的词无法通过全文索引匹配
+MIN_TERM = 2
+
+
+class MysqlSearchIndex(SearchIndex):
+    """MySQL FULLTEXT(ngram)全文索引"""
+    name = "mysql_fulltext"
+
+    def check(self) -> bool:
+        with self.engine.connect() as conn:
+            row = conn.execute(text(
+                "SELECT 1 FROM information_schema.statistics "
+                "WHERE table_schema=DATABASE() AND table_name='articles' AND index_name=:name LIMIT 1"
+            ), {"name": INDEX_NAME}).first()
+        return row is not None
+
+    def ensure(self) -> bool:
+        try:
+            if not self.check():
+                print_info("创建文章全文索引，首次建立需要一些时间")
+                with self.engine.connect() as conn:
+                    conn.execute(text(CREATE_SQL))
+            self._available = True
+        except Exception as e:
+            print_error(f"创建MySQL全文索引失败，将使用LIKE搜索: {e}")
+            self._available = False
+        return self._available
+
+    def rebuild(self) -> None:
+        with self.engine.connect() as conn:
+            conn.execute(text("OPTIMIZE TABLE articles"))
+
+    def _match(self, words: List[str]):
+        t = Article.__table__
+        # 布尔模式下多个短语之间为或关系
+        against = " ".join('"' + w.replace('"', " ") + '"' for w in words)
+        return mysql_match(t.c.title, t.c.description, t.c.content, against=against).in_boolean_mode()
+
+    def match(self, words: List[str]):
+        long_words = [w for w in words if len(w) >= MIN_TERM]
+        short_words = [w for w in words if len(w) < MIN_TERM]
+        rules = []
+        if long_words:
+            rules.append(self._match(long_words))
+        if short_words:
+            rules.append(self.like(short_words))
+        return or_(*rules)
+
+    def rank(self, query, keyword: str):
+        words = [w for w in split_words(keyword) if len(w) >= MIN_TERM]
+        query = query.filter(self.filter(keyword))
+        if not self.available or not words:
+            return query
+        return query.order_by(self._match(words).desc())
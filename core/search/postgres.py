@@ -0,0 +1,57 @@
+from typing import List
+from sqlalchemy import text, or_, func, literal_column
+from core.models.article import Article
+from core.print import print_info, print_error
+from .base import SearchIndex
+
+INDEX_NAME = "ix_articles_search_trgm"
+# 索引与查询使用同一个表达式，规划器才能命中表达式索引
+DOC_EXPR = "(coalesce(articles.title, '') || ' ' || coalesce(articles.description, '') || ' ' || coalesce(articles.content, ''))"
+# pg_trgm按3字切分，不依赖空格分词，中日韩文本也能匹配任意子串
+CREATE_SQL = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    f"CREATE INDEX IF NOT EXISTS {INDEX_NAME} ON articles USING gin ({DOC_EXPR} gin_trgm_ops)",
+]
+
+
+class PostgresSearchIndex(SearchIndex):
+    """PostgreSQL pg_trgm表达式索引
+
+    默认的tsvector配置不能切分中文，这里改用trigram索引加速ILIKE，
+    标题与关键词的word_similarity作为相关度
+    """
+    name = "postgres_trgm"
+
+    def check(self) -> bool:
+        with self.engine.connect() as conn:
+            row = conn.execute(text(
+                "SELECT 1 FROM pg_indexes WHERE tablename='articles' AND indexname=:name"
+            ), {"name": INDEX_NAME}).first()
+        return row is not None
+
+    def ensure(self) -> bool:
+        try:
+            if not self.check():
+                print_info("创建文章全文索引，首次建立需要一些时间")
+                with self.engine.connect() as conn:
+                    for sql in CREATE_SQL:
+                        conn.execute(text(sql))
+            self._available = True
+        except Exception as e:
+            print_error(f"创建PostgreSQL全文索引失败，将使用LIKE搜索: {e}")
+            self._available = False
+        return self._available
+
+    def rebuild(self) -> None:
+        with self.engine.connect() as conn:
+            conn.execute(text(f"REINDEX INDEX {INDEX_NAME}"))
+
+    def match(self, words: List[str]):
+        doc = literal_column(DOC_EXPR)
+        return or_(*[doc.ilike(f"%{w}%") for w in words])
+
+    def rank(self, query, keyword: str):
+        query = query.filter(self.filter(keyword))
+        if not self.available:
+            return query
+        return query.order_by(func.word_similarity(keyword, Article.__table__.c.title).desc())
@@ -0,0 +1,133 @@
+from typing import List
+from sqlalchemy import text, select, or_, func, literal_column, table, column
+from core.print import print_info, print_error
+from .base import SearchIndex, split_words
+
+FTS_TABLE = "articles_fts"
+FTS_COLUMNS = "title, description, content"
+# 文章表主键为文本，隐式rowid在VACUUM或重建表后可能变化，不能作为索引的关联键；
+# 由该表为每篇文章分配固定的整数键(INTEGER PRIMARY KEY在VACUUM后保持不变)作为索引的rowid
+KEY_TABLE = "articles_fts_keys"
+# trigram分词不依赖空格，中日韩文本按3字切分，可以像LIKE一样匹配任意子串
+CREATE_SQL = [
+    f"""CREATE TABLE IF NOT EXISTS {KEY_TABLE} (
+        fts_id INTEGER PRIMARY KEY, article_id TEXT NOT NULL UNIQUE
+    )""",
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        {FTS_COLUMNS}, tokenize='trigram'
+    )""",
+]
+_ROWID = f"(SELECT fts_id FROM {KEY_TABLE} WHERE article_id = new.id)"
+# 索引保存标题、摘要和正文的副本，由触发器随文章表的增删改同步
+TRIGGERS_SQL = [
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON articles BEGIN
+        INSERT OR IGNORE INTO {KEY_TABLE}(article_id) VALUES (new.id);
+        INSERT INTO {FTS_TABLE}(rowid, {FTS_COLUMNS}) VALUES ({_ROWID}, new.title, new.description, new.content);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON articles BEGIN
+        DELETE FROM {FTS_TABLE} WHERE rowid = (SELECT fts_id FROM {KEY_TABLE} WHERE article_id = old.id);
+        DELETE FROM {KEY_TABLE} WHERE article_id = old.id;
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF title, description, content ON articles BEGIN
+        INSERT OR IGNORE INTO {KEY_TABLE}(article_id) VALUES (new.id);
+        DELETE FROM {FTS_TABLE} WHERE rowid = {_ROWID};
+        INSERT INTO {FTS_TABLE}(rowid, {FTS_COLUMNS}) VALUES ({_ROWID}, new.title, new.description, new.content);
+    END""",
+]
+TRIGGER_NAMES = [f"{FTS_TABLE}_ai", f"{FTS_TABLE}_ad", f"{FTS_TABLE}_au"]
+# trigram分词无法匹配少于3个字符的词
+MIN_TERM = 3
+
+
+class SqliteSearchIndex(SearchIndex):
+    """SQLite FTS5(trigram)全文索引"""
+    name = "sqlite_fts5"
+
+    def _table_sql(self, conn, name: str):
+        row = conn.execute(text("SELECT sql FROM sqlite_master WHERE name=:name"), {"name": name}).first()
+        return row[0] if row else None
+
+    def check(self) -> bool:
+        with self.engine.connect() as conn:
+            return self._table_sql(conn, FTS_TABLE) is not None and self._table_sql(conn, KEY_TABLE) is not None
+
+    def _drop_legacy(self, conn) -> bool:
+        """删除旧版以文章表rowid关联的外部内容索引，返回是否删除"""
+        sql = self._table_sql(conn, FTS_TABLE)
+        if not sql or "content='articles'" not in sql:
+            return False
+        print_info("旧版文章全文索引以rowid关联文章，重新建立")
+        for name in TRIGGER_NAMES:
+            conn.execute(text(f"DROP TRIGGER IF EXISTS {name}"))
+        conn.execute(text(f"DROP TABLE IF EXISTS {FTS_TABLE}"))
+        return True
+
+    def ensure(self) -> bool:
+        try:
+            with self.engine.connect() as conn:
+                self._drop_legacy(conn)
+            exists = self.check()
+            with self.engine.connect() as conn:
+                for sql in CREATE_SQL + TRIGGERS_SQL:
+                    conn.execute(text(sql))
+            if not exists:
+                print_info("创建文章全文索引，首次建立需要一些时间")
+                self.rebuild()
+            self._available = True
+        except Exception as e:
+            print_error(f"创建SQLite全文索引失败，将使用LIKE搜索: {e}")
+            self._available = False
+        return self._available
+
+    def rebuild(self) -> None:
+        with self.engine.connect() as conn:
+            conn.execute(text(f"DELETE FROM {FTS_TABLE}"))
+            conn.execute(text(f"DELETE FROM {KEY_TABLE}"))
+            conn.execute(text(f"INSERT INTO {KEY_TABLE}(article_id) SELECT id FROM articles"))
+            conn.execute(text(
+                f"INSERT INTO {FTS_TABLE}(rowid, {FTS_COLUMNS}) "
+                f"SELECT k.fts_id, a.title, a.description, a.content FROM articles a "
+                f"JOIN {KEY_TABLE} k ON k.article_id = a.id"))
+
+    @staticmethod
+    def _fts_query(words: List[str]) -> str:
+        # 每个词按短语匹配，转义其中的双引号
+        return " OR ".join('"' + w.replace('"', '""') + '"' for w in words)
+
+    def _split(self, words: List[str]):
+        long_words = [w for w in words if len(w) >= MIN_TERM]
+        short_words = [w for w in words if len(w) < MIN_TERM]
+        return long_words, short_words
+
+    def _fts_select(self, words: List[str], *columns):
+        fts = table(FTS_TABLE)
+        return select(*columns).select_from(fts).where(
+            literal_column(FTS_TABLE).op("MATCH")(self._fts_query(words))
+        )
+
+    def match(self, words: List[str]):
+        long_words, short_words = self._split(words)
+        rules = []
+        if long_words:
+            keys = table(KEY_TABLE, column("fts_id"), column("article_id"))
+            ids = select(keys.c.article_id).where(keys.c.fts_id.in_(self._fts_select(long_words, column("rowid"))))
+            rules.append(literal_column("articles.id").in_(ids))
+        if short_words:
+            rules.append(self.like(short_words))
+        return or_(*rules)
+
+    def rank(self, query, keyword: str):
+        words = split_words(keyword)
+        long_words, short_words = self._split(words)
+        if not self.available or not long_words:
+            return query.filter(self.filter(keyword))
+        keys = table(KEY_TABLE, column("fts_id"), column("article_id"))
+        hits = self._fts_select(
+            long_words, keys.c.article_id.label("article_id"), literal_column("rank").label("rank")
+        ).join(keys, keys.c.fts_id == literal_column(f"{FTS_TABLE}.rowid")).subquery()
+        query = query.outerjoin(hits, hits.c.article_id == literal_column("articles.id"))
+        rules = [hits.c.article_id.isnot(None)]
+        if short_words:
+            rules.append(self.like(short_words))
+        # bm25得分越小越相关，只命中LIKE的文章排在后面
+        return query.filter(or_(*rules)).order_by(func.coalesce(hits.c.rank, 0))
@@ -5,6 +5,8 @@ from apscheduler.triggers.cron import CronTrigger
 from typing import Callable, Any, Optional
 from core.log import logger
 import uuid
+import time
+from core.metrics import METRICS
 # 设置日志
 
 class TaskScheduler:
@@ -49,6 +51,8 @@ class TaskScheduler:
         self._scheduler = BackgroundScheduler()
         self._lock = threading.Lock()
         self._jobs = {}
+        self._tags = {}
+        METRICS.add_collector(self._collect_metrics)
 
     def add_cron_job(self,
                      func: Callable,
@@ -142,14 +146,22 @@ class TaskScheduler:
                     day_of_week=day_of_week
                 )
                 
-                # 包装任务函数以捕获异常
+                # 包装任务函数以捕获异常，并记录执行耗时和结果
                 def wrapped_func(*args, **kwargs):
+                    labels = {"job": str(job_id), "tag": tag}
+                    status = "ok"
+                    start = time.perf_counter()
                     try:
                         # logger.info(f"Executing job {job_id or 'anonymous'}")
                         return func(*args, **kwargs)
                     except Exception as e:
+                        status = "failed"
                         logger.error(f"Job {tag} {job_id or 'anonymous'} failed: {str(e)}")
                         raise
+                    finally:
+                        METRICS.observe("scheduler_job_seconds", labels, time.perf_counter() - start)
+                        METRICS.inc("scheduler_runs", {**labels, "status": status})
+                        METRICS.set("scheduler_last_run_timestamp", labels, time.time())
                 
                 job = self._scheduler.add_job(
                     wrapped_func,
@@ -159,6 +171,7 @@ class TaskScheduler:
                     id=str(job_id)
                 )
                 self._jobs[job.id] = job
+                self._tags[job.id] = tag
                 logger.info(f"Successfully added job {tag} {job.id}")
                 return job.id
             except Exception as e:
@@ -176,6 +189,7 @@ class TaskScheduler:
             if job_id in self._jobs:
                 self._scheduler.remove_job(job_id)
                 del self._jobs[job_id]
+                self._tags.pop(job_id, None)
                 return True
             return False
     
@@ -198,6 +212,7 @@ class TaskScheduler:
                 # 清除所有计划任务
                 self._scheduler.remove_all_jobs()
                 self._jobs.clear()
+                self._tags.clear()
                 logger.info(f"Removed all {job_count} jobs")
             return job_count
     
@@ -226,6 +241,7 @@ class TaskScheduler:
             if self._scheduler.running:
                 self._scheduler.shutdown(wait=wait)
                 self._jobs.clear()
+                self._tags.clear()
     
     def get_job_ids(self) -> list[str]:
         """获取所有任务ID"""
@@ -257,6 +273,15 @@ class TaskScheduler:
                 ]
             }
 
+    def _collect_metrics(self) -> list:
+        """导出每个定时任务的下次执行时间"""
+        with self._lock:
+            return [
+                ("scheduler_next_run_timestamp", {"job": job_id, "tag": self._tags.get(job_id, "")},
+                 job.next_run_time.timestamp())
+                for job_id, job in self._jobs.items() if getattr(job, "next_run_time", None)
+            ]
+
     def get_job_details(self, job_id: str) -> dict:
         """
         获取任务详细信息
@@ -2,12 +2,14 @@ import requests
 import json
 from core.models import Feed
 from driver.wx import DoSuccess
-from core.db import DB
+from core.db import DB,make_article_id
 from core.models.feed import Feed
 from .cfg import cfg,wx_cfg
 from core.print import print_error,print_info
 from core.rss import RSS
 from driver.success import setStatus
+from .limiter import LIMITER,CONTENT
+from .seen import SEEN
 import random
 # 定义一些常见的 User-Agent
 USER_AGENTS = [
@@ -35,19 +37,15 @@ USER_AGENTS = [
 # 定义基类
 class WxGather:
     articles=[]
-    aids=[]
     def all_count(self):
         if getattr(self, 'articles', None) is not None:
             return len(self.articles)
         return 0
-    def RecordAid(self,aid:str):
-        self.aids.append(aid)
-        pass
-    def HasGathered(self,aid:str):
-        if aid in self.aids:
-            return True
-        self.RecordAid(aid)
-        return False
+    def RecordAid(self,aid:str,mp_id:str=None):
+        SEEN.add(make_article_id(mp_id,str(aid)) if mp_id else str(aid))
+    def HasGathered(self,aid:str,mp_id:str=None):
+        """文章是否已入库，已入库的文章不再抓取正文也不再回填"""
+        return SEEN.contains(make_article_id(mp_id,str(aid)) if mp_id else str(aid))
     def Model(self):
         type=cfg.get("gather.model","web")
         
@@ -57,6 +55,9 @@ class WxGather:
         elif type=="web":
             from core.wx import MpsWeb
             wx=MpsWeb()
+        elif type=="async":
+            from core.wx import MpsAsyncApi
+            wx=MpsAsyncApi()
         else:
             from core.wx import MpsApi
             wx=MpsApi()
@@ -100,6 +101,7 @@ class WxGather:
     def content_extract(self,  url):
         text=""
         try:
+            LIMITER.acquire(CONTENT)
             session=self.session
             # 更新请求头
             headers = self.fix_header(url)
@@ -108,31 +110,53 @@ class WxGather:
                 text = r.text
                 if "当前环境异常，完成验证后即可继续访问" in text:
                     print_error("当前环境异常，完成验证后即可继续访问")
+                    LIMITER.penalize(CONTENT)
                     text=""
         except:
             pass
         return text
+    def _make_art(self,data:dict)->dict:
+        art={
+            "id":str(data['id']),
+            "mp_id":data['mp_id'],
+            "title":data['title'],
+            "url":data['link'],
+            "pic_url":data['cover'],
+            "content":data.get("content",""),
+            "publish_time":data['update_time'],
+        }
+        if 'digest' in data:
+            art['description']=data['digest']
+        return art
     def FillBack(self,CallBack=None,data=None,Ext_Data=None):
         if CallBack is not None:
             if data is not  None:
                 setStatus(True)
-                from core.models import Article
-                from datetime import datetime
-                art={
-                    "id":str(data['id']),
-                    "mp_id":data['mp_id'],
-                    "title":data['title'],
-                    "url":data['link'],
-                    "pic_url":data['cover'],
-                    "content":data.get("content",""),
-                    "publish_time":data['update_time'],
-                }
-                if 'digest' in data:
-                    art['description']=data['digest']
-                if CallBack(art):
+                art=self._make_art(data)
+                ok=CallBack(art)
+                self.RecordAid(art["id"],art["mp_id"])
+                if ok:
                     art["ext"]=Ext_Data
                     # art.pop("content")
                     self.articles.append(art)
+    def FillBackPage(self,CallBack=None,items:list=None,Ext_Data=None):
+        """整页回填，回调提供batch时一页只入库一次，否则逐条调用FillBack"""
+        if CallBack is None or not items:
+            return
+        batch=getattr(CallBack,"batch",None)
+        if batch is None:
+            for item in items:
+                self.FillBack(CallBack=CallBack,data=item,Ext_Data=Ext_Data)
+            return
+        setStatus(True)
+        arts=[self._make_art(item) for item in items]
+        for art,ok in zip(arts,batch(arts)):
+            # 写入失败(None)的文章不记为已采集，下次采集时重试
+            if ok is not None:
+                self.RecordAid(art["id"],art["mp_id"])
+            if ok:
+                art["ext"]=Ext_Data
+                self.articles.append(art)
 
 
     #通过公众号码平台接口查询公众号
@@ -208,7 +232,8 @@ class WxGather:
             import threading
             setStatus(False)
             from core.queue import TaskQueue
-            TaskQueue.clear_queue()
+            # 登录失效后其他公众号的采集也会失败，只取消采集任务
+            TaskQueue.clear_queue(prefix="gather:")
             threading.Thread(target=send_wx_code,args=(f"公众号平台登录失效,请重新登录",)).start()
             # send_wx_code(f"公众号平台登录失效,请重新登录")
             raise Exception(error)
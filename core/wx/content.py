@@ -0,0 +1,133 @@
+import threading
+import time
+from core.print import print_error, print_info
+from core.log import logger
+from .limiter import LIMITER, CONTENT
+from core.metrics import METRICS
+
+ANTI_BOT_TEXT = "当前环境异常，完成验证后即可继续访问"
+DELETED_TEXTS = ["该内容已被发布者删除", "The content has been deleted by the author.", "内容审核中"]
+
+HTTP = "http"
+BROWSER = "browser"
+
+
+class TierStats:
+    """单个抓取层级的成功率与耗时统计"""
+
+    def __init__(self):
+        self.attempts = 0
+        self.success = 0
+        self.failed = {}
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, cost: float, ok: bool, reason: str = None) -> None:
+        self.attempts += 1
+        self.total += cost
+        self.max = max(self.max, cost)
+        if ok:
+            self.success += 1
+        elif reason:
+            self.failed[reason] = self.failed.get(reason, 0) + 1
+
+    def info(self) -> dict:
+        return {
+            'attempts': self.attempts,
+            'success': self.success,
+            'failed': dict(self.failed),
+            'avg': round(self.total / self.attempts, 3) if self.attempts else 0,
+            'max': round(self.max, 3),
+        }
+
+
+class ContentPipeline:
+    """分层抓取文章正文
+
+    先用普通HTTP请求获取页面并解析#js_content，只有遇到环境异常验证页、
+    内容已删除或找不到正文时才交给浏览器(driver.wxarticle)抓取，由浏览器确认删除状态。
+    返回正文HTML，内容已删除返回"DELETED"，失败返回空字符串。
+    """
+
+    def __init__(self):
+        self.stats = {HTTP: TierStats(), BROWSER: TierStats()}
+        self._api = None
+        self._lock = threading.Lock()
+
+    def _get_api(self):
+        # 复用接口模式的请求头、会话和正文解析
+        if self._api is None:
+            with self._lock:
+                if self._api is None:
+                    from .wx1 import MpsApi
+                    self._api = MpsApi()
+        return self._api
+
+    def _http(self, url: str):
+        """返回(正文, 失败原因)，失败原因不为空时需要交给浏览器"""
+        api = self._get_api()
+        LIMITER.acquire(CONTENT)
+        try:
+            r = api.session.get(url, headers=api.fix_header(url), timeout=(5, 10))
+        except Exception as e:
+            logger.error(e)
+            return "", "error"
+        if r.status_code != 200:
+            return "", f"status_{r.status_code}"
+        text = r.text
+        if ANTI_BOT_TEXT in text:
+            LIMITER.penalize(CONTENT)
+            return "", "anti_bot"
+        if any(t in text for t in DELETED_TEXTS):
+            return "", "deleted"
+        content = api.parse_content(text)
+        if not content:
+            return "", "no_content"
+        return content, None
+
+    def _browser(self, url: str):
+        from driver.wxarticle import Web
+        content = Web.get_article_content(url).get("content")
+        if not content:
+            return "", "no_content"
+        if content == "DELETED":
+            return content, None
+        if ANTI_BOT_TEXT in content:
+            print_error(ANTI_BOT_TEXT)
+            return "", "anti_bot"
+        # 浏览器返回的是#js_content的innerHTML，补上外层后按同样的规则处理图片
+        content = self._get_api().parse_content(f'<div id="js_content">{content}</div>')
+        if not content:
+            return "", "no_content"
+        return content, None
+
+    def _run(self, tier: str, fetch, url: str):
+        start = time.perf_counter()
+        try:
+            content, reason = fetch(url)
+        except Exception as e:
+            print_error(f"{tier}抓取文章内容失败: {e}")
+            content, reason = "", "error"
+        cost = time.perf_counter() - start
+        with self._lock:
+            self.stats[tier].record(cost, reason is None, reason)
+        METRICS.observe("content_fetch_seconds", {"tier": tier}, cost)
+        return content, reason
+
+    def fetch(self, url: str, use_browser: bool = True) -> str:
+        content, reason = self._run(HTTP, self._http, url)
+        if reason is None:
+            return content
+        if not use_browser:
+            # 不使用浏览器确认时，按HTTP页面的删除提示标记为已删除，与浏览器的判断一致
+            return "DELETED" if reason == "deleted" else ""
+        print_info(f"HTTP抓取失败({reason})，改用浏览器: {url}")
+        content, reason = self._run(BROWSER, self._browser, url)
+        return content if reason is None else ""
+
+    def info(self) -> dict:
+        with self._lock:
+            return {k: v.info() for k, v in self.stats.items()}
+
+
+CONTENT_PIPELINE = ContentPipeline()
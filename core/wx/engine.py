@@ -0,0 +1,101 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Callable, Iterable, List
+from core.config import cfg
+from core.print import print_error, print_info
+
+
+class FeedStats:
+    """单个公众号的采集耗时统计"""
+
+    def __init__(self):
+        self.runs = 0
+        self.errors = 0
+        self.total = 0.0
+        self.last = 0.0
+        self.max = 0.0
+        self.last_run = 0
+
+    def record(self, cost: float, ok: bool) -> None:
+        self.runs += 1
+        self.total += cost
+        self.last = cost
+        self.max = max(self.max, cost)
+        self.last_run = int(time.time())
+        if not ok:
+            self.errors += 1
+
+    def info(self) -> dict:
+        return {
+            'runs': self.runs,
+            'errors': self.errors,
+            'last': round(self.last, 3),
+            'avg': round(self.total / self.runs, 3) if self.runs else 0,
+            'max': round(self.max, 3),
+            'last_run': self.last_run,
+        }
+
+
+class GatherEngine:
+    """并发采集多个公众号
+
+    同时运行gather.concurrency个公众号的采集，请求速率由core.wx.limiter按token统一控制，
+    并发只用来填满等待网络的时间，不会超出限速。
+    """
+
+    def __init__(self, concurrency: int = None):
+        self.concurrency = concurrency
+        self.stats = {}
+        self.running = 0
+        self._lock = threading.Lock()
+
+    def get_concurrency(self) -> int:
+        return max(1, int(self.concurrency or cfg.get("gather.concurrency", 4) or 1))
+
+    def run_one(self, feed, job: Callable[[Any], Any]):
+        """执行job(feed)并记录该公众号的耗时统计"""
+        feed_id = getattr(feed, "id", str(feed))
+        start = time.perf_counter()
+        ok = False
+        with self._lock:
+            self.running += 1
+        try:
+            result = job(feed)
+            ok = True
+            return result
+        finally:
+            cost = time.perf_counter() - start
+            with self._lock:
+                self.running -= 1
+                self.stats.setdefault(feed_id, FeedStats()).record(cost, ok)
+
+    def run(self, feeds: Iterable, job: Callable[[Any], Any]) -> List[Any]:
+        """并发执行job(feed)，单个公众号失败不影响其他公众号，返回成功的结果"""
+        feeds = list(feeds)
+        if not feeds:
+            return []
+        results = []
+        workers = min(self.get_concurrency(), len(feeds))
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="gather") as pool:
+            futures = {pool.submit(self.run_one, feed, job): feed for feed in feeds}
+            for future in as_completed(futures):
+                feed = futures[future]
+                try:
+                    results.append(future.result())
+                except Exception as e:
+                    print_error(f"采集[{getattr(feed, 'mp_name', feed)}]失败: {e}")
+        print_info(f"{len(feeds)}个公众号采集完成，并发{workers}，耗时{time.perf_counter() - start:.1f}秒")
+        return results
+
+    def info(self) -> dict:
+        with self._lock:
+            return {
+                'concurrency': self.get_concurrency(),
+                'running': self.running,
+                'feeds': {k: v.info() for k, v in self.stats.items()},
+            }
+
+
+GATHER_ENGINE = GatherEngine()
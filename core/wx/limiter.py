@@ -0,0 +1,133 @@
+import threading
+import time
+from core.config import cfg
+from core.print import print_warning
+
+
+class TokenBucket:
+    """令牌桶限速器
+
+    以rate(次/秒)的速度补充令牌，最多积攒burst个。触发频率限制时降低速率并暂停cooldown秒，
+    之后每连续成功recover_after次把速率提高一档，直到恢复到初始速率。
+    """
+
+    def __init__(self, rate: float, burst: int = 1, min_rate: float = 0.02, cooldown: float = 60,
+                 penalty: float = 0.5, recover: float = 1.25, recover_after: int = 10):
+        self.base_rate = rate
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.min_rate = min(min_rate, rate)
+        self.cooldown = cooldown
+        self.penalty = penalty
+        self.recover = recover
+        self.recover_after = recover_after
+        self.tokens = float(self.burst)
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self.successes = 0
+        self.penalties = 0
+        self.requests = 0
+        self.waited = 0.0
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self) -> float:
+        """取得一个令牌，必要时阻塞等待，返回等待的秒数"""
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if now >= self.blocked_until and self.tokens >= 1:
+                    self.tokens -= 1
+                    self.requests += 1
+                    self.waited += waited
+                    return waited
+                if now < self.blocked_until:
+                    delay = self.blocked_until - now
+                else:
+                    delay = (1 - self.tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+    def penalize(self) -> None:
+        """触发频率限制：降速、清空令牌并暂停一段时间"""
+        with self._lock:
+            self.rate = max(self.min_rate, self.rate * self.penalty)
+            self.tokens = 0
+            self.successes = 0
+            self.penalties += 1
+            self.blocked_until = time.monotonic() + self.cooldown
+            self.updated = time.monotonic()
+
+    def success(self) -> None:
+        with self._lock:
+            if self.rate >= self.base_rate:
+                return
+            self.successes += 1
+            if self.successes >= self.recover_after:
+                self.rate = min(self.base_rate, self.rate * self.recover)
+                self.successes = 0
+
+    def info(self) -> dict:
+        with self._lock:
+            return {
+                'rate': round(self.rate, 4),
+                'base_rate': self.base_rate,
+                'tokens': round(self.tokens, 2),
+                'requests': self.requests,
+                'penalties': self.penalties,
+                'waited': round(self.waited, 2),
+                'blocked': max(0, round(self.blocked_until - time.monotonic(), 2)),
+            }
+
+
+class RateLimiter:
+    """按key(公众号平台token或内容抓取)分别限速"""
+
+    def __init__(self):
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def _new_bucket(self, key: str) -> TokenBucket:
+        if key == CONTENT:
+            rate = float(cfg.get("gather.content_rate", 0.5) or 0.5)
+            burst = int(cfg.get("gather.content_burst", 2) or 1)
+        else:
+            rate = float(cfg.get("gather.rate", 0.2) or 0.2)
+            burst = int(cfg.get("gather.burst", 3) or 1)
+        return TokenBucket(rate=rate, burst=burst, cooldown=float(cfg.get("gather.cooldown", 60) or 60))
+
+    def bucket(self, key: str) -> TokenBucket:
+        key = key or ""
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._new_bucket(key)
+                self._buckets[key] = bucket
+            return bucket
+
+    def acquire(self, key: str) -> float:
+        return self.bucket(key).acquire()
+
+    def penalize(self, key: str) -> None:
+        bucket = self.bucket(key)
+        bucket.penalize()
+        print_warning(f"触发频率限制，降速至{bucket.rate:.3f}次/秒，暂停{bucket.cooldown}秒")
+
+    def success(self, key: str) -> None:
+        self.bucket(key).success()
+
+    def info(self) -> dict:
+        with self._lock:
+            items = list(self._buckets.items())
+        # token不直接展示，只保留末尾几位用于区分
+        return {(k if k == CONTENT else f"token:***{k[-4:]}"): b.info() for k, b in items}
+
+
+# 文章内容页抓取不消耗公众号平台接口额度，单独限速
+CONTENT = "content"
+LIMITER = RateLimiter()
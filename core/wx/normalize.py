@@ -0,0 +1,91 @@
+import re
+from core.log import logger
+
+try:
+    from lxml import html as lxml_html
+    from lxml.etree import ParserError
+    LXML = True
+except ImportError:
+    LXML = False
+
+WIDTH_PATTERN = re.compile(r'width\s*:\s*\d+\s*px')
+# libxml2输出HTML时只写属性名的布尔属性
+BOOLEAN_ATTRS = {'checked', 'compact', 'declare', 'defer', 'disabled', 'ismap', 'multiple',
+                 'nohref', 'noresize', 'noshade', 'nowrap', 'readonly', 'selected'}
+
+
+def _fix_img(attrs) -> None:
+    """懒加载地址写回src，图片宽度统一为1080px"""
+    if 'data-src' in attrs:
+        attrs['src'] = attrs['data-src']
+        del attrs['data-src']
+    if 'style' in attrs:
+        attrs['style'] = WIDTH_PATTERN.sub('width: 1080px', attrs['style'])
+
+
+def _normalize_lxml(text: str) -> str:
+    try:
+        doc = lxml_html.fromstring(text)
+    except (ParserError, ValueError):
+        # 空文档或带编码声明的字符串，交给html.parser处理
+        return None
+    found = doc.xpath('//div[@id="js_content"]')
+    if not found:
+        return ""
+    div = found[0]
+    # 移除style属性中的visibility: hidden;
+    div.attrib.pop('style', None)
+    for img in div.iter('img'):
+        _fix_img(img.attrib)
+    return lxml_html.tostring(div, encoding='unicode', with_tail=False)
+
+
+_FORMATTER = None
+
+
+def _bs4_formatter():
+    """与lxml.html.tostring一致的输出：保持属性顺序、空元素不加斜杠、空属性只写属性名"""
+    global _FORMATTER
+    if _FORMATTER is None:
+        from bs4.formatter import HTMLFormatter
+        from bs4.dammit import EntitySubstitution
+
+        class _Formatter(HTMLFormatter):
+            def attributes(self, tag):
+                return [(k, None if k in BOOLEAN_ATTRS and v in ('', k) else v) for k, v in tag.attrs.items()]
+
+        _FORMATTER = _Formatter(entity_substitution=EntitySubstitution.substitute_xml,
+                                void_element_close_prefix=None)
+    return _FORMATTER
+
+
+def _normalize_bs4(text: str) -> str:
+    from bs4 import BeautifulSoup
+    soup = BeautifulSoup(text, 'html.parser')
+    div = soup.find('div', {'id': 'js_content'})
+    if div is None:
+        return ""
+    div.attrs.pop('style', None)
+    for img in div.find_all('img'):
+        _fix_img(img.attrs)
+    return div.decode(formatter=_bs4_formatter())
+
+
+def normalize_content(text: str) -> str:
+    """从文章页面提取#js_content正文并规范化，所有采集方式入库前共用
+
+    一次解析完成：去掉正文容器的隐藏样式、懒加载图片地址写回src、统一图片宽度，
+    输出紧凑HTML(不做prettify缩进)。安装lxml时使用lxml解析，否则使用html.parser，
+    两种解析方式的输出一致(可用tools/bench_normalize.py对比)。找不到正文返回空字符串。
+    """
+    if not text:
+        return ""
+    try:
+        if LXML:
+            content = _normalize_lxml(text)
+            if content is not None:
+                return content
+        return _normalize_bs4(text)
+    except Exception as e:
+        logger.error(e)
+    return ""
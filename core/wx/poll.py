@@ -0,0 +1,188 @@
+import threading
+import time
+from collections import deque
+from typing import Dict, List
+from core.config import cfg
+from core.print import print_info
+
+HOUR = 3600
+DAY = 86400
+
+
+class FeedCadence:
+    """单个公众号的发文规律：平均每天发文数和按小时的发文分布"""
+
+    def __init__(self, publish_times: List[int], history_days: int):
+        self.samples = len(publish_times)
+        self.last_publish = max(publish_times) if publish_times else 0
+        # 加0.5篇的先验，没有历史文章的公众号也保持一个很低的发文率
+        self.rate = (self.samples + 0.5) / max(1, history_days)
+        counts = [1.0] * 24
+        for ts in publish_times:
+            counts[time.localtime(ts).tm_hour] += 1
+        total = sum(counts)
+        self.hours = [c / total for c in counts]
+
+    def expected(self, start: int, end: int) -> float:
+        """[start, end)时间段内预计的发文数"""
+        acc = 0.0
+        t = start
+        while t < end:
+            step = min(end, t - t % HOUR + HOUR) - t
+            acc += self.rate * 24 * self.hours[time.localtime(t).tm_hour] * step / DAY
+            t += step
+        return acc
+
+    def info(self) -> dict:
+        return {
+            'samples': self.samples,
+            'per_day': round(self.rate, 3),
+            'last_publish': self.last_publish,
+            'peak_hour': max(range(24), key=lambda h: self.hours[h]),
+        }
+
+
+class PollPlanner:
+    """按发文规律安排每个公众号的采集时间
+
+    根据最近gather.poll_history_days天的发文时间估计发文率和按小时的分布，
+    从上次采集开始累加预计发文数，达到gather.poll_target篇时即为下次采集时间，
+    并限制在poll_min_interval和poll_max_interval之间：常发文的公众号在其发文时段频繁采集，
+    长期不发文的公众号很少采集。到期的公众号超过gather.poll_budget(次/小时)时，
+    优先采集预计新文章最多的，其余顺延。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._cadence: Dict[str, FeedCadence] = {}
+        self._polled: Dict[str, int] = {}
+        self._next: Dict[str, tuple] = {}
+        self._history = deque()
+        self.loaded_at = 0
+        self.deferred = 0
+
+    def history_days(self) -> int:
+        return max(1, int(cfg.get("gather.poll_history_days", 90) or 90))
+
+    def min_interval(self) -> int:
+        return int(cfg.get("gather.poll_min_interval", 1800) or 1800)
+
+    def max_interval(self) -> int:
+        return int(cfg.get("gather.poll_max_interval", 7 * DAY) or 7 * DAY)
+
+    def target(self) -> float:
+        return float(cfg.get("gather.poll_target", 0.5) or 0.5)
+
+    def budget(self) -> int:
+        return int(cfg.get("gather.poll_budget", 60) or 0)
+
+    def refresh(self, force: bool = False) -> None:
+        """重新统计发文规律，默认每小时一次"""
+        now = int(time.time())
+        if not force and now - self.loaded_at < HOUR:
+            return
+        from sqlalchemy import select
+        from core.db import DB
+        from core.models.article import Article
+        days = self.history_days()
+        history: Dict[str, List[int]] = {}
+        query = select(Article.mp_id, Article.publish_time).where(Article.publish_time >= now - days * DAY)
+        # 使用独立连接分批读取，不占用调用线程的会话
+        with DB.get_engine().connect() as conn:
+            for mp_id, publish_time in conn.execution_options(yield_per=5000).execute(query):
+                if publish_time:
+                    history.setdefault(mp_id, []).append(int(publish_time))
+        cadence = {mp_id: FeedCadence(times, days) for mp_id, times in history.items()}
+        with self._lock:
+            self._cadence = cadence
+            self.loaded_at = now
+        print_info(f"公众号发文规律统计完成: {len(cadence)}个公众号")
+
+    def cadence(self, feed_id: str) -> FeedCadence:
+        with self._lock:
+            cadence = self._cadence.get(feed_id)
+        return cadence or FeedCadence([], self.history_days())
+
+    def last_poll(self, feed) -> int:
+        with self._lock:
+            polled = self._polled.get(feed.id, 0)
+        return max(int(feed.sync_time or 0), polled)
+
+    def next_poll(self, feed) -> int:
+        """从上次采集开始，预计发文数累计达到poll_target的时间"""
+        last = self.last_poll(feed)
+        with self._lock:
+            cached = self._next.get(feed.id)
+        if cached and cached[0] == last and cached[1] == self.loaded_at:
+            return cached[2]
+        cadence = self.cadence(feed.id)
+        low, high = last + self.min_interval(), last + self.max_interval()
+        target = self.target()
+        acc = cadence.expected(last, low)
+        t = low
+        while t < high and acc < target:
+            step = t - t % HOUR + HOUR - t
+            acc += cadence.expected(t, t + step)
+            t += step
+        next_poll = min(t, high)
+        with self._lock:
+            self._next[feed.id] = (last, self.loaded_at, next_poll)
+        return next_poll
+
+    def record(self, feed_id: str, now: int = None) -> None:
+        now = now or int(time.time())
+        with self._lock:
+            self._polled[feed_id] = now
+            self._history.append(now)
+
+    def _used(self, now: int) -> int:
+        with self._lock:
+            while self._history and self._history[0] <= now - HOUR:
+                self._history.popleft()
+            return len(self._history)
+
+    def due(self, feeds: list, now: int = None) -> list:
+        """返回本次应采集的公众号，按预计新文章数从多到少，受每小时预算限制"""
+        now = now or int(time.time())
+        self.refresh()
+        due = []
+        for feed in feeds:
+            if self.next_poll(feed) <= now:
+                due.append((self.cadence(feed.id).expected(self.last_poll(feed), now), feed))
+        due.sort(key=lambda x: x[0], reverse=True)
+        budget = self.budget()
+        if budget > 0:
+            allowed = max(0, budget - self._used(now))
+            self.deferred += max(0, len(due) - allowed)
+            due = due[:allowed]
+        return [feed for _, feed in due]
+
+    def plan(self, feeds: list) -> list:
+        """每个公众号的发文规律和下次采集时间"""
+        self.refresh()
+        now = int(time.time())
+        result = []
+        for feed in feeds:
+            next_poll = self.next_poll(feed)
+            result.append({
+                'mp_id': feed.id,
+                'mp_name': feed.mp_name,
+                'last_poll': self.last_poll(feed),
+                'next_poll': next_poll,
+                'due': next_poll <= now,
+                **self.cadence(feed.id).info(),
+            })
+        result.sort(key=lambda x: x['next_poll'])
+        return result
+
+    def info(self) -> dict:
+        return {
+            'budget': self.budget(),
+            'used': self._used(int(time.time())),
+            'deferred': self.deferred,
+            'feeds': len(self._cadence),
+            'loaded_at': self.loaded_at,
+        }
+
+
+POLL_PLANNER = PollPlanner()
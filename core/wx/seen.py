@@ -0,0 +1,122 @@
+import hashlib
+import math
+import threading
+import time
+from core.config import cfg
+from core.print import print_info, print_error
+
+
+class BloomFilter:
+    """布隆过滤器，判断不存在时一定不存在，判断存在时有error_rate的概率误判"""
+
+    def __init__(self, capacity: int, error_rate: float = 0.001):
+        self.capacity = max(1, capacity)
+        self.error_rate = error_rate
+        self.size = max(8, int(math.ceil(-self.capacity * math.log(error_rate) / (math.log(2) ** 2))))
+        self.hashes = max(1, int(round(self.size / self.capacity * math.log(2))))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, key: str):
+        digest = hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        for i in range(self.hashes):
+            yield (h1 + i * h2) % self.size
+
+    def add(self, key: str) -> None:
+        for pos in self._positions(key):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+        self.count += 1
+
+    def __contains__(self, key: str) -> bool:
+        return all(self.bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(key))
+
+
+class SeenSet:
+    """已采集文章集合
+
+    以文章表为准，进程内用布隆过滤器做前置判断：过滤器判断不存在直接返回，
+    判断存在时再按主键查询数据库确认，排除误判。首次使用时从文章表加载全部ID，
+    重启后不会重复抓取已入库文章的正文。
+    """
+
+    def __init__(self):
+        self.capacity = int(cfg.get("gather.seen_capacity", 1000000) or 1000000)
+        self.bloom = None
+        self._lock = threading.Lock()
+        self.checks = 0
+        self.misses = 0
+        self.confirmed = 0
+        self.false_positives = 0
+        self.warmed_at = 0
+
+    def _warm(self) -> None:
+        from core.db import DB
+        from core.models.article import Article
+        start = time.time()
+        session = DB.get_session()
+        total = session.query(Article.id).count()
+        # 预留一倍余量，超出后重新加载并扩容
+        capacity = max(self.capacity, total * 2)
+        bloom = BloomFilter(capacity)
+        for (article_id,) in session.query(Article.id).yield_per(10000):
+            bloom.add(article_id)
+        self.bloom = bloom
+        self.capacity = capacity
+        self.warmed_at = int(time.time())
+        print_info(f"已采集文章索引加载完成: {bloom.count}篇，耗时{time.time() - start:.1f}秒")
+
+    def _ensure(self) -> BloomFilter:
+        bloom = self.bloom
+        if bloom is None or bloom.count > bloom.capacity:
+            with self._lock:
+                if self.bloom is None or self.bloom.count > self.bloom.capacity:
+                    self._warm()
+                bloom = self.bloom
+        return bloom
+
+    def _exists(self, article_id: str) -> bool:
+        from core.db import DB
+        from core.models.article import Article
+        session = DB.get_session()
+        return session.query(Article.id).filter(Article.id == article_id).first() is not None
+
+    def contains(self, article_id: str) -> bool:
+        """文章是否已入库"""
+        self.checks += 1
+        try:
+            bloom = self._ensure()
+        except Exception as e:
+            print_error(f"加载已采集文章索引失败: {e}")
+            return self._exists(article_id)
+        if article_id not in bloom:
+            self.misses += 1
+            return False
+        if self._exists(article_id):
+            self.confirmed += 1
+            return True
+        self.false_positives += 1
+        return False
+
+    def add(self, article_id: str) -> None:
+        bloom = self.bloom
+        if bloom is not None and article_id:
+            with self._lock:
+                bloom.add(article_id)
+
+    def info(self) -> dict:
+        bloom = self.bloom
+        return {
+            'items': bloom.count if bloom else 0,
+            'capacity': bloom.capacity if bloom else self.capacity,
+            'bytes': len(bloom.bits) if bloom else 0,
+            'checks': self.checks,
+            'misses': self.misses,
+            'confirmed': self.confirmed,
+            'false_positives': self.false_positives,
+            'warmed_at': self.warmed_at,
+        }
+
+
+SEEN = SeenSet()
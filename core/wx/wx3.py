@@ -4,8 +4,10 @@ import time
 import random
 import yaml
 import re
-from bs4 import BeautifulSoup
+from .normalize import normalize_content
 from .base import WxGather
+from .limiter import LIMITER
+from core.metrics import METRICS
 from core.print import print_error
 from core.log import logger
 # 继承 BaseGather 类
@@ -13,32 +15,7 @@ class MpsAppMsg(WxGather):
 
     # 重写 content_extract 方法
     def content_extract(self,  url):
-        try:
-            text = super().content_extract(url)
-            if text is not None:
-                soup = BeautifulSoup(text, 'html.parser')
-                # 找到内容
-                js_content_div = soup.find('div', {'id': 'js_content'})
-                # 移除style属性中的visibility: hidden;
-                if js_content_div is None:
-                    return ""
-                js_content_div.attrs.pop('style', None)
-                # 找到所有的img标签
-                img_tags = js_content_div.find_all('img')
-                # 遍历每个img标签并修改属性，设置宽度为1080p
-                for img_tag in img_tags:
-                    if 'data-src' in img_tag.attrs:
-                        img_tag['src'] = img_tag['data-src']
-                        del img_tag['data-src']
-                    if 'style' in img_tag.attrs:
-                        style = img_tag['style']
-                        # 使用正则表达式替换width属性
-                        style = re.sub(r'width\s*:\s*\d+\s*px', 'width: 1080px', style)
-                        img_tag['style'] = style
-                return  js_content_div.prettify()
-        except Exception as e:
-                logger.error(e)
-        return ""
+        return normalize_content(super().content_extract(url))
     # 重写 get_Articles 方法
     def get_Articles(self, faker_id:str=None,Mps_id:str=None,Mps_title="",CallBack=None,start_page:int=0,MaxPage:int=1,interval=10,Gather_Content=False,Item_Over_CallBack=None,Over_CallBack=None):
         super().Start(mp_id=Mps_id)
@@ -69,16 +46,18 @@ class MpsAppMsg(WxGather):
             begin = i * count
             params["begin"] = str(begin)
             print(f"第{i+1}页开始爬取\n")
-            # 随机暂停几秒，避免过快的请求导致过快的被查到
-            time.sleep(random.randint(0,interval))
+            # 按token限速，多个公众号并发采集时共享同一份请求额度
+            LIMITER.acquire(self.token)
             try:
                 headers = self.fix_header(url)
-                resp = session.get(url, headers=headers, params = params, verify=False)
+                with METRICS.timer("wx_request_seconds",{"api":"appmsgpublish"}):
+                    resp = session.get(url, headers=headers, params = params, verify=False)
                 
                 msg = resp.json()
                 self._cookies =resp.cookies
                 # 流量控制了, 退出
                 if msg['base_resp']['ret'] == 200013:
+                    LIMITER.penalize(self.token)
                     super().Error("frequencey control, stop at {}".format(str(begin)))
                     break
                 
@@ -95,7 +74,9 @@ class MpsAppMsg(WxGather):
                 if msg['base_resp']['ret'] != 0:
                     super().Error("错误原因:{}:代码:{}".format(msg['base_resp']['err_msg'],msg['base_resp']['ret']))
                     break  
+                LIMITER.success(self.token)
                 if "publish_page" in msg:
+                    page_items=[]
                     msg["publish_page"]=json.loads(msg['publish_page'])
                     for item in msg["publish_page"]['publish_list']:
                         if "publish_info" in item:
@@ -104,15 +85,17 @@ class MpsAppMsg(WxGather):
                             if "appmsgex" in publish_info:
                                 # info = '"{}","{}","{}","{}"'.format(str(item["aid"]), item['title'], item['link'], str(item['create_time']))
                                 for item in publish_info["appmsgex"]:
+                                    # 已入库的文章不再抓取正文，也不再回填
+                                    if super().HasGathered(item["aid"],Mps_id):
+                                        continue
                                     if Gather_Content:
-                                        if not super().HasGathered(item["aid"]):
-                                            item["content"] = self.content_extract(item['link'])
+                                        item["content"] = self.content_extract(item['link'])
                                     else:
                                         item["content"] = ""
                                     item["id"] = item["aid"]
                                     item["mp_id"] = Mps_id
-                                    if CallBack is not None:
-                                        super().FillBack(CallBack=CallBack,data=item,Ext_Data={"mp_title":Mps_title,"mp_id":Mps_id})
+                                    page_items.append(item)
+                    super().FillBackPage(CallBack=CallBack,items=page_items,Ext_Data={"mp_title":Mps_title,"mp_id":Mps_id})
                     print(f"第{i+1}页爬取成功\n")
                 # 翻页
                 i += 1
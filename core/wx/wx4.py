@@ -0,0 +1,178 @@
+import asyncio
+import threading
+import time
+import httpx
+from .wx1 import MpsApi
+from .cfg import cfg
+from .limiter import LIMITER, CONTENT
+from core.metrics import METRICS
+from core.print import print_error
+from core.log import logger
+
+try:
+    import h2  # noqa: F401
+    HTTP2 = True
+except ImportError:
+    HTTP2 = False
+
+ANTI_BOT_TEXT = "当前环境异常，完成验证后即可继续访问"
+
+
+def run_sync(coro):
+    """在同步代码中运行协程，当前线程已有事件循环时放到新线程中运行"""
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coro)
+    result = {}
+
+    def runner():
+        try:
+            result["value"] = asyncio.run(coro)
+        except BaseException as e:
+            result["error"] = e
+    t = threading.Thread(target=runner)
+    t.start()
+    t.join()
+    if "error" in result:
+        raise result["error"]
+    return result.get("value")
+
+
+# 继承 MpsApi 类，接口与解析相同，网络请求改为异步
+class MpsAsyncApi(MpsApi):
+    """基于httpx.AsyncClient的接口采集模式
+
+    列表页与正文抓取流水线执行：一页列表返回后立即请求下一页，
+    该页的正文按gather.async_concurrency并发抓取，抓取完成后整页入库。
+    连接保持复用，安装h2时使用HTTP/2。
+    """
+
+    def _client(self) -> httpx.AsyncClient:
+        concurrency = self._concurrency()
+        return httpx.AsyncClient(
+            http2=HTTP2,
+            verify=False,
+            timeout=httpx.Timeout(10, connect=5),
+            headers=self.headers,
+            limits=httpx.Limits(max_connections=concurrency + 2, max_keepalive_connections=concurrency + 2),
+        )
+
+    def _concurrency(self) -> int:
+        return max(1, int(cfg.get("gather.async_concurrency", 4) or 1))
+
+    async def _fetch_content(self, client: httpx.AsyncClient, sem: asyncio.Semaphore, url: str):
+        async with sem:
+            await asyncio.to_thread(LIMITER.acquire, CONTENT)
+            start = time.perf_counter()
+            try:
+                r = await client.get(url, headers=self.fix_header(url))
+                METRICS.observe("content_fetch_seconds", {"tier": "async"}, time.perf_counter() - start)
+                if r.status_code != 200:
+                    return None
+                text = r.text
+                if ANTI_BOT_TEXT in text:
+                    print_error(ANTI_BOT_TEXT)
+                    LIMITER.penalize(CONTENT)
+                    return None
+            except httpx.HTTPError as e:
+                logger.error(e)
+                return None
+        # 解析正文、入库等同步操作放到工作线程，避免阻塞事件循环中的其他请求
+        return await asyncio.to_thread(self.parse_content, text)
+
+    async def _fill_page(self, page_items, contents, CallBack, Ext_Data):
+        for item, task in zip(page_items, contents):
+            if task is not None:
+                item["content"] = await task
+        # 入库包含数据库写入和图片本地化下载
+        await asyncio.to_thread(self.FillBackPage, CallBack=CallBack, items=page_items, Ext_Data=Ext_Data)
+
+    async def _get_articles(self, faker_id, Mps_id, Mps_title, CallBack, start_page, MaxPage, Gather_Content, Item_Over_CallBack):
+        url = "https://mp.weixin.qq.com/cgi-bin/appmsg"
+        count = 5
+        params = {
+            "action": "list_ex",
+            "begin": start_page,
+            "count": count,
+            "fakeid": faker_id,
+            "type": "9",
+            "token": self.token,
+            "lang": "zh_CN",
+            "f": "json",
+            "ajax": "1"
+        }
+        Ext_Data = {"mp_title": Mps_title, "mp_id": Mps_id}
+        sem = asyncio.Semaphore(self._concurrency())
+        pages = []
+        async with self._client() as client:
+            try:
+                i = start_page
+                while i < MaxPage:
+                    begin = i * count
+                    params["begin"] = str(begin)
+                    print(f"第{i+1}页开始爬取\n")
+                    await asyncio.to_thread(LIMITER.acquire, self.token)
+                    try:
+                        start = time.perf_counter()
+                        resp = await client.get(url, headers=self.fix_header(url), params=params)
+                        METRICS.observe("wx_request_seconds", {"api": "appmsg"}, time.perf_counter() - start)
+                        msg = resp.json()
+                        self._cookies = resp.cookies.jar
+                        ret = msg['base_resp']['ret']
+                        # 流量控制了, 退出
+                        if ret == 200013:
+                            LIMITER.penalize(self.token)
+                            self.Error("frequencey control, stop at {}".format(str(begin)))
+                            break
+                        if ret == 200003:
+                            self.Error("Invalid Session, stop at {}".format(str(begin)), code="Invalid Session")
+                            break
+                        # 如果返回的内容中为空则结束
+                        if 'app_msg_list' not in msg:
+                            self.Error("all ariticle parsed")
+                            break
+                        if ret != 0:
+                            self.Error("错误原因:{}:代码:{}".format(msg['base_resp']['err_msg'], ret), code="Invalid Session")
+                            break
+                        LIMITER.success(self.token)
+                        page_items = []
+                        contents = []
+                        for item in msg["app_msg_list"]:
+                            # 已入库的文章不再抓取正文，也不再回填
+                            if await asyncio.to_thread(self.HasGathered, item["aid"], Mps_id):
+                                continue
+                            item["content"] = ""
+                            item["id"] = item["aid"]
+                            item["mp_id"] = Mps_id
+                            task = None
+                            if Gather_Content:
+                                task = asyncio.create_task(self._fetch_content(client, sem, item['link']))
+                            page_items.append(item)
+                            contents.append(task)
+                        # 正文在后台抓取，不阻塞下一页列表请求
+                        pages.append(asyncio.create_task(self._fill_page(page_items, contents, CallBack, Ext_Data)))
+                        print(f"第{i+1}页爬取成功\n")
+                        i += 1
+                    except httpx.TimeoutException:
+                        print("Request timed out")
+                        break
+                    except httpx.HTTPError as e:
+                        print(f"Request error: {e}")
+                        break
+                    finally:
+                        self.Item_Over(item={"mps_id": Mps_id, "mps_title": Mps_title}, CallBack=Item_Over_CallBack)
+            finally:
+                # 等待已开始的页面全部入库，失败的页面不影响其他页面
+                for result in await asyncio.gather(*pages, return_exceptions=True):
+                    if isinstance(result, Exception):
+                        print_error(f"保存文章失败: {result}")
+
+    # 重写 get_Articles 方法
+    def get_Articles(self, faker_id:str=None,Mps_id:str=None,Mps_title="",CallBack=None,start_page=0,MaxPage:int=1,interval=10,Gather_Content=True,Item_Over_CallBack=None,Over_CallBack=None):
+        super().Start(mp_id=Mps_id)
+        if self.Gather_Content:
+             Gather_Content=True
+        print(f"异步API获取模式,是否采集[{Mps_title}]内容：{Gather_Content}\n")
+        run_sync(self._get_articles(faker_id, Mps_id, Mps_title, CallBack, start_page, MaxPage, Gather_Content, Item_Over_CallBack))
+        super().Over(CallBack=Over_CallBack)
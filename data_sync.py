@@ -9,6 +9,12 @@ import logging
 
 class DatabaseSynchronizer:
     """数据库模型同步器"""
+    # 新增字段后需要按已有数据回填的值 (表名, 字段名) -> SQL
+    COLUMN_BACKFILLS = {
+        ("articles", "has_content"): "UPDATE articles SET has_content = CASE WHEN content IS NULL OR content = '' THEN 0 ELSE 1 END",
+        ("articles", "content_attempts"): "UPDATE articles SET content_attempts = 0 WHERE content_attempts IS NULL",
+        ("articles", "content_retry_at"): "UPDATE articles SET content_retry_at = 0 WHERE content_retry_at IS NULL",
+    }
     
     def __init__(self, db_url: str, models_dir: str = "core/models"):
         """
@@ -116,6 +122,46 @@ class DatabaseSynchronizer:
             self.logger.warning(f"权限检查失败: {e}")
             return True  # 如果检查失败，继续尝试
 
+    def _backfill_column(self, table_name: str, col_name: str):
+        """新增字段后按已有数据回填"""
+        sql = self.COLUMN_BACKFILLS.get((table_name, col_name))
+        if not sql:
+            return
+        from sqlalchemy import text
+        try:
+            with self.engine.begin() as conn:
+                result = conn.execute(text(sql))
+            self.logger.info(f"回填字段: {table_name}.{col_name} ({result.rowcount}行)")
+        except SQLAlchemyError as e:
+            self.logger.error(f"回填字段 {table_name}.{col_name} 失败: {e}")
+
+    def sync_indexes(self, model) -> Dict[str, str]:
+        """创建模型中声明但数据库中缺失的索引，并校验已有索引的字段
+
+        :return: 索引名 -> 状态(created/ok/mismatch/failed)
+        """
+        table_name = model.__tablename__
+        inspector = inspect(self.engine)
+        existing = {ix["name"]: ix["column_names"] for ix in inspector.get_indexes(table_name)}
+        result = {}
+        for index in model.__table__.indexes:
+            columns = [c.name for c in index.columns]
+            if index.name in existing:
+                if list(existing[index.name]) != columns:
+                    self.logger.warning(f"索引字段不一致: {table_name}.{index.name} 数据库{existing[index.name]} 模型{columns}")
+                    result[index.name] = "mismatch"
+                else:
+                    result[index.name] = "ok"
+                continue
+            try:
+                index.create(self.engine)
+                self.logger.info(f"创建索引: {table_name}.{index.name}({', '.join(columns)})")
+                result[index.name] = "created"
+            except SQLAlchemyError as e:
+                self.logger.error(f"创建索引 {table_name}.{index.name} 失败: {e}")
+                result[index.name] = "failed"
+        return result
+
     def sync(self):
         """同步模型到数据库"""
         try:
@@ -181,9 +227,11 @@ class DatabaseSynchronizer:
                                             # SQLite和MySQL语法
                                             conn.execute(text(f"ALTER TABLE {table_name} ADD COLUMN {col_name} {model_col.type}"))
                                     self.logger.info(f"新增字段: {table_name}.{col_name}")
+                                    self._backfill_column(table_name, col_name)
                                 except SQLAlchemyError as e:
                                     self.logger.error(f"添加字段 {table_name}.{col_name} 失败: {e}")
                         
+                        self.sync_indexes(model)
                         self.logger.info(f"表已同步: {table_name}")
                         
                 except SQLAlchemyError as e:
@@ -0,0 +1,173 @@
+import threading
+import time
+from contextlib import contextmanager
+from selenium.common.exceptions import WebDriverException
+from .firefox_driver import FirefoxController
+from core.config import cfg
+from core.print import print_info, print_warning, print_error
+
+
+class PooledBrowser:
+    """池中的一个浏览器实例"""
+
+    def __init__(self, controller: FirefoxController):
+        self.controller = controller
+        self.driver = controller.driver
+        self.pages = 0
+        self.created = time.time()
+        self.last_used = self.created
+        self.broken = False
+
+    def healthy(self) -> bool:
+        """浏览器进程和会话是否仍可用"""
+        if self.broken:
+            return False
+        try:
+            self.driver.execute_script("return 1")
+            return True
+        except Exception:
+            return False
+
+    def reset(self) -> None:
+        """归还前清理会话状态，避免上一篇文章的Cookie影响下一篇"""
+        try:
+            self.driver.delete_all_cookies()
+        except Exception:
+            self.broken = True
+
+    def close(self) -> None:
+        try:
+            self.controller.Close()
+        except Exception as e:
+            print_error(f"关闭浏览器失败: {e}")
+
+
+class BrowserPool:
+    """无头Firefox浏览器池
+
+    最多同时保持browser.pool_size个浏览器，取用时先做健康检查，不可用的直接丢弃重建；
+    每个浏览器打开browser.max_pages个页面后回收重建，防止内存持续增长；
+    空闲超过browser.idle_timeout秒的浏览器由后台线程关闭。
+    """
+
+    def __init__(self, size: int = None, max_pages: int = None, idle_timeout: int = None):
+        self.size = size or max(1, int(cfg.get("browser.pool_size", 2) or 1))
+        self.max_pages = max_pages or max(1, int(cfg.get("browser.max_pages", 50) or 1))
+        self.idle_timeout = idle_timeout or max(10, int(cfg.get("browser.idle_timeout", 300) or 300))
+        self._idle = []
+        self._in_use = 0
+        self._cond = threading.Condition()
+        self._reaper = None
+        self.launched = 0
+        self.recycled = 0
+        self.discarded = 0
+        self.served = 0
+        self.waited = 0.0
+
+    def _launch(self) -> PooledBrowser:
+        start = time.perf_counter()
+        controller = FirefoxController()
+        controller.start_browser(mobile_mode=True, dis_image=True)
+        self.launched += 1
+        print_info(f"浏览器启动完成，耗时{time.perf_counter() - start:.1f}秒")
+        self._start_reaper()
+        return PooledBrowser(controller)
+
+    def _checkout(self) -> PooledBrowser:
+        start = time.monotonic()
+        with self._cond:
+            while not self._idle and self._in_use >= self.size:
+                self._cond.wait()
+            self._in_use += 1
+            self.waited += time.monotonic() - start
+            browser = self._idle.pop() if self._idle else None
+        # 健康检查和启动都在锁外进行，不阻塞其他线程归还浏览器
+        if browser is not None and not browser.healthy():
+            self.discarded += 1
+            browser.close()
+            browser = None
+        if browser is None:
+            try:
+                browser = self._launch()
+            except Exception:
+                with self._cond:
+                    self._in_use -= 1
+                    self._cond.notify()
+                raise
+        return browser
+
+    def _checkin(self, browser: PooledBrowser) -> None:
+        browser.pages += 1
+        browser.last_used = time.time()
+        self.served += 1
+        keep = not browser.broken and browser.pages < self.max_pages
+        if keep:
+            browser.reset()
+            keep = not browser.broken
+        if not keep:
+            if browser.pages >= self.max_pages:
+                self.recycled += 1
+            else:
+                self.discarded += 1
+            browser.close()
+        with self._cond:
+            self._in_use -= 1
+            if keep:
+                self._idle.append(browser)
+            self._cond.notify()
+
+    @contextmanager
+    def browser(self):
+        """取出一个浏览器driver，用完自动归还
+
+        使用中抛出WebDriverException的浏览器不再放回池中
+        """
+        browser = self._checkout()
+        try:
+            yield browser.driver
+        except WebDriverException:
+            browser.broken = True
+            raise
+        finally:
+            self._checkin(browser)
+
+    def _start_reaper(self) -> None:
+        with self._cond:
+            if self._reaper is not None:
+                return
+            self._reaper = threading.Thread(target=self._reap_loop, name="browser-pool-reaper", daemon=True)
+        self._reaper.start()
+
+    def _reap_loop(self) -> None:
+        while True:
+            time.sleep(max(5, self.idle_timeout / 2))
+            self.close_idle(self.idle_timeout)
+
+    def close_idle(self, idle_seconds: float = 0) -> int:
+        """关闭空闲超过idle_seconds秒的浏览器，返回关闭的数量"""
+        now = time.time()
+        with self._cond:
+            expired = [b for b in self._idle if now - b.last_used >= idle_seconds]
+            self._idle = [b for b in self._idle if b not in expired]
+        for browser in expired:
+            browser.close()
+        if expired:
+            print_warning(f"已关闭{len(expired)}个空闲浏览器")
+        return len(expired)
+
+    def info(self) -> dict:
+        with self._cond:
+            return {
+                'size': self.size,
+                'max_pages': self.max_pages,
+                'idle': len(self._idle),
+                'in_use': self._in_use,
+                'launched': self.launched,
+                'recycled': self.recycled,
+                'discarded': self.discarded,
+                'served': self.served,
+                'waited': round(self.waited, 2),
+            }
+
+
+BROWSER_POOL = BrowserPool()
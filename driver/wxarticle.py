@@ -1,4 +1,4 @@
-from .firefox_driver import FirefoxController
+from .browser_pool import BROWSER_POOL
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
@@ -11,7 +11,7 @@ from core.config import cfg
 class WXArticleFetcher:
     """微信公众号文章获取器
     
-    基于WX_API登录状态获取文章内容
+    基于WX_API登录状态获取文章内容，浏览器从BROWSER_POOL中取用，不再每篇文章启动一次
     
     Attributes:
         wait_timeout: 显式等待超时时间(秒)
@@ -20,12 +20,9 @@ class WXArticleFetcher:
     def __init__(self, wait_timeout: int = 3):
         """初始化文章获取器"""
         self.wait_timeout = wait_timeout
-        self.controller = FirefoxController()
-        if not self.controller:
-            raise Exception("WebDriver未初始化或未登录")
-       
+        self.pool = BROWSER_POOL
         
-    def extract_biz_from_source(self,url:str) -> str:
+    def extract_biz_from_source(self,url:str,driver=None) -> str:
         """从URL或页面源码中提取biz参数
         
         1. 首先尝试从URL参数中提取__biz
@@ -39,7 +36,7 @@ class WXArticleFetcher:
         # 从页面源码中提取
         try:
             # 从页面源码中查找biz信息
-            page_source = self.driver.page_source
+            page_source = driver.page_source
             print_info(f'开始解析Biz')
             biz_match = re.search(r'var biz = "([^"]+)"', page_source)
             if biz_match:
@@ -84,15 +81,16 @@ class WXArticleFetcher:
                 "biz": "",
                 }
             }
-        self.controller.start_browser(mobile_mode=True,dis_image=True)    
+        with self.pool.browser() as driver:
+            print_warning(f"Get:{url} Wait:{self.wait_timeout}")
+            self._fetch(driver, url, info)
+        return info
 
-        self.driver = self.controller.driver
-        print_warning(f"Get:{url} Wait:{self.wait_timeout}")
-        self.controller.open_url(url)
-        driver=self.driver
+    def _fetch(self, driver, url: str, info: Dict) -> None:
+        """在取到的浏览器中打开文章并填充info"""
         wait = WebDriverWait(driver, self.wait_timeout)
+        body=""
         try:
-           
             driver.get(url)
               # 等待页面加载
             body=driver.find_element(By.TAG_NAME,"body").text
@@ -115,7 +113,7 @@ class WXArticleFetcher:
             # print(og_title.get_attribute("content"))
             # 获取文章元数据
             title = og_title.get_attribute("content")
-            self.export_to_pdf(f"./data/{title}.pdf")
+            self.export_to_pdf(title, driver)
             author = driver.find_element(
                 By.CSS_SELECTOR, "#meta_content .rich_media_meta_text"
             ).text.strip()
@@ -161,39 +159,31 @@ class WXArticleFetcher:
             info["mp_info"]={
                 "mp_name":title,
                 "logo":logo_src,
-                "biz": self.extract_biz_from_source(url), 
+                "biz": self.extract_biz_from_source(url, driver), 
             }
         except Exception as e:
             print_error(f"获取公众号信息失败: {str(e)}")   
             pass
-        self.Close()
-        return info
     def Close(self):
-        """关闭浏览器"""
-        if hasattr(self, 'controller'):
-            self.controller.Close()
-        else:
-            print("WXArticleFetcher未初始化或已销毁")
-    def __del__(self):
-        """销毁文章获取器"""
-        if hasattr(WXArticleFetcher, 'controller'):
-            WXArticleFetcher.controller.close()
+        """关闭空闲的浏览器，正在使用的浏览器归还后保留在池中"""
+        self.pool.close_idle()
 
-    def export_to_pdf(self, title=None):
+    def export_to_pdf(self, title=None, driver=None):
         """将文章内容导出为 PDF 文件
         
         Args:
-            output_path: 输出 PDF 文件的路径（可选）
+            title: 文章标题，作为PDF文件名
+            driver: 已打开文章的浏览器
         """
         try:
             if cfg.get("export.pdf.enable",False)==False:
                 return
             # 使用浏览器打印功能生成 PDF
-            if output_path:
+            if title and driver:
                 import os
                 pdf_path=cfg.get("export.pdf.dir","./data/pdf")
                 output_path=os.path.abspath(f"{pdf_path}/{title}.pdf")
-                self.driver.execute_script(f"window.print({{'printBackground': true, 'destination': 'save-as-pdf', 'outputPath': '{output_path}'}});")
+                driver.execute_script(f"window.print({{'printBackground': true, 'destination': 'save-as-pdf', 'outputPath': '{output_path}'}});")
                 time.sleep(3)
             print_success(f"PDF 文件已生成{output_path}")
         except Exception as e:
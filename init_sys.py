@@ -30,6 +30,8 @@ def sync_models():
          time.sleep(3)
          synchronizer = DatabaseSynchronizer(db_url=cfg.get("db",""))
          synchronizer.sync()
+         from core.search import SEARCH
+         SEARCH.ensure()
          print_info("模型同步完成")
 
      
@@ -3,8 +3,24 @@ import core.wx as wx
 import core.db as db
 from core.config import DEBUG,cfg
 from core.models.article import Article
+from core.metrics import METRICS
+from core.content_format import FORMAT_STORE
+from core.res.images import IMAGE_STORE,mirror_content
+from sqlalchemy import update
 
-DB=db.Db(tag="文章采集API")
+DB=db.Db(tag="文章采集API",role="scheduler")
+
+def _after_insert(art:dict,id:str):
+    """新入库文章：正文图片本地化后写回，再按配置预先转换格式"""
+    content=art.get("content")
+    if content and IMAGE_STORE.enabled():
+        mirrored=mirror_content(content)
+        if mirrored!=content:
+            with DB.get_engine().begin() as conn:
+                conn.execute(update(Article).where(Article.id==id).values(content=mirrored))
+            # 推送消息使用同一份文章数据，保持与入库内容一致
+            art["content"]=content=mirrored
+    FORMAT_STORE.prefetch(id,content)
 
 def UpdateArticle(art:dict):
     mps_count=0
@@ -13,8 +29,23 @@ def UpdateArticle(art:dict):
         pass
     if  DB.add_article(art):
         mps_count=mps_count+1
+        _after_insert(art,db.make_article_id(art["mp_id"],str(art["id"])))
         return True
     return False
+def UpdateArticles(arts:list)->list:
+    """批量入库一页文章，返回与arts一一对应的结果：True新增，False已存在，None写入失败"""
+    with METRICS.timer("db_write_seconds",{"op":"add_articles"}):
+        result=DB.add_articles(arts)
+    inserted=set(result["inserted"])
+    failed=set(result.get("failed",[]))
+    if failed:
+        METRICS.inc("article_write_errors",None,len(failed))
+    ids=[db.make_article_id(art["mp_id"],str(art["id"])) for art in arts]
+    for art,id in zip(arts,ids):
+        if id in inserted:
+            _after_insert(art,id)
+    return [None if id in failed else id in inserted for id in ids]
+UpdateArticle.batch=UpdateArticles
 def Update_Over(data=None):
     print("更新完成")
     pass
\ No newline at end of file
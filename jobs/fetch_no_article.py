@@ -1,75 +1,209 @@
 from core.models.article import Article,DATA_STATUS
 import core.db as db
-from core.wx.base import WxGather
-from time import sleep
-from core.print import print_success,print_error
-import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from sqlalchemy import select,update,func
+from core.print import print_success,print_error,print_warning
+from core.config import cfg
 from driver.wxarticle import Web
-DB=db.Db(tag="内容修正")
-def fetch_articles_without_content():
-    """
-    查询content为空的文章，调用微信内容提取方法获取内容并更新数据库
+from core.wx.content import CONTENT_PIPELINE
+from core.feed_store import FEED_STORE
+from core.content_format import FORMAT_STORE
+from core.res.images import mirror_content
+DB=db.Db(tag="内容修正",role="content")
+
+class ContentBackfill:
+    """文章内容补全任务
+
+    以文章表为任务队列：has_content=0且到了content_retry_at的文章可被领取，
+    领取时用条件UPDATE写入租约到期时间，多个线程或进程不会领取同一篇文章，
+    处理中途退出的文章在租约到期后重新可领取。
+    抓取失败按指数退避重试，超过gather.content_max_attempts次后不再重试。
     """
-    session = DB.get_session()
-    ga=WxGather().Model()
-    try:
-        # 查询content为空的文章
-        from sqlalchemy import or_
-        articles = session.query(Article).filter(or_(Article.content.is_(None), Article.content == "")).limit(10).all()
-        
-        if not articles:
-            print_warning("暂无需要获取内容的文章")
-            return
-        
-        for article in articles:
-            # 构建URL
-            if article.url:
-                url = article.url
-            else:
-                url = f"https://mp.weixin.qq.com/s/{article.id}"
-            
-            print(f"正在处理文章: {article.title}, URL: {url}")
-            
-            # 获取内容
-            if cfg.get("gather.content_mode","web"):
-                content=Web.get_article_content(url).get("content")
-            else:
-                content = ga.content_extract(url)
-            sleep(random.randint(3,10))
+    def __init__(self):
+        self._stop=threading.Event()
+        self._thread=None
+        self._lock=threading.Lock()
+        self.started_at=0
+        self.running=0
+        self.claimed=0
+        self.success=0
+        self.deleted=0
+        self.failed=0
+        self.gave_up=0
+        self.total_cost=0.0
+
+    def workers(self)->int:
+        return max(1,int(cfg.get("gather.content_workers",2) or 1))
+    def max_attempts(self)->int:
+        return max(1,int(cfg.get("gather.content_max_attempts",5) or 1))
+    def backoff(self,attempts:int)->int:
+        """第attempts次失败后的重试间隔(秒)"""
+        base=int(cfg.get("gather.content_backoff",300) or 300)
+        cap=int(cfg.get("gather.content_max_backoff",86400) or 86400)
+        return min(cap,base*2**max(0,attempts-1))
+    def lease(self)->int:
+        return int(cfg.get("gather.content_lease",600) or 600)
+
+    def _pending(self,now:int):
+        return (Article.has_content==0,
+                Article.status!=DATA_STATUS.DELETED,
+                func.coalesce(Article.content_attempts,0)<self.max_attempts(),
+                func.coalesce(Article.content_retry_at,0)<=now)
+
+    def claim(self,limit:int)->list:
+        """领取最多limit篇待补全的文章"""
+        now=int(time.time())
+        query=select(Article.id,Article.mp_id,Article.title,Article.url,Article.content_attempts)\
+            .where(*self._pending(now)).order_by(Article.publish_time.desc()).limit(limit)
+        claimed=[]
+        with DB.get_engine().begin() as conn:
+            for row in conn.execute(query).mappings().all():
+                r=conn.execute(update(Article).where(Article.id==row["id"],*self._pending(now))
+                               .values(content_retry_at=now+self.lease()))
+                if r.rowcount==1:
+                    claimed.append(dict(row))
+        with self._lock:
+            self.claimed+=len(claimed)
+        return claimed
+
+    def _complete(self,article:dict,content:str):
+        content=mirror_content(content)
+        values={"content":content,"has_content":1,"updated_at":datetime.now(),"content_retry_at":0}
+        if content=="DELETED":
+            print_error(f"获取文章 {article['title']} 内容已被发布者删除")
+            values["status"]=DATA_STATUS.DELETED
+        with DB.get_engine().begin() as conn:
+            conn.execute(update(Article).where(Article.id==article["id"]).values(**values))
+        FEED_STORE.touch(article["mp_id"])
+        FORMAT_STORE.prefetch(article["id"],content)
+
+    def _fail(self,article:dict)->bool:
+        """记录失败次数并安排重试，返回是否已放弃"""
+        attempts=(article.get("content_attempts") or 0)+1
+        now=int(time.time())
+        with DB.get_engine().begin() as conn:
+            conn.execute(update(Article).where(Article.id==article["id"])
+                         .values(content_attempts=attempts,content_retry_at=now+self.backoff(attempts)))
+        return attempts>=self.max_attempts()
+
+    def process(self,article:dict)->bool:
+        url=article.get("url") or f"https://mp.weixin.qq.com/s/{article['id']}"
+        start=time.perf_counter()
+        with self._lock:
+            self.running+=1
+        try:
+            print(f"正在处理文章: {article['title']}, URL: {url}")
+            # api模式只使用HTTP抓取，web模式失败时再使用浏览器
+            content=CONTENT_PIPELINE.fetch(url,use_browser=cfg.get("gather.content_mode","web")=="web")
             if content:
-                # 更新内容
-                article.content = content
-                if  content=="DELETED":
-                    print_error(f"获取文章 {article.title} 内容已被发布者删除")
-                    article.status = DATA_STATUS.DELETED
-                session.commit()
-                print_success(f"成功更新文章 {article.title} 的内容")
+                self._complete(article,content)
+                print_success(f"成功更新文章 {article['title']} 的内容")
             else:
-                print_error(f"获取文章 {article.title} 内容失败")
-                
-    except Exception as e:
-        print(f"处理过程中发生错误: {e}")
-    finally:
+                gave_up=self._fail(article)
+                print_error(f"获取文章 {article['title']} 内容失败{'，不再重试' if gave_up else ''}")
+            with self._lock:
+                if not content:
+                    self.failed+=1
+                    self.gave_up+=1 if gave_up else 0
+                elif content=="DELETED":
+                    self.deleted+=1
+                else:
+                    self.success+=1
+            return bool(content)
+        except Exception as e:
+            print_error(f"处理文章 {article['title']} 出错: {e}")
+            # 入库等异常同样计入失败次数，按退避重试，超过次数后不再领取
+            try:
+                gave_up=self._fail(article)
+            except Exception as fail_error:
+                print_error(f"记录文章 {article['title']} 失败次数出错: {fail_error}")
+                gave_up=False
+            with self._lock:
+                self.failed+=1
+                self.gave_up+=1 if gave_up else 0
+            return False
+        finally:
+            with self._lock:
+                self.running-=1
+                self.total_cost+=time.perf_counter()-start
+
+    def run_once(self,limit:int=None)->int:
+        """领取一批文章并发处理，返回本批数量"""
+        workers=self.workers()
+        articles=self.claim(limit or workers*2)
+        if not articles:
+            return 0
+        with ThreadPoolExecutor(max_workers=min(workers,len(articles)),thread_name_prefix="backfill") as pool:
+            list(pool.map(self.process,articles))
+        return len(articles)
+
+    def _loop(self):
+        idle=max(10,int(cfg.get("gather.content_auto_interval",1) or 1)*60)
+        while not self._stop.is_set():
+            try:
+                if self.run_once()==0:
+                    self._stop.wait(idle)
+            except Exception as e:
+                print_error(f"内容补全任务出错: {e}")
+                self._stop.wait(idle)
         Web.Close()
-from core.task import TaskScheduler
-from core.queue import TaskQueueManager
-scheduler=TaskScheduler()
-task_queue=TaskQueueManager()
-task_queue.run_task_background()
-from core.config import cfg
-from core.print import print_success,print_warning
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self.started_at=int(time.time())
+        self._thread=threading.Thread(target=self._loop,name="content-backfill",daemon=True)
+        self._thread.start()
+        print_success(f"已启动文章内容补全任务，并发{self.workers()}")
+
+    def stop(self):
+        self._stop.set()
+
+    def remaining(self)->int:
+        with DB.get_engine().connect() as conn:
+            return conn.execute(select(func.count()).select_from(Article).where(
+                Article.has_content==0,Article.status!=DATA_STATUS.DELETED,
+                func.coalesce(Article.content_attempts,0)<self.max_attempts())).scalar()
+
+    def info(self)->dict:
+        with self._lock:
+            done=self.success+self.deleted+self.failed
+            elapsed=time.time()-self.started_at if self.started_at else 0
+            data={
+                'active':self._thread is not None and self._thread.is_alive(),
+                'workers':self.workers(),
+                'running':self.running,
+                'claimed':self.claimed,
+                'success':self.success,
+                'deleted':self.deleted,
+                'failed':self.failed,
+                'gave_up':self.gave_up,
+                'avg':round(self.total_cost/done,3) if done else 0,
+                'per_minute':round(done/elapsed*60,2) if elapsed else 0,
+            }
+        try:
+            data['remaining']=self.remaining()
+        except Exception:
+            data['remaining']=None
+        return data
+
+BACKFILL=ContentBackfill()
+
+def fetch_articles_without_content():
+    """
+    查询content为空的文章，调用微信内容提取方法获取内容并更新数据库
+    """
+    if BACKFILL.run_once()==0:
+        print_warning("暂无需要获取内容的文章")
+
 def start_sync_content():
     if not cfg.get("gather.content_auto_check",False):
         print_warning("自动检查并同步文章内容功能未启用")
         return
-    interval=int(cfg.get("gather.content_auto_interval",1)) # 每隔多少分钟
-    cron_exp=f"*/{interval} * * * *"
-    task_queue.clear_queue()
-    scheduler.clear_all_jobs()
-    def do_sync():
-        task_queue.add_task(fetch_articles_without_content)
-    job_id=scheduler.add_cron_job(do_sync,cron_expr=cron_exp)
-    print_success(f"已添自动同步文章内容任务: {job_id}")
-    scheduler.start()
+    BACKFILL.start()
 if __name__ == "__main__":
-    fetch_articles_without_content()
\ No newline at end of file
+    fetch_articles_without_content()
@@ -3,6 +3,10 @@ from core.models.article import Article
 from .article import UpdateArticle,Update_Over
 import core.db as db
 from core.wx import WxGather
+from core.wx.engine import GATHER_ENGINE
+from core.wx.poll import POLL_PLANNER
+from core.metrics import METRICS
+import time
 from core.log import logger
 from core.task import TaskScheduler
 from core.models.feed import Feed
@@ -10,23 +14,22 @@ from core.config import cfg,DEBUG
 from core.print import print_info,print_success,print_error
 from driver.wx import WX_API
 from driver.success import Success
-wx_db=db.Db(tag="任务调度")
+wx_db=db.Db(tag="任务调度",role="scheduler")
 def fetch_all_article():
     print("开始更新")
-    wx=WxGather().Model()
+    counts=[]
     try:
         # 获取公众号列表
         mps=db.DB.get_all_mps()
-        for item in mps:
-            try:
-                wx.get_Articles(item.faker_id,CallBack=UpdateArticle,Mps_id=item.id,Mps_title=item.mp_name, MaxPage=1)
-            except Exception as e:
-                print(e)
-        print(wx.articles) 
+        def fetch(item):
+            wx=WxGather().Model()
+            wx.get_Articles(item.faker_id,CallBack=UpdateArticle,Mps_id=item.id,Mps_title=item.mp_name, MaxPage=1)
+            return wx.all_count()
+        counts=GATHER_ENGINE.run(mps,fetch)
     except Exception as e:
         print(e)         
     finally:
-        logger.info(f"所有公众号更新完成,共更新{wx.all_count()}条数据")
+        logger.info(f"所有公众号更新完成,共更新{sum(counts)}条数据")
 
 
 def test(info:str):
@@ -35,39 +38,207 @@ def test(info:str):
 from core.models.message_task import MessageTask
 # from core.queue import TaskQueue
 from .webhook import web_hook
+import threading
 interval=int(cfg.get("interval",60)) # 每隔多少秒执行一次
-def do_job(mp=None,task:MessageTask=None):
-        # TaskQueue.add_task(test,info=datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
-        # print("执行任务", task.mps_id)
+def do_job(mp=None,max_page:int=1)->list:
+        """采集单个公众号，返回本次新入库的文章"""
         print("执行任务")
-        all_count=0
         wx=WxGather().Model()
+        start=time.perf_counter()
         try:
-            wx.get_Articles(mp.faker_id,CallBack=UpdateArticle,Mps_id=mp.id,Mps_title=mp.mp_name, MaxPage=1,Over_CallBack=Update_Over,interval=interval)
+            wx.get_Articles(mp.faker_id,CallBack=UpdateArticle,Mps_id=mp.id,Mps_title=mp.mp_name, MaxPage=max_page,Over_CallBack=Update_Over,interval=interval)
         except Exception as e:
+            METRICS.inc("feed_gather_seconds_errors")
             print_error(e)
             # raise
         finally:
-            count=wx.all_count()
-            all_count+=count
-            from jobs.webhook import MessageWebHook 
-            tms=MessageWebHook(task=task,feed=mp,articles=wx.articles)
-            web_hook(tms)
-            print_success(f"任务({task.id})[{mp.mp_name}]执行成功,{count}成功条数")
+            METRICS.observe("feed_gather_seconds",None,time.perf_counter()-start)
+        print_success(f"[{mp.mp_name}]采集完成,{wx.all_count()}成功条数")
+        return wx.articles
+
+def notify(feed:Feed,task_id:str,articles:list):
+        """把采集结果推送给一个消息任务"""
+        from .taskmsg import get_message_task
+        from jobs.webhook import MessageWebHook
+        tasks=get_message_task(task_id)
+        if not tasks:
+            print_error(f"任务[{task_id}]不存在或已停用，跳过推送")
+            return
+        task=tasks[0]
+        with METRICS.timer("webhook_seconds",{"task":str(task.id)}):
+            web_hook(MessageWebHook(task=task,feed=feed,articles=articles))
+        print_success(f"任务({task.id})[{feed.mp_name}]推送完成,{len(articles)}条文章")
+
+class FeedCoalescer:
+    """合并多个消息任务对同一公众号的采集
+
+    公众号已在队列中等待或正在采集时，后触发的任务只登记为订阅者，采集完成后一起推送；
+    gather.coalesce_window秒内刚采集过的公众号直接复用上次的结果推送，不再请求公众号平台。
+    同一结果对每个消息任务只推送一次，已推送过的任务在窗口内再次触发时不做处理。
+    """
+    def __init__(self):
+        self._lock=threading.Lock()
+        self._pending={}
+        self._recent={}
+        self.gathers=0
+        self.joined=0
+        self.reused=0
+        self.skipped=0
+
+    def window(self)->int:
+        return int(cfg.get("gather.coalesce_window",300) or 0)
+
+    def request(self,feed_id:str,task_id:str=None,queued=None,force:bool=False)->str:
+        """登记一次采集请求
+
+        返回new(需要加入队列)、joined(已合并到排队中的采集)、recent(复用最近结果)
+        或done(最近结果已推送给该任务，无需处理)；force为True时已推送过的任务也再推送一次
+        """
+        now=time.time()
+        with self._lock:
+            recent=self._recent.get(feed_id)
+            if task_id and recent and now-recent[0]<self.window():
+                notified=recent[2]
+                if task_id in notified and not force:
+                    self.skipped+=1
+                    return "done"
+                notified.add(task_id)
+                self.reused+=1
+                return "recent"
+            subscribers=self._pending.get(feed_id)
+            # 排队的采集任务可能已被取消，此时重新加入队列
+            if subscribers is not None and (queued is None or queued()):
+                if task_id:
+                    subscribers.add(task_id)
+                self.joined+=1
+                return "joined"
+            self._pending[feed_id]={task_id} if task_id else set()
+            self.gathers+=1
+            return "new"
+
+    def finish(self,feed_id:str,articles:list,task_ids:list=None)->set:
+        """采集结束，记录结果并返回需要推送的消息任务"""
+        now=time.time()
+        with self._lock:
+            subscribers=self._pending.pop(feed_id,set())|set(t for t in (task_ids or []) if t)
+            # 记录已推送的任务，窗口内同一任务再次触发时不重复推送
+            self._recent[feed_id]=(now,articles,set(subscribers))
+            window=self.window()
+            for key in [k for k,v in self._recent.items() if now-v[0]>=window]:
+                del self._recent[key]
+        return subscribers
+
+    def recent(self,feed_id:str)->list:
+        with self._lock:
+            recent=self._recent.get(feed_id)
+            return recent[1] if recent else []
+
+    def info(self)->dict:
+        with self._lock:
+            return {
+                'window':self.window(),
+                'pending':{k:len(v) for k,v in self._pending.items()},
+                'recent':len(self._recent),
+                'gathers':self.gathers,
+                'joined':self.joined,
+                'reused':self.reused,
+                'skipped':self.skipped,
+            }
+
+COALESCER=FeedCoalescer()
+
+def gather_feed(feed_id:str,task_ids:list=None,max_page:int=1):
+        """队列任务：采集单个公众号，并把新文章推送给所有订阅该公众号的消息任务
+
+        参数只包含ID，公众号和消息任务在执行时加载，可持久化
+        """
+        if isinstance(task_ids,str):
+            task_ids=[task_ids]
+        feed=wx_db.get_mps(feed_id)
+        articles=[]
+        try:
+            if not feed:
+                print_error(f"公众号[{feed_id}]不存在，跳过采集")
+                return
+            articles=GATHER_ENGINE.run_one(feed,lambda mp:do_job(mp,max_page)) or []
+        finally:
+            subscribers=COALESCER.finish(feed_id,articles,task_ids)
+        for task_id in subscribers:
+            try:
+                notify(feed,task_id,articles)
+            except Exception as e:
+                print_error(f"任务({task_id})推送失败: {e}")
+
+def notify_recent(feed_id:str,task_id:str):
+        """队列任务：用时间窗口内最近一次的采集结果推送给消息任务"""
+        feed=wx_db.get_mps(feed_id)
+        if feed:
+            notify(feed,task_id,COALESCER.recent(feed_id))
 
 from core.queue import TaskQueue
+def enqueue_feed(feed_id:str,task_id:str=None,priority:int=0,max_page:int=1,force:bool=False)->str:
+    """请求采集一个公众号，task_id为需要接收推送的消息任务，force为True时即使已推送过也再推送"""
+    key=f"gather:{feed_id}"
+    action=COALESCER.request(feed_id,task_id,queued=lambda:TaskQueue.has_key(key),force=force)
+    if action=="new":
+        TaskQueue.submit(gather_feed,args=(feed_id,[task_id] if task_id else [],max_page),key=key,priority=priority)
+    elif action=="recent":
+        TaskQueue.submit(notify_recent,args=(feed_id,task_id),priority=priority,persist=False)
+    return action
+
 def add_job(feeds:list[Feed]=None,task:MessageTask=None,isTest=False):
     if isTest:
-        TaskQueue.clear_queue()
+        # 先重载定时任务(会取消队列中的采集任务)，再加入测试任务
+        feeds=feeds[:1]
+        reload_job()
     for feed in feeds:
-        TaskQueue.add_task(do_job,feed,task)
+        # 同一公众号只采集一次，多个消息任务共享结果，测试任务优先执行
+        action=enqueue_feed(feed.id,task.id,priority=10 if isTest else 0,force=isTest)
         if isTest:
             print(f"测试任务，{feed.mp_name}，加入队列成功")
-            reload_job()
             break
-        print(f"{feed.mp_name}，加入队列成功")
+        print(f"{feed.mp_name}，加入队列成功({action})")
     print_success(TaskQueue.get_queue_info())
     pass
+
+def subscriptions()->dict:
+    """公众号ID -> 订阅该公众号的消息任务ID列表"""
+    from .taskmsg import get_message_task
+    subs={}
+    for task in get_message_task() or []:
+        for feed in get_feeds(task):
+            subs.setdefault(feed.id,[]).append(str(task.id))
+    return subs
+
+def poll_scope(subs:dict=None)->list:
+    """自适应模式采集的公众号：默认与cron模式一致，只采集有消息任务订阅的公众号，
+    开启gather.poll_all_feeds时采集全部公众号"""
+    feeds=wx_db.get_all_mps()
+    if cfg.get("gather.poll_all_feeds",False):
+        return feeds
+    subs=subscriptions() if subs is None else subs
+    return [feed for feed in feeds if feed.id in subs]
+
+def poll_feeds():
+    """自适应采集：按发文规律采集到期的公众号，并推送给订阅它的消息任务"""
+    subs=subscriptions()
+    due=POLL_PLANNER.due(poll_scope(subs))
+    if not due:
+        return
+    for feed in due:
+        for task_id in subs.get(feed.id) or [None]:
+            enqueue_feed(feed.id,task_id)
+        POLL_PLANNER.record(feed.id)
+    print_info(f"自适应采集: {len(due)}个公众号到期")
+
+def fire_task(task_id:str):
+    """定时触发：按任务ID加载消息任务，并在触发时解析公众号列表"""
+    from .taskmsg import get_message_task
+    tasks=get_message_task(task_id)
+    if not tasks:
+        print_error(f"任务[{task_id}]不存在或已停用")
+        return
+    add_job(get_feeds(tasks[0]),tasks[0])
 import json
 def get_feeds(task:MessageTask=None):
      mps = json.loads(task.mps_id)
@@ -80,7 +251,7 @@ scheduler=TaskScheduler()
 def reload_job():
     print_success("重载任务")
     scheduler.clear_all_jobs()
-    TaskQueue.clear_queue()
+    TaskQueue.clear_queue(prefix="gather:")
     start_job()
 
 def run(job_id:str=None,isTest=False):
@@ -103,17 +274,25 @@ def start_job(job_id:str=None):
         print("没有任务")
         return
     tag="定时采集"
+    if cfg.get("gather.schedule","cron")=="adaptive":
+        # 自适应模式下由发文规律决定采集时间，消息任务的cron不再触发采集
+        scheduler.add_cron_job(poll_feeds,cron_expr="* * * * *",job_id="adaptive_poll",tag="自适应采集")
+        scheduler.start()
+        print("启动自适应采集")
+        return
     for task in tasks:
         cron_exp=task.cron_exp
         if not cron_exp:
             print_error(f"任务[{task.id}]没有设置cron表达式")
             continue
-      
-        job_id=scheduler.add_cron_job(add_job,cron_expr=cron_exp,args=[get_feeds(task),task],job_id=str(task.id),tag="定时采集")
+        # 只传任务ID，公众号列表在每次触发时重新解析
+        job_id=scheduler.add_cron_job(fire_task,cron_expr=cron_exp,args=[str(task.id)],job_id=str(task.id),tag="定时采集")
         print(f"已添加任务: {job_id}")
     scheduler.start()
     print("启动任务")
 def start_all_task():
+    # 所有任务模块已加载，恢复上次未执行完的队列任务
+    TaskQueue.restore()
       #开启自动同步未同步 文章任务
     from jobs.fetch_no_article import start_sync_content
     start_sync_content()
@@ -9,7 +9,8 @@ from datetime import datetime
 from core.log import logger
 from core.config import cfg
 from bs4 import BeautifulSoup
-from core.content_format import format_content
+from core.content_format import FORMAT_STORE
+from core.db import make_article_id
 import re
 @dataclass
 class MessageWebHook:
@@ -104,7 +105,9 @@ def call_webhook(hook: MessageWebHook) -> str:
             processed_article = article.copy()
             # 只有template需要content时才进行格式转换
             if template_needs_content:
-              processed_article["content"] = format_content(processed_article["content"], content_format)
+              # 按文章ID缓存转换结果，同一篇文章多次推送只转换一次
+              article_id = make_article_id(article.get("mp_id"), str(article.get("id", "")))
+              processed_article["content"] = FORMAT_STORE.format(article_id, processed_article["content"], content_format)
             processed_articles.append(processed_article)
         else:
             processed_articles.append(article)
@@ -0,0 +1,82 @@
+"""
+文章表索引基准：对比新增复合索引前后热点查询的执行计划和耗时
+
+用法: python -m tools.bench_indexes [文章数量，默认200000]
+在临时SQLite数据库中生成数据，不影响配置的数据库
+"""
+import os
+import sys
+import time
+import random
+import tempfile
+from sqlalchemy import create_engine, text
+from core.models.article import Article
+from data_sync import DatabaseSynchronizer
+
+QUERIES = {
+    "单个公众号订阅源": "SELECT id FROM articles WHERE mp_id = :mp_id ORDER BY publish_time DESC LIMIT 30",
+    "按状态筛选的文章列表": "SELECT id FROM articles WHERE status = :status ORDER BY publish_time DESC LIMIT 30",
+    "文章列表总数": "SELECT count(*) FROM articles WHERE status = :status",
+    "待补全内容的文章": "SELECT id FROM articles WHERE has_content = 0 ORDER BY publish_time DESC LIMIT 10",
+}
+PARAMS = {"mp_id": "MP_WXS_7", "status": 1}
+
+
+def populate(engine, count: int, feeds: int = 200):
+    table = Article.__table__
+    table.create(engine)
+    # 只保留原有的publish_time索引，模拟升级前的表结构
+    for index in list(table.indexes):
+        if index.name != "ix_articles_publish_time":
+            index.drop(engine)
+    now = int(time.time())
+    rows = []
+    with engine.begin() as conn:
+        for i in range(count):
+            has_content = 1 if random.random() > 0.05 else 0
+            rows.append({
+                "id": f"{i}", "mp_id": f"MP_WXS_{random.randint(0, feeds)}", "title": f"文章{i}",
+                "status": 1 if random.random() > 0.02 else 1000,
+                "publish_time": now - random.randint(0, 86400 * 365),
+                "has_content": has_content, "content": "<p>正文</p>" if has_content else "",
+            })
+            if len(rows) >= 5000:
+                conn.execute(table.insert(), rows)
+                rows = []
+        if rows:
+            conn.execute(table.insert(), rows)
+
+
+def run(engine, title: str, repeat: int = 20):
+    print(f"\n==== {title} ====")
+    with engine.connect() as conn:
+        conn.execute(text("ANALYZE"))
+        for name, sql in QUERIES.items():
+            plan = conn.execute(text(f"EXPLAIN QUERY PLAN {sql}"), PARAMS).fetchall()
+            start = time.perf_counter()
+            for _ in range(repeat):
+                conn.execute(text(sql), PARAMS).fetchall()
+            cost = (time.perf_counter() - start) / repeat * 1000
+            print(f"{name}: {cost:.2f}ms")
+            for row in plan:
+                print(f"    {row[-1]}")
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    path = os.path.join(tempfile.mkdtemp(), "bench.db")
+    db_url = f"sqlite:///{path}"
+    engine = create_engine(db_url)
+    print(f"生成 {count} 篇文章: {path}")
+    populate(engine, count)
+    run(engine, "升级前(仅publish_time索引)")
+    synchronizer = DatabaseSynchronizer(db_url=db_url)
+    synchronizer.engine = engine
+    print(synchronizer.sync_indexes(Article))
+    run(engine, "升级后(复合索引)")
+    engine.dispose()
+    os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""
+正文规范化基准：对比lxml与html.parser两种解析方式的输出和耗时
+
+用法: python -m tools.bench_normalize [文章页面HTML文件 ...] [-n 重复次数，默认200]
+未指定文件时使用内置的示例页面。每个页面先比较两种解析方式的输出，再分别统计耗时。
+"""
+import difflib
+import sys
+import time
+from core.wx import normalize
+
+SAMPLE = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>示例文章</title>
+<script>var a = 1 < 2 && "x";</script></head>
+<body id="activity-detail">
+<div class="rich_media_content js_underline_content" id="js_content" style="visibility: hidden; opacity: 0;">
+<section style="margin: 0px; padding: 0px;"><p style="text-align:center;"><span style="color: rgb(0,0,0);">正文 &amp; 特殊字符 &lt;tag&gt; &nbsp;空格</span></p>
+<p><img class="rich_pages wxw-img" data-src="https://mmbiz.qpic.cn/mmbiz_jpg/abc/640?wx_fmt=jpeg&amp;from=appmsg" data-ratio="0.5" style="width: 677px !important;height: auto;" data-w="1080"></p>
+<p>第二段<br>换行<strong>加粗</strong><a href="https://mp.weixin.qq.com/s?a=1&amp;b=2" title='引号"与&amp;'>链接</a></p>
+<img src="https://mmbiz.qpic.cn/x.png" alt="">
+<ul><li>列表一</li><li>列表二<input type="checkbox" disabled><option selected="selected">选项</option></li></ul>
+<!-- 注释 --><svg viewBox="0 0 1 1"><path d="M0"/></svg>
+</section>
+<mp-style-type data-value="3"></mp-style-type>
+</div>
+<div id="js_pc_qr_code">二维码</div>
+</body></html>
+"""
+
+
+def bench(func, text: str, rounds: int) -> float:
+    start = time.perf_counter()
+    for _ in range(rounds):
+        func(text)
+    return (time.perf_counter() - start) / rounds * 1000
+
+
+def main():
+    args = sys.argv[1:]
+    rounds = 200
+    if "-n" in args:
+        i = args.index("-n")
+        rounds = int(args[i + 1])
+        del args[i:i + 2]
+    if not normalize.LXML:
+        print("未安装lxml，无法对比")
+        return 1
+    pages = [(path, open(path, encoding="utf-8").read()) for path in args] or [("示例页面", SAMPLE)]
+    failed = 0
+    for name, text in pages:
+        fast = normalize._normalize_lxml(text)
+        slow = normalize._normalize_bs4(text)
+        same = fast == slow
+        if not same:
+            failed += 1
+            for line in difflib.unified_diff(slow.splitlines(), fast.splitlines(), "html.parser", "lxml", lineterm=""):
+                print(line)
+        print(f"{name}: 输出{'一致' if same else '不一致'} {len(text)}字符 "
+              f"lxml {bench(normalize._normalize_lxml, text, rounds):.2f}ms "
+              f"html.parser {bench(normalize._normalize_bs4, text, rounds):.2f}ms")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,82 @@
+"""
+消息模板引擎基准：对比编译缓存的TemplateParser与原有逐词法单元解释执行的实现
+
+用法: python -m tools.bench_template [文章数量，默认500] [重复次数，默认20]
+每种模板先比较两种实现的输出，再分别统计渲染耗时。
+原实现在循环结束后的位置计算有误，循环后面的文本会重复输出一段，
+因此Markdown摘要模板的输出不一致，以新实现为准
+"""
+import sys
+import time
+from core.lax.template_parser import TemplateParser, TEMPLATE_CACHE
+from tools.legacy_template_parser import LegacyTemplateParser
+
+TEMPLATES = {
+    "Markdown摘要": """
+### {{feed.mp_name}} 订阅消息：
+{% if articles %}
+{% for article in articles %}
+- [**{{ article.title }}**]({{article.url}}) ({{ article.publish_time }})
+{% endfor %}
+{% else %}
+- 暂无文章
+{% endif %}
+""",
+    "JSON webhook": """{
+  "feed": {"id": "{{ feed.id }}", "name": "{{ feed.mp_name }}"},
+  "articles": [
+    {% if articles %}
+     {% for article in articles %}
+        {
+          "id": "{{ article.id }}",
+          "title": "{{ article.title }}",
+          "url": "{{ article.url }}",
+          "description": "{{ article.description }}",
+          "publish_time": "{{ article.publish_time }}"
+        }{% if not loop.last %},{% endif %}
+      {% endfor %}
+    {% endif %}
+  ],
+  "now": "{{ now }}"
+}""",
+    "表达式与条件": """
+共{{= len(articles) }}篇
+{% for article in articles %}
+{{ loop.index }}. {{= article['title'].upper() }}{% if article.description %} - {{ article.description }}{% endif %}
+{% endfor %}
+""",
+}
+
+
+def make_context(count: int) -> dict:
+    articles = [{
+        "id": f"a{i}", "title": f"article {i}", "url": f"https://mp.weixin.qq.com/s/a{i}",
+        "description": f"摘要{i}" if i % 3 else "", "publish_time": 1700000000 + i,
+    } for i in range(count)]
+    return {"feed": {"id": "MP_WXS_1", "mp_name": "公众号"}, "articles": articles, "now": "2024-01-01 00:00:00"}
+
+
+def bench(parser_cls, template: str, context: dict, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        # 与webhook/RSS的调用方式一致，每次渲染都新建解析器
+        parser_cls(template).render(dict(context))
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    context = make_context(count)
+    print(f"{count}篇文章，每种模板渲染{repeat}次")
+    for name, template in TEMPLATES.items():
+        same = LegacyTemplateParser(template).render(dict(context)) == TemplateParser(template).render(dict(context))
+        legacy = bench(LegacyTemplateParser, template, context, repeat)
+        compiled = bench(TemplateParser, template, context, repeat)
+        print(f"{name}: 原实现 {legacy:.2f}ms, 编译缓存 {compiled:.2f}ms, "
+              f"提升 {legacy / compiled:.1f}x, 输出{'一致' if same else '不一致'}")
+    print(f"模板缓存: {TEMPLATE_CACHE.info()}")
+
+
+if __name__ == "__main__":
+    main()
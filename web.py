@@ -20,8 +20,17 @@ from apis.export import router as export_router
 import apis
 import os
 from core.config import cfg,VERSION,API_BASE
+from contextlib import asynccontextmanager
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    # 关闭图片代理共享的连接池
+    from core.res.proxy_cache import PROXY_CACHE
+    await PROXY_CACHE.close()
 
 app = FastAPI(
+    lifespan=lifespan,
     title="WeRSS API",
     description="微信公众号RSS生成服务API文档",
     version="1.0.0",